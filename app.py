@@ -1,69 +1,58 @@
 """
 TAHLEEL.ai - YOLOx Detection + Claude AI Tactical Analysis
+
+torch, OpenCV, YOLOX and the Anthropic SDK are imported on first use, so the
+app imports in well under a second; with MODEL_WARMUP=background the model
+loads on a warm-up thread while the server already answers the probes.
 """
 
+import time
+
+_import_started = time.perf_counter()
+
 import os
 import sys
-from flask import Flask, request, jsonify
-from flask_cors import CORS
-from gcs_helper import upload_file, download_file
-import torch
-import cv2
-import numpy as np
 import tempfile
-from google.cloud import storage
-from anthropic import Anthropic
+import uuid
+from flask import Flask, request, jsonify, Response
+from flask_cors import CORS
+from gcs_helper import download_file
 
 sys.path.insert(0, '/yolox')
 
+from components.model_registry import registry
+from utils.storage import metrics as storage_metrics
+from components.batch_scheduler import INFERENCE_SCHEDULER, get_scheduler, scheduler_stats
+from components.serving import process_stats, readiness
+from utils.metrics import span, observe, job_trace, render_prometheus
+
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}})
 
-YOLOX_WEIGHTS = "gs://tahleel-ai-videos/models/yolox_m.pth"
+# "eager" loads YOLOX at import (default); "background" on a warm-up thread started at
+# import; "lazy" defers it to the first /analyze
+MODEL_WARMUP = os.environ.get("MODEL_WARMUP", "eager").lower()
 ANTHROPIC_API_KEY = os.environ.get("ANTHROPIC_API_KEY")
-claude_client = Anthropic(api_key=ANTHROPIC_API_KEY) if ANTHROPIC_API_KEY else None
-
-def download_model_from_gcs(gcs_path, local_path):
-    if os.path.exists(local_path):
-        return local_path
-    if gcs_path.startswith("gs://"):
-        gcs_path = gcs_path[5:]
-    parts = gcs_path.split("/", 1)
-    client = storage.Client()
-    bucket = client.bucket(parts[0])
-    blob = bucket.blob(parts[1])
-    blob.download_to_filename(local_path)
-    return local_path
-
-def load_yolox():
-    from yolox.exp import get_exp
-    from yolox.utils import postprocess
-    
-    local_weights = "/tmp/yolox_m.pth"
-    download_model_from_gcs(YOLOX_WEIGHTS, local_weights)
-    
-    exp = get_exp(None, "yolox-m")
-    model = exp.get_model()
-    ckpt = torch.load(local_weights, map_location="cpu")
-    model.load_state_dict(ckpt["model"])
-    model.eval()
-    
-    return model, exp, postprocess
+_claude_client = None
 
-def preprocess(img, input_size=(640, 640)):
-    img = cv2.resize(img, input_size)
-    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-    img = img.astype(np.float32)
-    return torch.from_numpy(img).permute(2, 0, 1).unsqueeze(0)
+def get_claude_client():
+    """Anthropic client, built on first use, or None without an API key"""
+    global _claude_client
+    if _claude_client is None and ANTHROPIC_API_KEY:
+        from anthropic import Anthropic
+        _claude_client = Anthropic(api_key=ANTHROPIC_API_KEY)
+    return _claude_client
 
 def analyze_with_claude(summary):
+    claude_client = get_claude_client()
     if not claude_client:
         return {"error": "Claude not configured"}
     try:
-        message = claude_client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=1500,
-            messages=[{"role": "user", "content": f"""Analyze this football match data:
+        with span("claude"):
+            message = claude_client.messages.create(
+                model="claude-sonnet-4-20250514",
+                max_tokens=1500,
+                messages=[{"role": "user", "content": f"""Analyze this football match data:
 
 {summary}
 
@@ -73,71 +62,133 @@ Provide tactical insights:
 3. Attacking vs Defensive Balance
 4. Key Observations
 5. Coach Recommendations"""}]
-        )
+            )
         return {"analysis": message.content[0].text}
     except Exception as e:
         return {"error": str(e)}
 
-print("🚀 Loading YOLOx...")
-yolox_model, yolox_exp, yolox_postprocess = load_yolox()
-print("✅ YOLOx ready")
+if MODEL_WARMUP == "eager":
+    print("🚀 Loading YOLOx...")
+    registry.warmup()
+    print("✅ YOLOx ready")
+elif MODEL_WARMUP == "background":
+    print("🚀 Loading YOLOx in the background...")
+    registry.warmup(background=True)
+
+IMPORT_SECONDS = round(time.perf_counter() - _import_started, 3)
 
 @app.route("/health", methods=["GET"])
 def health():
     return jsonify({
         "status": "healthy",
-        "yolox_loaded": True,
-        "claude_configured": claude_client is not None
+        "yolox_loaded": registry.is_loaded(),
+        "claude_configured": ANTHROPIC_API_KEY is not None,
+        "startup": {"import_seconds": IMPORT_SECONDS, "warmup": MODEL_WARMUP, "model": registry.state()},
+        "models": registry.stats(),
+        "storage": storage_metrics.snapshot(),
+        "inference_scheduler": scheduler_stats(),
+        "process": process_stats()
     })
 
+@app.route("/health/live", methods=["GET"])
+def live():
+    """Liveness: the process is up and serving requests, warm or not"""
+    return jsonify({"status": "alive"})
+
+@app.route("/health/ready", methods=["GET"])
+def ready():
+    """Readiness: 503 until the warm-up has loaded the model (or after it failed)"""
+    is_ready, body = readiness(MODEL_WARMUP)
+    return jsonify(body), 200 if is_ready else 503
+
 @app.route("/upload", methods=["POST"])
 def upload():
+    from utils.storage import get_storage, UPLOAD_CHUNK_SIZE
+    
     file = request.files['file']
-    temp_path = os.path.join(tempfile.gettempdir(), file.filename)
-    file.save(temp_path)
     gcs_path = f"videos/{file.filename}"
-    url = upload_file(temp_path, gcs_path)
-    os.remove(temp_path)
-    return jsonify({"success": True, "gcs_url": url, "gcs_path": gcs_path})
+    backend = get_storage()
+    
+    # Stream straight into a resumable upload; no temp file, bounded memory
+    writer = backend.open_writer(gcs_path, content_type=file.mimetype or None)
+    try:
+        while True:
+            chunk = file.stream.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            writer.write(chunk)
+        writer.commit()
+    except Exception:
+        writer.abort()
+        raise
+    return jsonify({"success": True, "gcs_url": backend.url(gcs_path), "gcs_path": gcs_path})
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(render_prometheus(), mimetype="text/plain; version=0.0.4")
 
 @app.route("/analyze", methods=["POST"])
 def analyze():
-    gcs_path = request.json.get("gcs_path")
+    # Per-request stage timings (utils/metrics.py), returned with the result
+    with job_trace("flask_analyze") as trace:
+        result = _analyze(request.json.get("gcs_path"))
+    result["timings"] = trace.summary()
+    return jsonify(result)
+
+def _analyze(gcs_path):
     temp_path = os.path.join(tempfile.gettempdir(), os.path.basename(gcs_path))
-    download_file(gcs_path, temp_path)
+    with span("video_download"):
+        download_file(gcs_path, temp_path)
+    
+    import cv2
+    from yolox.utils import postprocess
+    from components.frame_sampler import FrameSampler
+    from components.preprocess import LetterboxPreprocessor
+    # Forward passes go through the detector so YOLOX_PRECISION / YOLOX_COMPILE apply
+    detector = registry.get()
+    # Same YOLOX letterboxing as the FastAPI pipeline; one reused input buffer per request
+    preprocessor = LetterboxPreprocessor(detector.test_size)
+    # Concurrent requests share forward passes; frames are batched across requests
+    scheduler = get_scheduler() if INFERENCE_SCHEDULER else None
+    job = uuid.uuid4().hex
 
     cap = cv2.VideoCapture(temp_path)
+    frame_num = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
     results = []
     total_detections = 0
-    frame_num = 0
     
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
-        if frame_num % 30 == 0:
-            img_tensor = preprocess(frame)
-            with torch.no_grad():
-                outputs = yolox_model(img_tensor)
-            
-            # Use YOLOx native postprocessing
-            outputs = yolox_postprocess(
+    # Every 30th frame; skipped frames are grabbed or seeked past, never retrieved
+    decode_start = time.perf_counter()
+    for frame_idx, timestamp_ms, frame in FrameSampler(cap, 30):
+        observe("decode", time.perf_counter() - decode_start)
+        with span("preprocess"):
+            img_tensor, _ = preprocessor([frame])
+        # Scheduled: queue wait + the shared forward pass
+        with span("inference"):
+            if scheduler:
+                outputs = scheduler.infer(img_tensor, job=job).float()
+            else:
+                outputs = detector._forward(img_tensor).float()
+        
+        # Use YOLOx native postprocessing
+        with span("nms"):
+            outputs = postprocess(
                 outputs, 
                 num_classes=80,
                 conf_thre=0.25,
                 nms_thre=0.45
             )
-            
-            if outputs[0] is not None:
-                dets = outputs[0].cpu().numpy()
-                num_dets = len(dets)
-            else:
-                num_dets = 0
-            
-            total_detections += num_dets
-            results.append({"frame": frame_num, "detections": num_dets})
-            print(f"✅ Frame {frame_num}: {num_dets} detections")
-        frame_num += 1
+        
+        if outputs[0] is not None:
+            dets = outputs[0].cpu().numpy()
+            num_dets = len(dets)
+        else:
+            num_dets = 0
+        
+        total_detections += num_dets
+        results.append({"frame": frame_idx, "timestamp_ms": round(timestamp_ms, 1), "detections": num_dets})
+        print(f"✅ Frame {frame_idx}: {num_dets} detections")
+        decode_start = time.perf_counter()
     
     cap.release()
     os.remove(temp_path)
@@ -145,7 +196,7 @@ def analyze():
     summary = f"Video: {gcs_path}\nFrames: {frame_num}\nTotal Detections: {total_detections}\n{results[:5]}"
     claude_analysis = analyze_with_claude(summary)
 
-    return jsonify({
+    return {
         "success": True,
         "detections": {
             "total": total_detections,
@@ -154,7 +205,7 @@ def analyze():
         },
         "tactical_analysis": claude_analysis,
         "message": "YOLOx + Claude analysis complete"
-    })
+    }
 
 @app.route("/frames/<prefix>", methods=["GET"])
 def frames(prefix):
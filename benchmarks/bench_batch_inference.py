@@ -0,0 +1,53 @@
+"""
+Batched Inference Benchmark - TAHLEEL.ai
+Measure YOLOXDetector.detect_batch throughput (frames/sec) per batch size.
+
+Uses a randomly initialized yolox-m, so no GCS access or weights download is needed:
+    python -m benchmarks.bench_batch_inference --batch-sizes 1 4 8 16 --frames 32
+"""
+
+import argparse
+import time
+
+import numpy as np
+import torch
+
+from components.yolox_detector import YOLOXDetector
+
+
+def run(batch_sizes=(1, 4, 8, 16), num_frames=32, resolution=(1280, 720), threads=None):
+    if threads:
+        torch.set_num_threads(threads)
+    
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 255, (resolution[1], resolution[0], 3), dtype=np.uint8) for _ in range(num_frames)]
+    detector = YOLOXDetector("yolox_m", "cpu", pretrained=False)
+    
+    # Warm-up pass so one-time allocator/kernel setup is not timed
+    detector.detect_batch(frames[:1])
+    
+    results = []
+    for batch_size in batch_sizes:
+        start = time.perf_counter()
+        for i in range(0, num_frames, batch_size):
+            detector.detect_batch(frames[i:i + batch_size])
+        elapsed = time.perf_counter() - start
+        results.append({"batch_size": batch_size, "frames": num_frames, "seconds": elapsed, "fps": num_frames / elapsed})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="YOLOX batch size throughput benchmark")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--frames", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads")
+    args = parser.parse_args()
+    
+    print(f"torch threads: {args.threads or torch.get_num_threads()}")
+    print(f"{'batch':>6} {'frames':>7} {'seconds':>9} {'frames/sec':>11}")
+    for r in run(args.batch_sizes, args.frames, threads=args.threads):
+        print(f"{r['batch_size']:>6} {r['frames']:>7} {r['seconds']:>9.2f} {r['fps']:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
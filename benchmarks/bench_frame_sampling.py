@@ -0,0 +1,63 @@
+"""
+Frame Sampling Benchmark - TAHLEEL.ai
+Compare decode cost of the FrameSampler strategies (read / grab / seek) per sampling
+stride on a synthetic match video:
+    python -m benchmarks.bench_frame_sampling --seconds 60 --strides 6 30 150
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import cv2
+
+from benchmarks.synthetic_video import generate_match_video
+from components.frame_sampler import FrameSampler, STRATEGIES, choose_strategy
+
+
+def run(video_path, strides=(6, 30, 150), strategies=STRATEGIES):
+    results = []
+    for stride in strides:
+        reference = None
+        for strategy in strategies:
+            cap = cv2.VideoCapture(video_path)
+            sampler = FrameSampler(cap, stride, strategy=strategy)
+            start = time.perf_counter()
+            sampled = [(index, timestamp) for index, timestamp, _ in sampler]
+            elapsed = time.perf_counter() - start
+            cap.release()
+
+            reference = reference or sampled
+            results.append({
+                "stride": stride,
+                "strategy": strategy,
+                "auto": strategy == choose_strategy(stride),
+                "frames": len(sampled),
+                "seconds": elapsed,
+                "ms_per_sampled_frame": 1000 * elapsed / max(1, len(sampled)),
+                "matches_read": sampled == reference,
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Frame sampling strategy benchmark")
+    parser.add_argument("--video", help="existing video (default: generate a synthetic one)")
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--strides", type=int, nargs="+", default=[6, 30, 150])
+    args = parser.parse_args()
+
+    video_path = args.video
+    if not video_path:
+        video_path = os.path.join(tempfile.gettempdir(), "tahleel_bench_sampling.mp4")
+        generate_match_video(video_path, seconds=args.seconds)
+
+    print(f"{'stride':>6} {'strategy':>8} {'frames':>7} {'seconds':>8} {'ms/frame':>9}  notes")
+    for r in run(video_path, args.strides):
+        notes = ("auto " if r["auto"] else "") + ("" if r["matches_read"] else "INDEX MISMATCH")
+        print(f"{r['stride']:>6} {r['strategy']:>8} {r['frames']:>7} {r['seconds']:>8.2f} {r['ms_per_sampled_frame']:>9.2f}  {notes}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+Pipeline Benchmark - TAHLEEL.ai
+End-to-end offline benchmark of the analysis pipeline on a synthetic match video,
+with the local storage backend standing in for GCS and a randomly initialized
+yolox-m (no weights download):
+
+- detect: extract_frames (streamed, frames persisted) + run_yolox_detection
+- teams: YOLOXDetector._assign_teams on the video's ground-truth player boxes
+  (random weights find almost no players, so the pipeline's own team step has
+  little to do)
+- serialize: DetectionTable .npz + JSON records, uploaded to storage
+
+Per phase it reports frames/sec, p50/p95 per-frame latency, peak RSS and the
+bytes moved through storage; the stage breakdown comes from utils/metrics.py.
+
+Results can be saved as a JSON baseline and later runs compared against it
+(exit code 1 when a phase gets slower than --tolerance):
+    python -m benchmarks.bench_pipeline --seconds 20 --save benchmarks/baselines/pipeline.json
+    python -m benchmarks.bench_pipeline --seconds 20 --compare benchmarks/baselines/pipeline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import torch
+
+import utils.storage as storage
+from benchmarks.synthetic_video import generate_match_video, match_frames, player_boxes
+from components.model_registry import registry
+from components.yolox_detector import YOLOXDetector, run_yolox_detection
+from components.frame_extractor import extract_frames
+from components.team_classifier import TeamColorModel
+from utils.cloud_storage import upload_json_to_gcs, upload_detections_to_gcs
+from utils.metrics import job_trace
+
+BUCKET = "bench"
+# Phase metrics compared against a baseline: (key, True if higher is better)
+COMPARED = (("fps", True), ("latency_p95_ms", False))
+
+
+class PeakRSS:
+    """Samples this process's RSS on a background thread; `peak_mb` once stopped"""
+
+    def __init__(self, interval=0.02):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @staticmethod
+    def rss():
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.rss())
+
+    @property
+    def peak_mb(self):
+        return round(self.peak / 1024 / 1024, 1)
+
+
+def percentile_ms(samples, q):
+    return round(float(np.percentile(samples, q)) * 1000, 2) if len(samples) else None
+
+
+def storage_bytes():
+    snapshot = storage.metrics.snapshot()
+    return {op: snapshot.get(op, {}).get("bytes", 0) for op in ("upload", "download")}
+
+
+def phase(name, frames, seconds, latencies, rss, bytes_before):
+    after = storage_bytes()
+    return {
+        "phase": name,
+        "frames": frames,
+        "seconds": round(seconds, 3),
+        "fps": round(frames / seconds, 2) if seconds else None,
+        "latency_p50_ms": percentile_ms(latencies, 50),
+        "latency_p95_ms": percentile_ms(latencies, 95),
+        "peak_rss_mb": rss.peak_mb,
+        "bytes_uploaded": after["upload"] - bytes_before["upload"],
+        "bytes_downloaded": after["download"] - bytes_before["download"],
+    }
+
+
+def use_local_storage(root):
+    storage.STORAGE_BACKEND = "local"
+    storage.LOCAL_STORAGE_ROOT = root
+    storage._backends.clear()
+
+
+def run(seconds=20, fps=5, resize=(1280, 720), batch_size=4, threads=None, workdir=None):
+    if threads:
+        torch.set_num_threads(threads)
+    if workdir is None:
+        workdir = tempfile.mkdtemp(prefix="tahleel_bench_")
+        try:
+            return run(seconds, fps, resize, batch_size, threads, workdir)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    use_local_storage(os.path.join(workdir, "storage"))
+    backend = storage.get_storage(BUCKET)
+
+    video_path = generate_match_video(os.path.join(workdir, "match.mp4"), seconds=seconds, fps=25, size=resize)
+    with open(video_path, "rb") as f:
+        backend.upload_bytes("videos/match.mp4", f.read(), content_type="video/mp4")
+    video_url = backend.url("videos/match.mp4")
+
+    detector = YOLOXDetector("yolox_m", "cpu", batch_size=batch_size, pretrained=False)
+    registry.register(detector, "yolox_m", "cpu")
+    results = []
+
+    with job_trace("benchmark") as trace:
+        # Detect: per-frame latency from decode to the frame's record
+        before = storage_bytes()
+        decoded, emitted = [], []
+
+        def timed(frames):
+            for frame in frames:
+                decoded.append(time.perf_counter())
+                yield frame
+
+        with PeakRSS() as rss:
+            start = time.perf_counter()
+            frames, metadata = extract_frames(video_url, fps=fps, resize=resize, stream=True, persist_frames=True)
+            table = run_yolox_detection(timed(frames), batch_size=batch_size, columnar=True,
+                                        progress_callback=lambda done, total: emitted.append(time.perf_counter()))
+            elapsed = time.perf_counter() - start
+        latencies = np.array(emitted) - np.array(decoded[:len(emitted)])
+        results.append(phase("detect", len(table), elapsed, latencies, rss, before))
+
+        # Teams: shirt-color clustering on the ground-truth boxes of the sampled frames
+        before = storage_bytes()
+        stride = round(25 / fps)
+        boxes = player_boxes(seconds * 25, size=resize)
+        team_model = TeamColorModel()
+        latencies = []
+        with PeakRSS() as rss:
+            for i, frame in enumerate(match_frames(seconds * 25, size=resize)):
+                if i % stride:
+                    continue
+                detections = [{"bbox": box.tolist(), "confidence": 1.0} for box in boxes[i]]
+                start = time.perf_counter()
+                detector._assign_teams(frame, detections, team_model)
+                latencies.append(time.perf_counter() - start)
+        results.append(phase("teams", len(latencies), sum(latencies), latencies, rss, before))
+
+        # Serialize: columnar .npz and JSON records to storage
+        before = storage_bytes()
+        with PeakRSS() as rss:
+            start = time.perf_counter()
+            table.metadata = metadata
+            upload_detections_to_gcs(table, "bench")
+            upload_json_to_gcs({"summary": table.summary(), "detections": table.to_records()}, "bench")
+            elapsed = time.perf_counter() - start
+        results.append(phase("serialize", len(table), elapsed, [], rss, before))
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "torch": torch.__version__,
+            "cpus": os.cpu_count(),
+            "torch_threads": torch.get_num_threads(),
+            "video_seconds": seconds,
+            "fps": fps,
+            "resize": list(resize),
+            "batch_size": batch_size,
+        },
+        "phases": {r["phase"]: r for r in results},
+        "stages": trace.summary()["stages"],
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(current, baseline, tolerance=0.15):
+    """Rows of (phase, metric, baseline, current, change, regressed) for the COMPARED metrics"""
+    rows = []
+    for name, result in current["phases"].items():
+        reference = baseline.get("phases", {}).get(name)
+        if not reference:
+            continue
+        for key, higher_is_better in COMPARED:
+            old, new = reference.get(key), result.get(key)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            regressed = change < -tolerance if higher_is_better else change > tolerance
+            rows.append((name, key, old, new, change, regressed))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end analysis pipeline benchmark")
+    parser.add_argument("--seconds", type=int, default=20, help="synthetic video length")
+    parser.add_argument("--fps", type=int, default=5, choices=[1, 5, 25], help="sampling rate (divides 25)")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads")
+    parser.add_argument("--save", default=None, help="write the results as a JSON baseline")
+    parser.add_argument("--compare", default=None, help="JSON baseline to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed relative slowdown")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.seconds, args.fps, (args.width, args.height), args.batch_size, args.threads)
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        meta = results["meta"]
+        print(f"commit {meta['commit']}, {meta['cpus']} CPUs, {meta['torch_threads']} torch threads, "
+              f"{meta['video_seconds']}s video at {meta['fps']} FPS, {meta['resize'][0]}x{meta['resize'][1]}")
+        print(f"{'phase':>10} {'frames':>7} {'FPS':>8} {'p50 ms':>9} {'p95 ms':>9} {'peak RSS':>9} {'uploaded':>10} {'downloaded':>11}")
+        for r in results["phases"].values():
+            print(f"{r['phase']:>10} {r['frames']:>7} {r['fps'] or 0:>8.2f} {r['latency_p50_ms'] or 0:>9.1f} "
+                  f"{r['latency_p95_ms'] or 0:>9.1f} {r['peak_rss_mb']:>7.0f}MB {r['bytes_uploaded'] / 1e6:>8.1f}MB "
+                  f"{r['bytes_downloaded'] / 1e6:>9.1f}MB")
+        print(f"\n{'stage':>18} {'count':>6} {'seconds':>9} {'avg ms':>9} {'max ms':>9}")
+        for stage, s in results["stages"].items():
+            print(f"{stage:>18} {s['count']:>6} {s['seconds']:>9.3f} {s['avg_ms']:>9.2f} {s['max_ms']:>9.2f}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        rows = compare(results, baseline, args.tolerance)
+        print(f"\nvs {args.compare} (commit {baseline.get('meta', {}).get('commit')}):")
+        for name, key, old, new, change, regressed in rows:
+            print(f"{name:>10} {key:>15} {old:>10} -> {new:<10} {change:+.1%}{'  REGRESSION' if regressed else ''}")
+        if any(row[-1] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Precision Benchmark - TAHLEEL.ai
+Accuracy vs speed of each YOLOXDetector precision / compile mode / inference
+backend against torch fp32 on one reference frame set
+(components/precision.py: evaluate_precisions).
+
+Offline (random weights, synthetic frames) only speed and raw output error are meaningful:
+    python -m benchmarks.bench_precision --frames 4
+    python -m benchmarks.bench_precision --precisions fp32 --backends torch onnxruntime
+With real weights and real match frames (a directory of JPEGs) the box metrics are too:
+    python -m benchmarks.bench_precision --pretrained --frames-dir /data/reference_frames
+"""
+
+import argparse
+import glob
+import json
+import os
+
+import cv2
+import torch
+
+from benchmarks.synthetic_video import match_frames
+from components.precision import PRECISIONS, COMPILE_MODES, evaluate_precisions
+from components.inference_backend import BACKENDS
+
+
+def load_frames(frames_dir, limit):
+    paths = sorted(glob.glob(os.path.join(frames_dir, "*.jpg")) + glob.glob(os.path.join(frames_dir, "*.png")))
+    return [cv2.imread(path) for path in paths[:limit]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="YOLOX precision mode accuracy vs speed")
+    parser.add_argument("--frames", type=int, default=4, help="reference frames (one batch)")
+    parser.add_argument("--frames-dir", default=None, help="directory of reference JPEG/PNG frames")
+    parser.add_argument("--precisions", nargs="+", default=list(PRECISIONS), choices=PRECISIONS)
+    parser.add_argument("--compile", nargs="+", default=["none"], choices=COMPILE_MODES)
+    parser.add_argument("--backends", nargs="+", default=["torch"], choices=BACKENDS,
+                        help="onnxruntime runs fp32 without compile modes only")
+    parser.add_argument("--pretrained", action="store_true", help="load real weights from storage")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads")
+    parser.add_argument("--json", action="store_true", help="print rows as JSON")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    frames = load_frames(args.frames_dir, args.frames) if args.frames_dir else list(match_frames(args.frames))
+    modes = [(p, c, b) for b in args.backends for c in args.compile for p in args.precisions
+             if b == "torch" or (p, c) == ("fp32", "none")]
+    rows = evaluate_precisions(frames, modes, pretrained=args.pretrained, repeats=args.repeats)
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    print(f"torch threads: {torch.get_num_threads()}, frames: {len(frames)}")
+    print(f"{'backend':>11} {'precision':>13} {'compile':>8} {'s/frame':>8} {'speedup':>8} {'out err':>8} {'recall':>7} {'prec':>7} {'IoU':>6}")
+    for r in rows:
+        if "error" in r:
+            print(f"{r['backend']:>11} {r['precision']:>13} {r['compile']:>8}  failed: {r['error']}")
+            continue
+        fmt = lambda v: "-" if v is None else f"{v:.3f}"
+        print(f"{r['backend']:>11} {r['precision']:>13} {r['compile']:>8} {r['seconds_per_frame']:>8.3f} {r['speedup']:>7.2f}x "
+              f"{r['output_rel_error']:>8.4f} {fmt(r['box_recall']):>7} {fmt(r['box_precision']):>7} {fmt(r['mean_iou']):>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Multi-Process Serving Benchmark - TAHLEEL.ai
+Throughput and memory of N inference worker processes, as gunicorn.conf.py runs
+them (components/serving.py):
+
+- preload: the model is loaded once in the parent and workers are forked from it
+  (PRELOAD_MODEL=true, MODEL_WARMUP=eager)
+- isolated: every worker loads its own copy after the fork (no preloading)
+
+Each worker pins torch to its share of the CPUs, runs single-frame forward passes
+for --seconds, and reports frames done plus its RSS / PSS. PSS splits shared
+pages between the processes sharing them, so the PSS sum over the parent and
+workers is the real memory footprint; RSS counts shared weights in every worker.
+
+Uses a randomly initialized yolox-m, so no GCS access or weights download is needed:
+    python -m benchmarks.bench_serving --workers 1 2 4 --seconds 20
+"""
+
+import argparse
+import json
+import multiprocessing
+import time
+
+import torch
+
+from benchmarks.synthetic_video import match_frames
+from components.serving import worker_threads, before_fork, configure_worker, memory_stats
+from components.yolox_detector import YOLOXDetector
+
+
+def _load_detector():
+    detector = YOLOXDetector("yolox_m", "cpu", batch_size=1, pretrained=False)
+    detector.detection_cache = None
+    return detector
+
+
+def _worker(detector, threads, seconds, barrier, results):
+    configure_worker(threads)
+    detector = detector or _load_detector()
+    batch = detector._preprocess_frame(next(iter(match_frames(1))))
+    with torch.no_grad():
+        detector._forward(batch)  # warm-up, not timed
+        barrier.wait()
+        frames, deadline = 0, time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            detector._forward(batch)
+            frames += 1
+    results.put({"frames": frames, **memory_stats()})
+
+
+def run_workers(workers, seconds, detector=None, threads=None):
+    """One round of `workers` forked processes; `detector` None = each loads its own"""
+    context = multiprocessing.get_context("fork")
+    threads = threads or worker_threads(workers)
+    barrier = context.Barrier(workers + 1)
+    results = context.Queue()
+    before_fork()
+    processes = [context.Process(target=_worker, args=(detector, threads, seconds, barrier, results))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    barrier.wait()
+    start = time.perf_counter()
+    rows = [results.get() for _ in processes]
+    elapsed = time.perf_counter() - start
+    for process in processes:
+        process.join()
+
+    parent = memory_stats()
+    frames = sum(r["frames"] for r in rows)
+    return {
+        "workers": workers,
+        "torch_threads": threads,
+        "frames": frames,
+        "fps": round(frames / elapsed, 2),
+        "worker_rss_mb": round(max(r["rss_mb"] for r in rows), 1),
+        "worker_private_mb": round(max(r["private_mb"] for r in rows), 1),
+        "total_pss_mb": round(parent["pss_mb"] + sum(r["pss_mb"] for r in rows), 1),
+    }
+
+
+def run(worker_counts=(1, 2, 4), seconds=20, modes=("isolated", "preload"), threads=None):
+    results = []
+    # Isolated rounds first, while the parent holds no model
+    if "isolated" in modes:
+        results += [dict(run_workers(n, seconds, threads=threads), mode="isolated") for n in worker_counts]
+    if "preload" in modes:
+        detector = _load_detector()
+        results += [dict(run_workers(n, seconds, detector, threads=threads), mode="preload") for n in worker_counts]
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-process YOLOX serving throughput and memory")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--modes", nargs="+", default=["isolated", "preload"], choices=["isolated", "preload"])
+    parser.add_argument("--threads", type=int, default=None, help="torch threads per worker (default: CPUs / workers)")
+    parser.add_argument("--json", action="store_true", help="print rows as JSON")
+    args = parser.parse_args()
+
+    rows = run(args.workers, args.seconds, args.modes, args.threads)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    print(f"CPUs: {multiprocessing.cpu_count()}")
+    print(f"{'mode':>9} {'workers':>8} {'threads':>8} {'FPS':>7} {'worker RSS':>11} {'private':>8} {'total PSS':>10}")
+    for r in rows:
+        print(f"{r['mode']:>9} {r['workers']:>8} {r['torch_threads']:>8} {r['fps']:>7.2f} "
+              f"{r['worker_rss_mb']:>9.0f}MB {r['worker_private_mb']:>6.0f}MB {r['total_pss_mb']:>8.0f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Startup Benchmark - TAHLEEL.ai
+Cold-start cost of both apps, each measured in a fresh interpreter with
+MODEL_WARMUP=lazy (model loading is reported separately by the registry):
+
+- import: `python -X importtime -c "import app"`, broken down by top-level
+  package and by the slowest individual modules (cumulative and self time)
+- first response: wall time from interpreter start until /health/live answers,
+  next to a bare `python -c pass` for the interpreter's own share
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --modules torch cv2 anthropic
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APPS = ("app", "main")
+
+# Imports the app plus a /health/live request, timed from inside the child
+FIRST_RESPONSE = """
+import time, sys
+start = time.perf_counter()
+import {module}
+{request}
+assert status == 200, status
+print(time.perf_counter() - start)
+"""
+REQUESTS = {
+    "app": "status = app.app.test_client().get('/health/live').status_code",
+    "main": "from fastapi.testclient import TestClient\n"
+            "status = TestClient(main.app).get('/health/live').status_code",
+}
+
+
+def _python(args, env=None):
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, *args], capture_output=True, text=True, cwd=ROOT,
+                          env={**os.environ, "MODEL_WARMUP": "lazy", **(env or {})})
+    elapsed = time.perf_counter() - start
+    if proc.returncode:
+        raise RuntimeError(f"{' '.join(args)} failed:\n{proc.stderr[-2000:]}")
+    return proc, elapsed
+
+
+def parse_importtime(stderr):
+    """[(module, self_us, cumulative_us, depth)] from -X importtime output"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def breakdown(rows):
+    """Self time per top-level package, seconds, slowest first"""
+    packages = {}
+    for name, self_us, _, _ in rows:
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+    return {p: round(us / 1e6, 4) for p, us in sorted(packages.items(), key=lambda kv: -kv[1])}
+
+
+def loaded(module, candidates):
+    """Which of `candidates` are in sys.modules after importing `module`"""
+    code = f"import sys, json, {module}; print(json.dumps([m for m in {list(candidates)!r} if m in sys.modules]))"
+    proc, _ = _python(["-c", code])
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def measure(module, top=10, repeat=3, modules=()):
+    proc, _ = _python(["-X", "importtime", "-c", f"import {module}"])
+    rows = parse_importtime(proc.stderr)
+    first_response = []
+    for _ in range(repeat):
+        proc, _ = _python(["-c", FIRST_RESPONSE.format(module=module, request=REQUESTS[module])])
+        first_response.append(float(proc.stdout.strip().splitlines()[-1]))
+    result = {
+        "import_seconds": round(sum(r[1] for r in rows) / 1e6, 3),
+        "first_response_seconds": round(min(first_response), 3),
+        "packages": breakdown(rows),
+        "slowest_cumulative": [(n, round(c / 1e6, 4)) for n, _, c, _ in sorted(rows, key=lambda r: -r[2])[:top]],
+        "slowest_self": [(n, round(s / 1e6, 4)) for n, s, _, _ in sorted(rows, key=lambda r: -r[1])[:top]],
+    }
+    if modules:
+        result["loaded"] = loaded(module, modules)
+    return result
+
+
+def run(apps=APPS, top=10, repeat=3, modules=()):
+    interpreter = min(_python(["-c", "pass"])[1] for _ in range(repeat))
+    return {"interpreter_seconds": round(interpreter, 3),
+            "apps": {module: measure(module, top, repeat, modules) for module in apps}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time and time to first response of the apps")
+    parser.add_argument("--apps", nargs="+", default=list(APPS), choices=APPS)
+    parser.add_argument("--top", type=int, default=10, help="slowest modules / packages to list")
+    parser.add_argument("--repeat", type=int, default=3, help="cold starts per app (best is reported)")
+    parser.add_argument("--modules", nargs="*", default=["torch", "cv2", "numpy", "anthropic", "yolox"],
+                        help="report which of these the import pulls in")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.apps, args.top, args.repeat, args.modules)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"bare interpreter: {results['interpreter_seconds'] * 1000:.0f} ms")
+    for module, r in results["apps"].items():
+        print(f"\n== {module}: import {r['import_seconds'] * 1000:.0f} ms, "
+              f"first /health/live {r['first_response_seconds'] * 1000:.0f} ms after start")
+        if "loaded" in r:
+            print(f"   heavy modules loaded at import: {', '.join(r['loaded']) or 'none'}")
+        print(f"{'package':>28} {'self ms':>9}")
+        for package, seconds in list(r["packages"].items())[:args.top]:
+            print(f"{package:>28} {seconds * 1000:>9.1f}")
+        print(f"{'module (cumulative)':>28} {'ms':>9}")
+        for name, seconds in r["slowest_cumulative"]:
+            print(f"{name:>28} {seconds * 1000:>9.1f}")
+        print(f"{'module (self)':>28} {'ms':>9}")
+        for name, seconds in r["slowest_self"]:
+            print(f"{name:>28} {seconds * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
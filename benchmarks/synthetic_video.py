@@ -0,0 +1,105 @@
+"""
+Synthetic Match Video - TAHLEEL.ai
+Deterministic, match-like test videos for offline benchmarks: a striped green pitch
+with touchlines, two teams of players in distinct kit colors, a referee and a ball,
+all moving smoothly. No real footage or GCS access needed.
+"""
+
+import argparse
+
+import cv2
+import numpy as np
+
+TEAM_COLORS = ((200, 40, 40), (40, 40, 210))  # BGR: blue kit, red kit
+REFEREE_COLOR = (20, 20, 20)
+SHORTS_COLOR = (235, 235, 235)
+
+
+def make_pitch(width, height):
+    pitch = np.zeros((height, width, 3), np.uint8)
+    stripe = max(1, width // 12)
+    for i, x in enumerate(range(0, width, stripe)):
+        pitch[:, x:x + stripe] = (40, 130, 40) if i % 2 == 0 else (50, 150, 50)
+    white = (230, 230, 230)
+    cv2.rectangle(pitch, (width // 20, height // 12), (width - width // 20, height - height // 12), white, 2)
+    cv2.line(pitch, (width // 2, height // 12), (width // 2, height - height // 12), white, 2)
+    cv2.circle(pitch, (width // 2, height // 2), height // 8, white, 2)
+    return pitch
+
+
+def player_tracks(num_frames, width, height, players_per_team=11, seed=0):
+    """(num_frames, n_players, 2) player centers plus a color per player"""
+    rng = np.random.default_rng(seed)
+    n = players_per_team * 2 + 1
+    start = rng.uniform((width * 0.1, height * 0.15), (width * 0.9, height * 0.85), (n, 2))
+    phase = rng.uniform(0, 2 * np.pi, (n, 2))
+    amplitude = rng.uniform(width * 0.02, width * 0.12, (n, 2))
+    speed = rng.uniform(0.01, 0.05, (n, 1))
+    t = np.arange(num_frames)[:, None, None]
+    centers = start[None] + amplitude[None] * np.sin(speed[None] * t + phase[None])
+    colors = [TEAM_COLORS[0]] * players_per_team + [TEAM_COLORS[1]] * players_per_team + [REFEREE_COLOR]
+    return centers, colors
+
+
+def player_size(width, height):
+    return max(6, width // 80), max(16, height // 18)
+
+
+def player_boxes(num_frames, size=(1280, 720), players_per_team=11, seed=0):
+    """(num_frames, n_players, 4) xyxy ground-truth boxes (head to shorts) of match_frames()"""
+    width, height = size
+    centers, _ = player_tracks(num_frames, width, height, players_per_team, seed)
+    pw, ph = player_size(width, height)
+    x1 = centers[..., 0].astype(int) - pw // 2
+    y1 = centers[..., 1].astype(int) - ph // 2
+    return np.stack([x1, y1 - 2 * pw // 3, x1 + pw, y1 + ph * 3 // 4], axis=-1)
+
+
+def render_frame(pitch, centers, colors, ball, player_size):
+    frame = pitch.copy()
+    pw, ph = player_size
+    for (cx, cy), color in zip(centers.astype(int), colors):
+        x1, y1 = cx - pw // 2, cy - ph // 2
+        cv2.rectangle(frame, (x1, y1), (x1 + pw, y1 + ph // 2), color, -1)                    # shirt
+        cv2.rectangle(frame, (x1, y1 + ph // 2), (x1 + pw, y1 + ph * 3 // 4), SHORTS_COLOR, -1)  # shorts
+        cv2.circle(frame, (cx, y1 - pw // 3), pw // 3, (140, 170, 210), -1)                    # head
+    cv2.circle(frame, tuple(int(v) for v in ball), max(2, pw // 4), (255, 255, 255), -1)
+    return frame
+
+
+def match_frames(num_frames, size=(1280, 720), players_per_team=11, seed=0):
+    """Yield `num_frames` synthetic match frames (BGR) without writing a video"""
+    width, height = size
+    pitch = make_pitch(width, height)
+    centers, colors = player_tracks(num_frames, width, height, players_per_team, seed)
+    ball_path = centers[:, 0] + np.array([width * 0.01, height * 0.04])
+    size = player_size(width, height)
+    for i in range(num_frames):
+        yield render_frame(pitch, centers[i], colors, ball_path[i], size)
+
+
+def generate_match_video(path, seconds=10, fps=30, size=(1280, 720), players_per_team=11, seed=0):
+    """Write a synthetic match video and return its path"""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+    if not writer.isOpened():
+        raise RuntimeError(f"Could not open video writer for {path}")
+    for frame in match_frames(int(seconds * fps), size, players_per_team, seed):
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic match video")
+    parser.add_argument("path")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    args = parser.parse_args()
+    generate_match_video(args.path, args.seconds, args.fps, (args.width, args.height))
+    print(f"✅ Wrote {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Analysis Pipeline - TAHLEEL.ai
+Frames → YOLOX detection → Claude tactical analysis → GCS, run by a background job worker
+"""
+
+import os
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+GCS_BUCKET = os.getenv("GCS_BUCKET_NAME", "tahleel-ai-videos")
+
+# Frames are streamed from extraction into detection in memory; persisting them
+# to GCS is an optional background side output.
+PERSIST_FRAMES = os.getenv("PERSIST_FRAMES", "true").lower() == "true"
+
+PIPELINE_FPS = 5
+PIPELINE_RESIZE = (1280, 720)
+PIPELINE_MODEL = "yolox_m"
+# none | process | queue (components/sharding.py)
+SHARD_BACKEND = os.getenv("SHARD_BACKEND", "none")
+
+
+def pipeline_params():
+    """
+    Everything that changes the analysis result for the same video; part of the result cache key.
+    "weights" is None until the checkpoint has been downloaded, and such keys must not be cached.
+    """
+    from components.yolox_detector import (CONF_THRESH, NMS_THRESH, YOLOX_KEYFRAME_INTERVAL, TRACKING_ENABLED,
+                                           YOLOX_BACKEND, YOLOX_COMPILE, weights_path, weights_fingerprint)
+    from components.frame_sampler import (ADAPTIVE_SAMPLING, SAMPLING_MIN_FPS, SAMPLING_MAX_FPS, MOTION_HIGH,
+                                          PITCH_MIN_GREEN, SCENE_CUT_THRESHOLD)
+    from components.tracker import TRACK_HIGH_THRESH, TRACK_MATCH_IOU, TRACK_MAX_LOST, FLOW_WIDTH
+    from components.team_classifier import TEAM_MIN_SAMPLES, TEAM_MOMENTUM
+    from components.model_registry import DEFAULT_PRECISION
+    from utils.detection_cache import DETECTION_CACHE_ENABLED, DETECTION_CACHE_HASH
+    return {
+        "fps": PIPELINE_FPS,
+        "adaptive_sampling": [SAMPLING_MIN_FPS, SAMPLING_MAX_FPS, MOTION_HIGH, PITCH_MIN_GREEN,
+                              SCENE_CUT_THRESHOLD] if ADAPTIVE_SAMPLING else False,
+        "resize": list(PIPELINE_RESIZE),
+        "model_name": PIPELINE_MODEL,
+        # A new checkpoint deployed at the same path changes the key
+        "weights": weights_fingerprint(weights_path(PIPELINE_MODEL)),
+        # int8 / bf16, compile modes and the ONNX Runtime kernels move boxes
+        "precision": DEFAULT_PRECISION,
+        "compile": YOLOX_COMPILE,
+        "backend": YOLOX_BACKEND,
+        "conf_thresh": CONF_THRESH,
+        "nms_thresh": NMS_THRESH,
+        # Non-exact frame hashes reuse detections across near-duplicate frames
+        "detection_cache_hash": DETECTION_CACHE_HASH if DETECTION_CACHE_ENABLED else False,
+        "keyframe_interval": YOLOX_KEYFRAME_INTERVAL,
+        "tracking": [TRACK_HIGH_THRESH, TRACK_MATCH_IOU, TRACK_MAX_LOST, FLOW_WIDTH] \
+            if TRACKING_ENABLED or YOLOX_KEYFRAME_INTERVAL > 1 else False,
+        "teams": [TEAM_MIN_SAMPLES, TEAM_MOMENTUM],
+    }
+
+
+def run_analysis(payload, progress):
+    """
+    Job handler for "analysis" jobs. payload: {"video_id", "gcs_url", optional "cache_key"}
+    With a cache_key the finished result is stored in the result cache.
+    """
+    from utils.cloud_storage import upload_json_to_gcs, upload_detections_to_gcs
+    from components.frame_extractor import extract_frames
+    from components.yolox_detector import run_yolox_detection
+    from components.tactical_processor import process_tactical_analysis
+    from utils.metrics import span
+    
+    video_id = payload["video_id"]
+    gcs_url = payload["gcs_url"]
+    
+    if SHARD_BACKEND != "none":
+        # Steps 2-3 per time-range shard, in parallel processes or queued shard jobs
+        from components.sharding import run_sharded_detection
+        progress.stage("extracting")
+        detections, metadata = run_sharded_detection(video_id, gcs_url, PIPELINE_FPS, PIPELINE_RESIZE,
+                                                     persist_frames=PERSIST_FRAMES, progress=progress)
+    else:
+        # Step 2: Stream frames (decoded in memory, optionally persisted in background)
+        progress.stage("extracting")
+        frames, metadata = extract_frames(gcs_url, fps=PIPELINE_FPS, resize=PIPELINE_RESIZE, stream=True, persist_frames=PERSIST_FRAMES)
+        if metadata.get("error"):
+            raise RuntimeError(f"Frame extraction failed: {metadata['error']}")
+        
+        # Step 3: Run YOLOX detection directly on the streamed frames
+        progress.stage("detecting", frames_total=metadata.get("expected_frames"))
+        detections = run_yolox_detection(frames, progress_callback=progress.frames, columnar=True)
+    if not detections:
+        raise RuntimeError("Frame extraction failed: no frames decoded")
+    
+    # Step 4: TACTICAL ANALYSIS with Claude AI
+    progress.stage("analyzing")
+    with span("tactical_analysis"):
+        tactical_report = process_tactical_analysis(video_id, detections, metadata)
+    
+    # Save complete analysis to GCS
+    progress.stage("saving")
+    upload_json_to_gcs(tactical_report, f"{video_id}-tactical-report")
+    detections.metadata = metadata
+    upload_detections_to_gcs(detections, video_id)
+    
+    result = {
+        **tactical_report,
+        "gcs_url": gcs_url,
+        "storage": {
+            "video_url": gcs_url,
+            "frames_folder": f"gs://{GCS_BUCKET}/frames/{video_id}/" if PERSIST_FRAMES else None,
+            "tactical_report": f"gs://{GCS_BUCKET}/results/{video_id}-tactical-report.json",
+            "detections": f"gs://{GCS_BUCKET}/results/{video_id}-detections.npz"
+        },
+        "detections_summary": detections.summary(),
+        "message": "Complete tactical analysis ready for coach!",
+        "ready_for": "Arab League presentation"
+    }
+    
+    if payload.get("cache_key"):
+        from utils.result_cache import get_result_cache
+        get_result_cache().put(payload["cache_key"], result)
+    
+    return result
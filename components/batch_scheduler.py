@@ -0,0 +1,246 @@
+"""
+Inference Scheduler - TAHLEEL.ai
+Dynamic batching for a shared detector: frames submitted by concurrent requests
+are queued, gathered into one batch of up to SCHEDULER_MAX_BATCH frames (waiting
+at most SCHEDULER_MAX_WAIT_MS after the oldest frame arrived), run as a single
+forward pass on one thread, and handed back to each caller through a Future.
+
+Fairness: every job (request) has its own queue and batches take frames from the
+jobs round-robin, so a job submitting many frames cannot starve the others.
+
+stats() reports batch sizes, jobs per batch, queue wait / forward / end-to-end
+latency percentiles and throughput, for tuning max batch and max wait.
+
+torch and numpy are imported on first use, so app.py can import this module at
+startup for free.
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+INFERENCE_SCHEDULER = os.getenv("INFERENCE_SCHEDULER", "true").lower() == "true"
+SCHEDULER_MAX_BATCH = int(os.getenv("SCHEDULER_MAX_BATCH", "8"))
+SCHEDULER_MAX_WAIT_MS = float(os.getenv("SCHEDULER_MAX_WAIT_MS", "10"))
+# Latency samples kept for percentiles
+_WINDOW = 1000
+
+
+class _Request:
+    __slots__ = ("tensor", "job", "future", "submitted")
+
+    def __init__(self, tensor, job):
+        self.tensor = tensor
+        self.job = job
+        self.future = Future()
+        self.submitted = time.perf_counter()
+
+
+class InferenceScheduler:
+    """
+    `forward(batch) -> outputs` is called with (n, 3, H, W) batches from a single
+    scheduler thread, started on first use. Submitted tensors must not change
+    until their future resolves (the batch is copied when it is formed).
+    """
+
+    def __init__(self, forward, max_batch=SCHEDULER_MAX_BATCH, max_wait_ms=SCHEDULER_MAX_WAIT_MS, name="yolox"):
+        self.forward = forward
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.name = name
+        self._queues = OrderedDict()  # job -> deque of _Request, in round-robin order
+        self._pending = 0
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closed = False
+        self._stats_lock = threading.Lock()
+        self._reset_stats()
+
+    # Callers
+
+    def submit(self, img_tensor, job=None):
+        """Queue one frame ((3, H, W) or (1, 3, H, W)); the Future resolves to its (1, ...) output"""
+        job = threading.get_ident() if job is None else job
+        request = _Request(img_tensor if img_tensor.dim() == 4 else img_tensor.unsqueeze(0), job)
+        if len(request.tensor) != 1:
+            raise ValueError(f"submit() takes one frame, got a batch of {len(request.tensor)}")
+        with self._cond:
+            if self._closed:
+                raise RuntimeError(f"Inference scheduler '{self.name}' is closed")
+            self._queues.setdefault(request.job, deque()).append(request)
+            self._pending += 1
+            self._ensure_thread()
+            self._cond.notify()
+        return request.future
+
+    def infer(self, img_tensor, job=None, timeout=None):
+        """Outputs for a (n, 3, H, W) batch, each frame scheduled separately; blocks until all are done"""
+        import torch
+
+        futures = [self.submit(frame, job) for frame in img_tensor]
+        return torch.cat([future.result(timeout) for future in futures])
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    # Scheduler thread
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"{self.name}-scheduler", daemon=True)
+            self._thread.start()
+            logger.info(f"🧮 Inference scheduler '{self.name}': batches of up to {self.max_batch}, {self.max_wait * 1000:g} ms max wait")
+
+    def _oldest(self):
+        return min(q[0].submitted for q in self._queues.values())
+
+    def _take_batch(self):
+        """Up to max_batch requests, one per job per round"""
+        batch = []
+        while len(batch) < self.max_batch and self._queues:
+            job, requests = next(iter(self._queues.items()))
+            batch.append(requests.popleft())
+            # Move the job to the back of the rotation, or drop it when drained
+            del self._queues[job]
+            if requests:
+                self._queues[job] = requests
+        self._pending -= len(batch)
+        return batch
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                deadline = self._oldest() + self.max_wait
+                while self._pending < self.max_batch and not self._closed:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._take_batch()
+            self._execute(batch)
+
+    def _execute(self, batch):
+        import torch
+
+        started = time.perf_counter()
+        try:
+            outputs = self.forward(torch.cat([request.tensor for request in batch]))
+        except Exception as e:
+            logger.error(f"❌ Scheduled batch of {len(batch)} failed: {e}")
+            for request in batch:
+                request.future.set_exception(e)
+            return
+        finished = time.perf_counter()
+        for i, request in enumerate(batch):
+            request.future.set_result(outputs[i:i + 1])
+        self._record(batch, started, finished)
+
+    # Stats
+
+    def _reset_stats(self):
+        self._batches = 0
+        self._frames = 0
+        self._batch_jobs = 0
+        self._batch_sizes = {}
+        self._wait = deque(maxlen=_WINDOW)
+        self._forward = deque(maxlen=_WINDOW)
+        self._latency = deque(maxlen=_WINDOW)
+        self._started_at = time.perf_counter()
+        self._busy = 0.0
+
+    def _record(self, batch, started, finished):
+        with self._stats_lock:
+            self._batches += 1
+            self._frames += len(batch)
+            self._batch_jobs += len({request.job for request in batch})
+            self._batch_sizes[len(batch)] = self._batch_sizes.get(len(batch), 0) + 1
+            self._forward.append(finished - started)
+            self._busy += finished - started
+            for request in batch:
+                self._wait.append(started - request.submitted)
+                self._latency.append(finished - request.submitted)
+
+    def stats(self):
+        import numpy as np
+
+        def percentiles(samples):
+            if not samples:
+                return None
+            p50, p95 = np.percentile(np.array(samples) * 1000, [50, 95])
+            return {"p50": round(float(p50), 2), "p95": round(float(p95), 2)}
+
+        with self._cond:
+            pending = self._pending
+            jobs = len(self._queues)
+        with self._stats_lock:
+            elapsed = time.perf_counter() - self._started_at
+            return {
+                "max_batch": self.max_batch,
+                "max_wait_ms": self.max_wait * 1000,
+                "pending": pending,
+                "waiting_jobs": jobs,
+                "batches": self._batches,
+                "frames": self._frames,
+                "avg_batch": round(self._frames / self._batches, 2) if self._batches else None,
+                "batch_sizes": dict(sorted(self._batch_sizes.items())),
+                "avg_jobs_per_batch": round(self._batch_jobs / self._batches, 2) if self._batches else None,
+                "queue_wait_ms": percentiles(self._wait),
+                "forward_ms": percentiles(self._forward),
+                "latency_ms": percentiles(self._latency),
+                "throughput_fps": round(self._frames / elapsed, 2) if elapsed else None,
+                "utilization": round(self._busy / elapsed, 3) if elapsed else None,
+            }
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._reset_stats()
+
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(model_name=None, device=None, precision=None):
+    """Process-wide scheduler in front of the registry's shared detector"""
+    from components.model_registry import registry, DEFAULT_MODEL, DEFAULT_DEVICE, DEFAULT_PRECISION
+
+    key = (model_name or DEFAULT_MODEL, device or DEFAULT_DEVICE, precision or DEFAULT_PRECISION)
+    with _schedulers_lock:
+        scheduler = _schedulers.get(key)
+    if scheduler is not None:
+        return scheduler
+    # Loading can take seconds: do it outside the lock so stats and other models are not held up.
+    # The registry loads each model once; a scheduler built by a losing racer is never started.
+    detector = registry.get(*key)
+    with _schedulers_lock:
+        return _schedulers.setdefault(key, InferenceScheduler(detector._forward, name=key[0]))
+
+
+def scheduler_stats():
+    with _schedulers_lock:
+        return {f"{k[0]}/{k[1]}/{k[2]}": s.stats() for k, s in _schedulers.items()}
+
+
+def _reset_after_fork():
+    """Scheduler threads do not survive a fork; forked workers start their own"""
+    global _schedulers, _schedulers_lock
+    _schedulers = {}
+    _schedulers_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
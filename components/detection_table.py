@@ -0,0 +1,221 @@
+"""
+Detection Table - TAHLEEL.ai
+Columnar container for a video's detections: one NumPy structured array of
+frames and one of boxes, instead of a dict per frame holding a dict per box.
+Stored as a compressed .npz; per-frame JSON records are only built on request.
+
+It still behaves like the old list of frame records (len, indexing, iteration
+yield the same dicts), so consumers of run_yolox_detection keep working.
+"""
+
+import io
+import json
+
+import numpy as np
+
+# One row per box, sorted by frame; frame_idx is the row in `frames`
+BOX_DTYPE = np.dtype([
+    ("frame_idx", "<i4"),
+    ("x1", "<i4"), ("y1", "<i4"), ("x2", "<i4"), ("y2", "<i4"),
+    ("conf", "<f4"),
+    ("class_id", "<i2"),
+    ("team_id", "<i1"),  # -1 = not assigned
+    ("track_id", "<i4"),  # -1 = not tracked
+])
+
+# One row per frame; its boxes are boxes[box_start:box_start + box_count]
+FRAME_DTYPE = np.dtype([
+    ("frame_number", "<i4"),
+    ("timestamp_ms", "<f8"),  # NaN when unknown
+    ("box_start", "<i8"),
+    ("box_count", "<i4"),
+    ("propagated", "?"),  # boxes moved from the previous frame instead of detected
+])
+
+CLASS_NAMES = {0: "person", 32: "sports ball"}
+FORMAT_VERSION = 2
+
+
+class DetectionTable:
+    def __init__(self, frames=None, boxes=None, frame_urls=None, errors=None, metadata=None):
+        self._frames = frames if frames is not None else np.zeros(0, dtype=FRAME_DTYPE)
+        self._boxes = boxes if boxes is not None else np.zeros(0, dtype=BOX_DTYPE)
+        self._urls = list(frame_urls) if frame_urls is not None else [None] * len(self._frames)
+        self.errors = dict(errors or {})  # frame row -> error message
+        self.metadata = metadata or {}
+        self._pending_frames = []
+        self._pending_boxes = []
+        self._pending_box_count = 0
+
+    # Building
+
+    def append(self, record):
+        """Add one frame record as produced by run_yolox_detection"""
+        dets = record.get('player_detections', []) + record.get('ball_detections', [])
+        self.append_arrays(
+            record['frame_number'],
+            np.array([det['bbox'] for det in dets], dtype=np.int64).reshape(-1, 4),
+            [det['conf'] for det in dets],
+            [det.get('team_id', -1) for det in dets],
+            class_ids=[det.get('class_id', 0) for det in dets],
+            track_ids=[det.get('track_id', -1) for det in dets],
+            frame_url=record.get('frame_url'),
+            timestamp_ms=record.get('timestamp_ms'),
+            error=record.get('error'),
+            propagated=record.get('propagated', False),
+        )
+
+    def append_arrays(self, frame_number, boxes, scores, team_ids=None, class_ids=None, frame_url=None,
+                      timestamp_ms=None, error=None, track_ids=None, propagated=False):
+        """Add one frame from (N, 4) boxes and (N,) scores / team ids / class ids (default person) / track ids"""
+        row = len(self._frames) + len(self._pending_frames)
+        box_start = len(self._boxes) + self._pending_box_count
+        boxes = np.asarray(boxes).reshape(-1, 4)
+
+        rows = np.zeros(len(boxes), dtype=BOX_DTYPE)
+        if len(rows):
+            rows["frame_idx"] = row
+            rows["x1"], rows["y1"], rows["x2"], rows["y2"] = boxes.T
+            rows["conf"] = scores
+            rows["class_id"] = 0 if class_ids is None else class_ids
+            rows["team_id"] = -1 if team_ids is None else team_ids
+            rows["track_id"] = -1 if track_ids is None else track_ids
+
+        self._pending_frames.append((frame_number, np.nan if timestamp_ms is None else timestamp_ms, box_start, len(rows),
+                                     propagated))
+        self._pending_boxes.append(rows)
+        self._pending_box_count += len(rows)
+        self._urls.append(frame_url)
+        if error:
+            self.errors[row] = error
+
+    def _compact(self):
+        if self._pending_frames:
+            self._frames = np.concatenate([self._frames, np.array(self._pending_frames, dtype=FRAME_DTYPE)])
+            self._boxes = np.concatenate([self._boxes] + self._pending_boxes)
+            self._pending_frames = []
+            self._pending_boxes = []
+            self._pending_box_count = 0
+
+    @classmethod
+    def from_records(cls, records, metadata=None):
+        table = cls(metadata=metadata)
+        for record in records:
+            table.append(record)
+        table._compact()
+        return table
+
+    # Columns
+
+    @property
+    def frames(self):
+        self._compact()
+        return self._frames
+
+    @property
+    def boxes(self):
+        self._compact()
+        return self._boxes
+
+    @property
+    def frame_urls(self):
+        return list(self._urls)
+
+    def frame_boxes(self, row):
+        frame = self.frames[row]
+        return self.boxes[frame["box_start"]:frame["box_start"] + frame["box_count"]]
+
+    # Record view (same dicts run_yolox_detection used to return)
+
+    def __len__(self):
+        return len(self._frames) + len(self._pending_frames)
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self.record(row)
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self.record(i) for i in range(*row.indices(len(self)))]
+        if row < 0:
+            row += len(self)
+        return self.record(row)
+
+    def record(self, row):
+        frame = self.frames[row]
+        record = {'frame_number': int(frame["frame_number"]), 'frame_url': self._urls[row]}
+        if row in self.errors:
+            record.update(player_detections=[], ball_detections=[], error=self.errors[row])
+        else:
+            players, balls = [], []
+            for box in self.frame_boxes(row).tolist():
+                _, x1, y1, x2, y2, conf, class_id, team_id, track_id = box
+                det = {'bbox': [x1, y1, x2, y2], 'conf': conf, 'class_id': class_id,
+                       'class_name': CLASS_NAMES.get(class_id, str(class_id))}
+                if team_id >= 0:
+                    det['team_id'] = team_id
+                if track_id >= 0:
+                    det['track_id'] = track_id
+                (players if class_id == 0 else balls).append(det)
+            record.update(player_detections=players, ball_detections=balls, total_players=len(players))
+        if not np.isnan(frame["timestamp_ms"]):
+            record['timestamp_ms'] = float(frame["timestamp_ms"])
+        if frame["propagated"]:
+            record['propagated'] = True
+        return record
+
+    def to_records(self):
+        return list(self)
+
+    def summary(self):
+        boxes = self.boxes
+        players = int(np.count_nonzero(boxes["class_id"] == 0))
+        return {
+            "frames": len(self),
+            "boxes": len(boxes),
+            "failed_frames": len(self.errors),
+            "avg_players": round(players / len(self), 2) if len(self) else 0.0,
+            "tracks": len(np.unique(boxes["track_id"][boxes["track_id"] >= 0])),
+            "propagated_frames": int(np.count_nonzero(self.frames["propagated"])),
+        }
+
+    # Serialization
+
+    def to_bytes(self):
+        """Compressed .npz: frames, boxes, frame_urls and a JSON header (errors, metadata)"""
+        header = {"version": FORMAT_VERSION, "errors": {str(k): v for k, v in self.errors.items()}, "metadata": self.metadata}
+        buf = io.BytesIO()
+        np.savez_compressed(
+            buf,
+            frames=self.frames,
+            boxes=self.boxes,
+            frame_urls=np.array([url or "" for url in self._urls], dtype=str),
+            header=np.frombuffer(json.dumps(header, default=str).encode("utf-8"), dtype=np.uint8),
+        )
+        return buf.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data):
+        with np.load(io.BytesIO(data), allow_pickle=False) as npz:
+            header = json.loads(npz["header"].tobytes().decode("utf-8"))
+            if header.get("version") not in (1, FORMAT_VERSION):
+                raise ValueError(f"Unsupported detection table version: {header.get('version')}")
+            return cls(
+                frames=_upgrade(npz["frames"], FRAME_DTYPE),
+                boxes=_upgrade(npz["boxes"], BOX_DTYPE),
+                frame_urls=[url or None for url in npz["frame_urls"].tolist()],
+                errors={int(k): v for k, v in header["errors"].items()},
+                metadata=header["metadata"],
+            )
+
+
+def _upgrade(array, dtype):
+    """Version 1 tables lack track_id / propagated: copy shared fields, untracked defaults for the rest"""
+    if array.dtype == dtype:
+        return array
+    upgraded = np.zeros(len(array), dtype=dtype)
+    if "track_id" in dtype.names:
+        upgraded["track_id"] = -1
+    for name in array.dtype.names:
+        upgraded[name] = array[name]
+    return upgraded
@@ -4,31 +4,45 @@ Extract frames from uploaded videos at 5 FPS
 """
 
 import cv2
+import math
 import numpy as np
 import os
-from google.cloud import storage
+import queue
+import threading
+import time
+from collections import namedtuple
 from tempfile import NamedTemporaryFile
 import logging
 
+from components.frame_sampler import FrameSampler, AdaptiveSampler, ADAPTIVE_SAMPLING, SAMPLING_MIN_FPS, SAMPLING_MAX_FPS
+from utils.storage import get_storage, storage_for_url
+from utils.transfer_manager import get_transfer_manager
+from utils.metrics import span, observe, propagate
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 GCS_BUCKET = os.getenv("GCS_BUCKET_NAME", "tahleel-ai-videos")
+FRAME_QUEUE_SIZE = int(os.getenv("FRAME_QUEUE_SIZE", "64"))
+# Frames per bulk upload when persisting synchronously (legacy extract_frames mode)
+FRAME_UPLOAD_BATCH = int(os.getenv("FRAME_UPLOAD_BATCH", "64"))
+FRAME_SAMPLING = os.getenv("FRAME_SAMPLING", "auto")
+
+# A decoded frame travelling from extraction straight into detection.
+# `url` is where the frame is (or will be) persisted, or None; `source_index`
+# and `timestamp_ms` locate it in the original video.
+Frame = namedtuple("Frame", ["number", "image", "url", "source_index", "timestamp_ms"], defaults=(None, None))
 
 def download_video_from_gcs(gcs_url):
     """Download video from GCS to temp file"""
     try:
         logger.info(f"📥 Downloading video from {gcs_url}")
         
-        client = storage.Client()
-        bucket_name = gcs_url.replace("gs://", "").split("/")[0]
-        blob_path = "/".join(gcs_url.replace("gs://", "").split("/")[1:])
-        
-        bucket = client.bucket(bucket_name)
-        blob = bucket.blob(blob_path)
+        backend, blob_path = storage_for_url(gcs_url)
         
         temp_file = NamedTemporaryFile(delete=False, suffix=".mp4")
-        blob.download_to_filename(temp_file.name)
+        with span("video_download"):
+            backend.download_to_file(blob_path, temp_file.name)
         
         logger.info(f"✅ Downloaded to {temp_file.name}")
         return temp_file.name
@@ -40,104 +54,282 @@ def download_video_from_gcs(gcs_url):
 def upload_frame_to_gcs(frame_data, video_id, frame_number):
     """Upload frame image to GCS"""
     try:
-        client = storage.Client()
-        bucket = client.bucket(GCS_BUCKET)
-        
-        frame_path = f"frames/{video_id}/frame_{frame_number:04d}.jpg"
-        blob = bucket.blob(frame_path)
-        
         # Encode frame as JPEG
         success, jpg_data = cv2.imencode('.jpg', frame_data, [cv2.IMWRITE_JPEG_QUALITY, 85])
         
         if not success:
             raise Exception("Frame encoding failed")
         
-        blob.upload_from_string(jpg_data.tobytes(), content_type="image/jpeg")
-        
-        return f"gs://{GCS_BUCKET}/{frame_path}"
+        return get_storage(GCS_BUCKET).upload_bytes(frame_path(video_id, frame_number), jpg_data.tobytes(), content_type="image/jpeg")
         
     except Exception as e:
         logger.error(f"❌ Frame upload error: {e}")
         return None
 
-def extract_frames(gcs_video_url, fps=5, resize=(1280, 720)):
+def frame_path(video_id, frame_number):
+    return f"frames/{video_id}/frame_{frame_number:04d}.jpg"
+
+
+class FramePersister:
     """
-    Extract frames from video at specified FPS
-    Returns: (list of frame URLs, metadata dict)
+    Asynchronous side output that uploads frames to GCS on a background thread.
+    Queued frames are drained in batches and uploaded concurrently by the
+    shared TransferManager (retries with backoff).
+    Never blocks the caller: when the bounded queue is full the frame is dropped
+    from persistence (detection still sees it).
     """
     
-    logger.info(f"🎬 Starting frame extraction from {gcs_video_url}")
+    def __init__(self, video_id, max_pending=FRAME_QUEUE_SIZE):
+        self.video_id = video_id
+        self.uploaded = 0
+        self.failed = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=propagate(self._run), name=f"frame-persister-{video_id}", daemon=True)
+        self._thread.start()
     
-    # Download video
-    local_video_path = download_video_from_gcs(gcs_video_url)
-    if not local_video_path:
-        return [], {"error": "Video download failed", "total_frames": 0}
+    def frame_url(self, frame_number):
+        return get_storage(GCS_BUCKET).url(frame_path(self.video_id, frame_number))
     
-    try:
-        # Open video
-        cap = cv2.VideoCapture(local_video_path)
-        
-        if not cap.isOpened():
-            raise Exception("Could not open video file")
-        
-        # Get video properties
-        original_fps = cap.get(cv2.CAP_PROP_FPS) or 30
-        total_video_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        duration_sec = total_video_frames / original_fps
-        video_id = gcs_video_url.split("/")[-1].replace(".mp4", "")
-        
-        # Calculate frame interval
-        frame_interval = int(original_fps / fps)
-        expected_frames = int(duration_sec * fps)
-        
-        logger.info(f"📊 Video: {duration_sec:.1f}s, {original_fps:.1f} FPS, extracting at {fps} FPS")
-        logger.info(f"📊 Expected frames: {expected_frames}")
+    def submit(self, frame_data, frame_number):
+        """Queue a frame for upload. Returns its future GCS URL, or None if dropped."""
+        try:
+            self._queue.put_nowait((frame_data, frame_number))
+            return self.frame_url(frame_number)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped % 50 == 1:
+                logger.warning(f"⚠️ Frame persistence falling behind, {self.dropped} frames dropped")
+            return None
+    
+    def _run(self):
+        manager = get_transfer_manager()
+        done = False
+        while not done:
+            item = self._queue.get()
+            batch = []
+            if item is None:
+                done = True
+            else:
+                batch.append(item)
+            while not done and len(batch) < manager.concurrency * 2:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    done = True
+                else:
+                    batch.append(item)
+            
+            if batch:
+                results, _ = manager.upload_many(
+                    [(frame_data, frame_path(self.video_id, frame_number)) for frame_data, frame_number in batch],
+                    content_type="image/jpeg")
+                ok = sum(1 for r in results if r.ok)
+                self.uploaded += ok
+                self.failed += len(results) - ok
+    
+    def close(self, timeout=None):
+        """Flush pending uploads and stop the worker thread"""
+        self._queue.put(None)
+        self._thread.join(timeout)
+        logger.info(f"💾 Persisted {self.uploaded} frames ({self.failed} failed, {self.dropped} dropped)")
+
+
+class FrameStream:
+    """
+    Iterable of decoded, resized frames (`Frame` tuples) read straight from the video.
+    The video is downloaded on construction so `metadata` is available before iteration;
+    `metadata["total_frames"]` is final once the stream is exhausted or closed.
+    
+    With `adaptive` the rate follows scene motion between SAMPLING_MIN_FPS and
+    SAMPLING_MAX_FPS and non-pitch frames are skipped (components/frame_sampler.py);
+    `fps` then only sets `expected_frames`, and the sampler's counts end up in
+    `metadata["adaptive_sampling"]`.
+    
+    `start_ms` / `end_ms` restrict the stream to one time-range shard
+    (components/sharding.py). Both ends snap forward to the video's sampling grid
+    (every frame_interval-th source frame from frame 0), so adjacent shards split
+    the frames of a full pass exactly, and frame numbers stay unique across shards.
+    `video_path` reuses an already downloaded copy of the video (not deleted on close).
+    """
+    
+    def __init__(self, gcs_video_url, fps=5, resize=(1280, 720), persist_frames=False, sampling=FRAME_SAMPLING,
+                 adaptive=ADAPTIVE_SAMPLING, start_ms=None, end_ms=None, video_path=None):
+        self.gcs_video_url = gcs_video_url
+        self.fps = fps
+        self.resize = resize
+        self.sampling = sampling
+        self.adaptive = adaptive
+        self.start_ms = start_ms
+        self.end_ms = end_ms
+        self.video_path = video_path
+        self.video_id = gcs_video_url.split("/")[-1].replace(".mp4", "")
+        self.persister = FramePersister(self.video_id) if persist_frames else None
+        self.cap = None
+        self.local_video_path = None
+        self.first_number = 0
+        self.metadata = {"total_frames": 0}
+        self._open()
+    
+    def _grid_index(self, ms, original_fps):
+        """First sampled source frame at or after `ms`"""
+        return math.ceil(ms * original_fps / 1000 / self.frame_interval - 1e-9) * self.frame_interval
+    
+    def _open(self):
+        logger.info(f"🎬 Starting frame extraction from {self.gcs_video_url}")
         
-        frame_urls = []
-        frame_count = 0
-        extracted_count = 0
+        # Download video (unless a local copy was handed in)
+        self.local_video_path = self.video_path or download_video_from_gcs(self.gcs_video_url)
+        if not self.local_video_path:
+            self.metadata = {"error": "Video download failed", "total_frames": 0}
+            return
         
-        while cap.isOpened() and extracted_count < expected_frames:
-            ret, frame = cap.read()
+        try:
+            # Open video
+            self.cap = cv2.VideoCapture(self.local_video_path)
             
-            if not ret:
-                break
+            if not self.cap.isOpened():
+                raise Exception("Could not open video file")
             
-            frame_count += 1
+            # Get video properties
+            original_fps = self.cap.get(cv2.CAP_PROP_FPS) or 30
+            total_video_frames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            duration_sec = total_video_frames / original_fps
             
-            # Extract frame at interval
-            if frame_count % frame_interval == 0:
-                # Resize frame
-                frame_resized = cv2.resize(frame, resize)
-                
-                # Upload to GCS
-                frame_url = upload_frame_to_gcs(frame_resized, video_id, extracted_count)
-                
-                if frame_url:
-                    frame_urls.append(frame_url)
-                    extracted_count += 1
-                    
-                    if extracted_count % 50 == 0:
-                        logger.info(f"✅ Extracted {extracted_count}/{expected_frames} frames")
-        
-        cap.release()
-        os.remove(local_video_path)
-        
-        metadata = {
-            "duration_seconds": int(duration_sec),
-            "original_fps": int(original_fps),
-            "extraction_fps": fps,
-            "total_frames": extracted_count,
-            "video_resolution": f"{resize[0]}x{resize[1]}",
-            "video_id": video_id
-        }
-        
-        logger.info(f"🎉 Extraction complete! {extracted_count} frames saved to GCS")
+            # Calculate frame interval
+            self.frame_interval = max(1, int(original_fps / self.fps))
+            self.expected_frames = int(duration_sec * self.fps)
+            
+            # Source frame window: the whole video, or one shard of it. Fixed-rate
+            # sampling stops after expected_frames samples, so shards stop there too
+            limit = None if self.adaptive else self.expected_frames * self.frame_interval
+            start, end = 0, limit
+            if self.start_ms:
+                start = self._grid_index(self.start_ms, original_fps)
+                start = start if limit is None else min(start, limit)
+            if self.end_ms is not None:
+                end = self._grid_index(self.end_ms, original_fps)
+                end = max(start, end if limit is None else min(end, limit))
+            if start or end != limit:
+                span_end = total_video_frames if end is None else min(end, total_video_frames)
+                self.expected_frames = max(0, span_end - start) // self.frame_interval
+            
+            if self.adaptive:
+                # Adaptive shards number frames from their first source index, which no earlier shard reaches
+                self.first_number = start
+                self.sampler = AdaptiveSampler(self.cap, SAMPLING_MIN_FPS, SAMPLING_MAX_FPS, strategy=self.sampling,
+                                               start=start, end=end)
+                rate = f"{SAMPLING_MIN_FPS:g}-{SAMPLING_MAX_FPS:g} FPS by motion"
+            else:
+                self.first_number = start // self.frame_interval
+                self.sampler = FrameSampler(self.cap, self.frame_interval, strategy=self.sampling, start=start, end=end)
+                rate = f"{self.fps} FPS"
+            
+            logger.info(f"📊 Video: {duration_sec:.1f}s, {original_fps:.1f} FPS, extracting at {rate} ({self.sampler.strategy} sampling)")
+            logger.info(f"📊 Expected frames: {self.expected_frames}")
+            
+            self.metadata = {
+                "duration_seconds": int(duration_sec),
+                "original_fps": int(original_fps),
+                "extraction_fps": self.fps,
+                "expected_frames": self.expected_frames,
+                "total_frames": 0,
+                "video_resolution": f"{self.resize[0]}x{self.resize[1]}",
+                "sampling_strategy": self.sampler.strategy,
+                "video_id": self.video_id
+            }
+            if self.start_ms or self.end_ms is not None:
+                self.metadata["shard"] = {"start_ms": self.start_ms or 0, "end_ms": self.end_ms,
+                                          "first_source_frame": start, "end_source_frame": end}
+        except Exception as e:
+            logger.error(f"❌ Frame extraction error: {e}")
+            self.metadata = {"error": str(e), "total_frames": 0}
+            self.close()
+    
+    def __iter__(self):
+        if self.cap is None:
+            return
         
-        return frame_urls, metadata
+        extracted_count = 0
         
-    except Exception as e:
-        logger.error(f"❌ Frame extraction error: {e}")
-        if os.path.exists(local_video_path):
-            os.remove(local_video_path)
-        return [], {"error": str(e), "total_frames": 0}
+        try:
+            decode_start = time.perf_counter()
+            for source_index, timestamp_ms, frame in self.sampler:
+                frame_resized = cv2.resize(frame, self.resize)
+                observe("decode", time.perf_counter() - decode_start)
+                number = self.first_number + extracted_count
+                frame_url = self.persister.submit(frame_resized, number) if self.persister else None
+                
+                yield Frame(number, frame_resized, frame_url, source_index, timestamp_ms)
+                decode_start = time.perf_counter()
+                extracted_count += 1
+                self.metadata["total_frames"] = extracted_count
+                
+                if extracted_count % 50 == 0:
+                    logger.info(f"✅ Extracted {extracted_count}/{self.expected_frames} frames")
+            
+            logger.info(f"🎉 Extraction complete! {extracted_count} frames streamed")
+            if self.adaptive:
+                self.metadata["adaptive_sampling"] = dict(self.sampler.stats)
+                logger.info(f"🎚️ Adaptive sampling: {self.sampler.stats}")
+        except Exception as e:
+            logger.error(f"❌ Frame extraction error: {e}")
+            self.metadata["error"] = str(e)
+        finally:
+            self.close()
+    
+    def close(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+        if self.local_video_path and not self.video_path and os.path.exists(self.local_video_path):
+            os.remove(self.local_video_path)
+        self.local_video_path = None
+        if self.persister is not None:
+            self.persister.close()
+            self.persister = None
+
+
+def extract_frames(gcs_video_url, fps=5, resize=(1280, 720), stream=False, persist_frames=True, adaptive=ADAPTIVE_SAMPLING):
+    """
+    Extract frames from video at specified FPS
+    Returns: (list of frame URLs, metadata dict)
+    
+    With stream=True returns (FrameStream, metadata dict) instead: frames are yielded
+    in memory for detection and, if persist_frames, uploaded to GCS in the background.
+    """
+    
+    frames = FrameStream(gcs_video_url, fps=fps, resize=resize, persist_frames=stream and persist_frames, adaptive=adaptive)
+    if frames.metadata.get("error"):
+        return [], frames.metadata
+    
+    if stream:
+        return frames, frames.metadata
+    
+    # Legacy mode: upload every frame (in concurrent batches) and return the URLs
+    manager = get_transfer_manager()
+    frame_urls = []
+    batch = []
+    
+    def flush():
+        results, _ = manager.upload_many(batch, content_type="image/jpeg")
+        frame_urls.extend(r.url for r in results if r.ok)
+        batch.clear()
+    
+    for frame in frames:
+        batch.append((frame.image, frame_path(frames.video_id, frame.number)))
+        if len(batch) >= FRAME_UPLOAD_BATCH:
+            flush()
+    if batch:
+        flush()
+    
+    if frames.metadata.get("error"):
+        return [], {"error": frames.metadata["error"], "total_frames": 0}
+    
+    metadata = dict(frames.metadata, total_frames=len(frame_urls))
+    metadata.pop("error", None)
+    logger.info(f"🎉 {len(frame_urls)} frames saved to GCS")
+    
+    return frame_urls, metadata
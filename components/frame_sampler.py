@@ -0,0 +1,191 @@
+"""
+Frame Sampler - TAHLEEL.ai
+Pull every Nth frame out of a cv2.VideoCapture without paying for the frames in between.
+
+Strategies:
+- read: decode and convert every frame (baseline, what cap.read() in a loop does)
+- grab: grab() skipped frames (no BGR conversion/copy), retrieve() only sampled ones
+- seek: jump straight to each sampled frame; wins when the stride spans keyframes
+
+AdaptiveSampler varies the rate with the action instead: candidates are taken at
+SAMPLING_MAX_FPS and scored on a small thumbnail, frames that do not show the
+pitch (replays, close-ups, crowd shots) are dropped, and the rest are emitted
+between SAMPLING_MIN_FPS (stoppages) and SAMPLING_MAX_FPS (fast play) depending
+on how much the picture moves.
+"""
+
+import os
+import cv2
+import logging
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+STRATEGIES = ("read", "grab", "seek")
+# Strides at or above this many source frames seek instead of grabbing through
+SEEK_STRIDE_THRESHOLD = int(os.getenv("SEEK_STRIDE_THRESHOLD", "60"))
+
+ADAPTIVE_SAMPLING = os.getenv("ADAPTIVE_SAMPLING", "false").lower() == "true"
+SAMPLING_MIN_FPS = float(os.getenv("SAMPLING_MIN_FPS", "2"))
+SAMPLING_MAX_FPS = float(os.getenv("SAMPLING_MAX_FPS", "10"))
+# Share of thumbnail pixels changing between candidates at which the max rate is reached
+MOTION_HIGH = float(os.getenv("SAMPLING_MOTION_HIGH", "0.04"))
+# Grayscale change (0-255) for a thumbnail pixel to count as moving rather than noise
+MOTION_PIXEL_DELTA = 8
+# Minimum share of grass-colored thumbnail pixels for a frame to count as showing the pitch
+PITCH_MIN_GREEN = float(os.getenv("SAMPLING_PITCH_MIN_GREEN", "0.3"))
+# Hue/saturation histogram distance (0-1) treated as a scene cut
+SCENE_CUT_THRESHOLD = float(os.getenv("SAMPLING_SCENE_CUT", "0.5"))
+THUMB_SIZE = (96, 54)
+
+
+def choose_strategy(stride):
+    return "seek" if stride >= SEEK_STRIDE_THRESHOLD else "grab"
+
+
+class FrameSampler:
+    """
+    Iterate (source_index, timestamp_ms, frame) for source frames
+    start, start + stride, start + 2*stride, ... (0-based).
+    Timestamps come from the frame index and the container FPS, so they are
+    exact regardless of strategy.
+    """
+
+    def __init__(self, cap, stride, strategy="auto", start=0, max_frames=None, end=None):
+        self.cap = cap
+        self.stride = max(1, int(stride))
+        self.strategy = choose_strategy(self.stride) if strategy == "auto" else strategy
+        if self.strategy not in STRATEGIES:
+            raise ValueError(f"Unknown sampling strategy '{strategy}'. Allowed: {STRATEGIES}")
+        self.start = max(0, int(start))
+        self.max_frames = max_frames
+        self.end = end
+        self.fps = cap.get(cv2.CAP_PROP_FPS) or 30
+        self.decoded = 0
+
+    def timestamp_ms(self, index):
+        return index * 1000.0 / self.fps
+
+    def _done(self, index, emitted):
+        if self.max_frames is not None and emitted >= self.max_frames:
+            return True
+        return self.end is not None and index >= self.end
+
+    def __iter__(self):
+        if self.strategy == "seek":
+            return self._iter_seek()
+        return self._iter_sequential(retrieve_all=self.strategy == "read")
+
+    def _iter_sequential(self, retrieve_all):
+        position = int(self.cap.get(cv2.CAP_PROP_POS_FRAMES))
+        if position != self.start:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, self.start)
+            position = self.start
+
+        emitted = 0
+        target = self.start
+        while not self._done(target, emitted):
+            if position == target or retrieve_all:
+                ret, frame = self.cap.read()
+            else:
+                ret, frame = self.cap.grab(), None
+            self.decoded += 1
+            if not ret:
+                return
+            if position == target:
+                yield position, self.timestamp_ms(position), frame
+                emitted += 1
+                target += self.stride
+            position += 1
+
+    def _iter_seek(self):
+        emitted = 0
+        target = self.start
+        position = int(self.cap.get(cv2.CAP_PROP_POS_FRAMES))
+        while not self._done(target, emitted):
+            # Small forward gaps are cheaper to grab through than to seek
+            if 0 <= target - position < self.stride // 4:
+                while position < target and self.cap.grab():
+                    position += 1
+                    self.decoded += 1
+            elif position != target:
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+            ret, frame = self.cap.read()
+            self.decoded += 1
+            if not ret:
+                return
+            position = int(self.cap.get(cv2.CAP_PROP_POS_FRAMES))
+            index = position - 1
+            yield index, self.timestamp_ms(index), frame
+            emitted += 1
+            target = index + self.stride
+
+
+def scene_features(frame):
+    """(grayscale thumbnail, grass share, normalized hue/saturation histogram) of a BGR frame"""
+    thumb = cv2.resize(frame, THUMB_SIZE, interpolation=cv2.INTER_AREA)
+    hsv = cv2.cvtColor(thumb, cv2.COLOR_BGR2HSV)
+    grass = cv2.inRange(hsv, (35, 50, 40), (85, 255, 255))
+    hist = cv2.calcHist([hsv], [0, 1], None, [16, 8], [0, 180, 0, 256]).ravel()
+    return (cv2.cvtColor(thumb, cv2.COLOR_BGR2GRAY).astype(np.int16), float(np.count_nonzero(grass)) / grass.size,
+            hist / max(hist.sum(), 1.0))
+
+
+class AdaptiveSampler:
+    """
+    Iterate (source_index, timestamp_ms, frame) like FrameSampler, at a rate between
+    min_fps and max_fps that follows scene motion, skipping non-pitch frames.
+
+    Candidates come from a FrameSampler at max_fps. Each on-pitch candidate adds
+    min_fps / max_fps of credit when the picture is still, up to 1 when a
+    `motion_high` share of its pixels or more changes, and a frame is emitted
+    whenever the credit reaches 1.
+    Scene cuts and the first frame back on the pitch are always emitted.
+    """
+
+    def __init__(self, cap, min_fps=SAMPLING_MIN_FPS, max_fps=SAMPLING_MAX_FPS, strategy="auto", max_frames=None,
+                 motion_high=MOTION_HIGH, pitch_min_green=PITCH_MIN_GREEN, scene_cut=SCENE_CUT_THRESHOLD, start=0, end=None):
+        if not 0 < min_fps <= max_fps:
+            raise ValueError(f"Adaptive sampling needs 0 < min_fps <= max_fps, got {min_fps} / {max_fps}")
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30
+        self.candidates = FrameSampler(cap, max(1, int(fps / max_fps)), strategy=strategy, start=start, end=end)
+        self.strategy = self.candidates.strategy
+        self.fps = self.candidates.fps
+        self.base_credit = min(1.0, min_fps * self.candidates.stride / fps)
+        self.max_frames = max_frames
+        self.motion_high = motion_high
+        self.pitch_min_green = pitch_min_green
+        self.scene_cut = scene_cut
+        self.stats = {"candidates": 0, "emitted": 0, "non_pitch": 0, "scene_cuts": 0}
+
+    @property
+    def decoded(self):
+        return self.candidates.decoded
+
+    def __iter__(self):
+        credit = 1.0
+        prev_gray = prev_hist = None
+        for index, timestamp_ms, frame in self.candidates:
+            if self.max_frames is not None and self.stats["emitted"] >= self.max_frames:
+                return
+            self.stats["candidates"] += 1
+            gray, green, hist = scene_features(frame)
+            if green < self.pitch_min_green:
+                self.stats["non_pitch"] += 1
+                credit = 1.0
+                prev_gray = prev_hist = None
+                continue
+
+            if prev_hist is not None and 0.5 * np.abs(hist - prev_hist).sum() >= self.scene_cut:
+                self.stats["scene_cuts"] += 1
+                credit = 1.0
+            elif prev_gray is not None:
+                motion = float(np.count_nonzero(np.abs(gray - prev_gray) > MOTION_PIXEL_DELTA)) / gray.size
+                credit += self.base_credit + (1 - self.base_credit) * min(1.0, motion / self.motion_high)
+            prev_gray, prev_hist = gray, hist
+
+            if credit >= 1.0:
+                credit -= 1.0
+                self.stats["emitted"] += 1
+                yield index, timestamp_ms, frame
@@ -0,0 +1,142 @@
+"""
+Inference Backends - TAHLEEL.ai
+Interchangeable runtimes for the YOLOX forward pass. Every backend takes a
+preprocessed (batch, 3, H, W) tensor and returns raw head outputs as a float32
+torch tensor (batch, anchors, 5 + classes), so postprocessing is shared.
+
+- torch: the PyTorch model, with precision / compile modes (components/precision.py)
+- onnxruntime: yolox exported to ONNX once, cached next to the weights in
+  /tmp/yolox_models, run by an ONNX Runtime CPU session with tuned thread pools.
+  The detector drops its torch model after export so only the session holds the
+  weights (torch itself stays imported for pre/postprocessing).
+"""
+
+import os
+import inspect
+import logging
+import tempfile
+
+import torch
+
+from components.precision import autocast_context, prepare_model
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("torch", "onnxruntime")
+
+# ONNX Runtime thread pools: intra-op parallelizes one operator, inter-op runs
+# independent operators concurrently (one graph branch at a time is typical for YOLOX).
+# 0 = torch's thread count when the session is created, so gunicorn workers get their share
+ORT_INTRA_OP_THREADS = int(os.getenv("ORT_INTRA_OP_THREADS", "0"))
+ORT_INTER_OP_THREADS = int(os.getenv("ORT_INTER_OP_THREADS", "1"))
+ONNX_OPSET = 17
+
+
+class InferenceBackend:
+    """Backend interface"""
+
+    name = None
+
+    def forward(self, img_tensor):
+        """Raw head outputs for a preprocessed batch"""
+        raise NotImplementedError
+
+    def param_bytes(self):
+        """Approximate size of the weights held in memory"""
+        raise NotImplementedError
+
+
+class TorchBackend(InferenceBackend):
+    name = "torch"
+
+    def __init__(self, model, precision="fp32", compile_mode="none", example=None, calibration_batches=None):
+        self.model = model
+        self.precision = precision
+        self.compile_mode = compile_mode
+        self.forward_model = prepare_model(model, precision, compile_mode, example, calibration_batches)
+
+    def forward(self, img_tensor):
+        with torch.no_grad(), autocast_context(self.precision):
+            return self.forward_model(img_tensor).float()
+
+    def param_bytes(self):
+        return sum(p.numel() * p.element_size() for p in self.model.parameters())
+
+
+def export_onnx(model, path, test_size, opset=ONNX_OPSET):
+    """Export an eval-mode YOLOX model with a dynamic batch axis; written atomically"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.part"
+    example = torch.zeros(1, 3, *test_size)
+    options = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        # Newer torch defaults to the dynamo exporter; keep the TorchScript one
+        options["dynamo"] = False
+    with torch.no_grad():
+        torch.onnx.export(
+            model, example, tmp_path,
+            input_names=["images"], output_names=["output"],
+            dynamic_axes={"images": {0: "batch"}, "output": {0: "batch"}},
+            opset_version=opset, **options,
+        )
+    os.replace(tmp_path, path)
+    return path
+
+
+class ONNXRuntimeBackend(InferenceBackend):
+    name = "onnxruntime"
+
+    def __init__(self, model, onnx_path=None, test_size=(640, 640), weights_path=None,
+                 intra_op_threads=ORT_INTRA_OP_THREADS, inter_op_threads=ORT_INTER_OP_THREADS):
+        import onnxruntime as ort
+
+        # Without a cache path (e.g. random weights) export to a temp file used once
+        temporary = onnx_path is None
+        if temporary:
+            fd, onnx_path = tempfile.mkstemp(suffix=".onnx")
+            os.close(fd)
+        if temporary or self._is_stale(onnx_path, weights_path):
+            logger.info(f"📦 Exporting YOLOX to ONNX: {onnx_path}")
+            export_onnx(model, onnx_path, test_size)
+        else:
+            logger.info(f"✅ Using cached ONNX model {onnx_path}")
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads or torch.get_num_threads()
+        options.inter_op_num_threads = inter_op_threads
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL if inter_op_threads <= 1 else ort.ExecutionMode.ORT_PARALLEL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        try:
+            self.session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+            self._bytes = os.path.getsize(onnx_path)
+        finally:
+            if temporary:
+                os.remove(onnx_path)
+        self.onnx_path = None if temporary else onnx_path
+        self.input_name = self.session.get_inputs()[0].name
+
+    @staticmethod
+    def _is_stale(onnx_path, weights_path):
+        if not os.path.exists(onnx_path):
+            return True
+        return weights_path is not None and os.path.getmtime(weights_path) > os.path.getmtime(onnx_path)
+
+    def forward(self, img_tensor):
+        inputs = img_tensor.detach().cpu().numpy()
+        return torch.from_numpy(self.session.run(None, {self.input_name: inputs})[0])
+
+    def param_bytes(self):
+        return self._bytes
+
+
+def create_backend(name, model, precision="fp32", compile_mode="none", example=None, calibration_batches=None,
+                   onnx_path=None, weights_path=None, test_size=(640, 640)):
+    """Backend `name` for a loaded eval-mode fp32 model"""
+    if name == "torch":
+        return TorchBackend(model, precision, compile_mode, example, calibration_batches)
+    if name == "onnxruntime":
+        if precision != "fp32" or compile_mode != "none":
+            raise ValueError(f"onnxruntime backend runs fp32 without compile modes, got '{precision}' / '{compile_mode}'")
+        return ONNXRuntimeBackend(model, onnx_path, test_size, weights_path)
+    raise ValueError(f"Unknown inference backend '{name}'. Allowed: {BACKENDS}")
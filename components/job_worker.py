@@ -0,0 +1,108 @@
+"""
+Job Workers - TAHLEEL.ai
+Background worker pool that claims queued jobs from the job store, runs them and
+records stage / progress / result, so HTTP requests only enqueue and poll.
+"""
+
+import os
+import time
+import threading
+import logging
+
+from utils.job_store import get_job_store
+from utils.metrics import job_trace
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))
+
+
+class JobProgress:
+    """Handed to a job handler to report its current stage and frame progress"""
+    
+    def __init__(self, store, job_id, min_interval=1.0):
+        self.store = store
+        self.job_id = job_id
+        self.min_interval = min_interval
+        self._last_update = 0.0
+    
+    def stage(self, name, frames_total=None):
+        fields = {"stage": name}
+        if frames_total is not None:
+            fields.update(frames_total=frames_total, frames_done=0)
+        self.store.update(self.job_id, **fields)
+        logger.info(f"🧵 Job {self.job_id}: {name}")
+    
+    def frames(self, done, total=None):
+        # Throttled: the hot loop may report every frame
+        now = time.time()
+        if now - self._last_update < self.min_interval and (total is None or done < total):
+            return
+        self._last_update = now
+        fields = {"frames_done": done}
+        if total is not None:
+            fields["frames_total"] = total
+        self.store.update(self.job_id, **fields)
+
+
+class JobWorkerPool:
+    def __init__(self, store, handlers, workers=JOB_WORKERS):
+        self.store = store
+        self.handlers = handlers
+        self.workers = max(1, workers)
+        self._stop = threading.Event()
+        self._threads = []
+    
+    def start(self):
+        if self._threads:
+            return self
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"🧵 Started {self.workers} job workers")
+        return self
+    
+    def stop(self, timeout=None):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+    
+    def _run(self):
+        while not self._stop.is_set():
+            job = self.store.claim(timeout=1.0)
+            if job is not None:
+                self.execute(job)
+    
+    def execute(self, job):
+        handler = self.handlers.get(job["type"])
+        try:
+            if handler is None:
+                raise ValueError(f"No handler for job type '{job['type']}'")
+            # Stage timings of the job (utils/metrics.py) are stored with its result
+            with job_trace(job["type"]) as trace:
+                result = handler(job["payload"], JobProgress(self.store, job["id"]))
+            if isinstance(result, dict):
+                result = {**result, "timings": trace.summary()}
+            self.store.update(job["id"], status="complete", stage="complete", result=result, finished_at=time.time())
+            logger.info(f"✅ Job {job['id']} complete")
+        except Exception as e:
+            logger.error(f"❌ Job {job['id']} failed: {e}")
+            self.store.update(job["id"], status="failed", stage="failed", error=str(e), finished_at=time.time())
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def ensure_workers():
+    """Start the process-wide worker pool for analysis and analysis shard jobs (idempotent)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            from components.analysis_pipeline import run_analysis
+            from components.sharding import SHARD_JOB_TYPE, run_shard_job
+            _pool = JobWorkerPool(get_job_store(), {"analysis": run_analysis, SHARD_JOB_TYPE: run_shard_job}).start()
+        return _pool
@@ -0,0 +1,173 @@
+"""
+Model Registry - TAHLEEL.ai
+Process-wide, thread-safe cache of loaded YOLOX detectors so each model is
+built and loaded once per process instead of once per request.
+"""
+
+import os
+import threading
+import time
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = os.getenv("YOLOX_MODEL_NAME", "yolox_m")
+DEFAULT_DEVICE = os.getenv("YOLOX_DEVICE", "cpu")
+DEFAULT_PRECISION = os.getenv("YOLOX_PRECISION", "fp32")
+
+
+def _rss_bytes():
+    """Current resident set size of this process (Linux), falling back to peak RSS"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class ModelRegistry:
+    """Detectors keyed by (model name, device, precision), loaded at most once each"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._detectors = {}
+        self._stats = {}
+        self._loading = set()
+        self._errors = {}
+        self._warmups = set()  # keys with a background warm-up requested
+    
+    def get(self, model_name=DEFAULT_MODEL, device=DEFAULT_DEVICE, precision=DEFAULT_PRECISION):
+        key = (model_name, device, precision)
+        detector = self._detectors.get(key)
+        if detector is not None:
+            return detector
+        
+        # One lock per key: concurrent first requests wait for a single load,
+        # while different models can still load in parallel.
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        
+        with key_lock:
+            detector = self._detectors.get(key)
+            if detector is not None:
+                return detector
+            
+            from components.yolox_detector import YOLOXDetector
+            
+            logger.info(f"📦 Registry loading {model_name} ({device}, {precision})")
+            rss_before = _rss_bytes()
+            start = time.perf_counter()
+            self._loading.add(key)
+            try:
+                detector = YOLOXDetector(model_name, device, precision=precision)
+            except Exception as e:
+                self._errors[key] = str(e)
+                self._loading.discard(key)
+                raise
+            self._errors.pop(key, None)
+            load_seconds = time.perf_counter() - start
+            rss_after = _rss_bytes()
+            
+            param_bytes = detector.backend.param_bytes()
+            self._stats[key] = {
+                "model_name": model_name,
+                "device": device,
+                "precision": precision,
+                "backend": detector.backend.name,
+                "load_seconds": round(load_seconds, 3),
+                "param_mb": round(param_bytes / 1024 / 1024, 1),
+                "rss_delta_mb": round((rss_after - rss_before) / 1024 / 1024, 1),
+                "rss_mb": round(rss_after / 1024 / 1024, 1),
+                "loaded_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            self._detectors[key] = detector
+            self._loading.discard(key)
+            logger.info(f"✅ Registry loaded {model_name} in {load_seconds:.2f}s")
+            return detector
+    
+    def register(self, detector, model_name=DEFAULT_MODEL, device=DEFAULT_DEVICE, precision=DEFAULT_PRECISION):
+        """Serve an already built detector (e.g. random weights in offline benchmarks) under a key"""
+        key = (model_name, device, precision)
+        self._detectors[key] = detector
+        self._stats[key] = {"model_name": model_name, "device": device, "precision": precision,
+                            "backend": detector.backend.name, "registered": True}
+        return detector
+    
+    def is_loaded(self, model_name=DEFAULT_MODEL, device=DEFAULT_DEVICE, precision=DEFAULT_PRECISION):
+        return (model_name, device, precision) in self._detectors
+    
+    def state(self, model_name=DEFAULT_MODEL, device=DEFAULT_DEVICE, precision=DEFAULT_PRECISION):
+        """Load state of a model: ready, loading, failed (with the error) or not_loaded"""
+        key = (model_name, device, precision)
+        if key in self._detectors:
+            return {"status": "ready", "load_seconds": self._stats[key].get("load_seconds")}
+        if key in self._loading:
+            return {"status": "loading"}
+        if key in self._errors:
+            return {"status": "failed", "error": self._errors[key]}
+        return {"status": "not_loaded"}
+    
+    def warmup(self, model_name=DEFAULT_MODEL, device=DEFAULT_DEVICE, precision=DEFAULT_PRECISION, background=False):
+        """Load a model now (eager startup), optionally on a background thread"""
+        if background:
+            key = (model_name, device, precision)
+            self._warmups.add(key)
+            # Marked loading right away, so readiness never reports "not_loaded" in between
+            self._loading.add(key)
+            thread = threading.Thread(target=self._background_load, args=key, name="model-warmup", daemon=True)
+            thread.start()
+            return thread
+        return self.get(model_name, device, precision)
+    
+    def _background_load(self, model_name, device, precision):
+        try:
+            self.get(model_name, device, precision)
+        except Exception as e:
+            logger.error(f"❌ Background warm-up of {model_name} failed: {e}")
+        finally:
+            self._loading.discard((model_name, device, precision))
+    
+    def stats(self):
+        return [dict(s) for s in self._stats.values()]
+    
+    def clear(self):
+        with self._lock:
+            self._detectors.clear()
+            self._stats.clear()
+            self._key_locks.clear()
+            self._errors.clear()
+            # Warm-ups in flight are forgotten too, so state() and _after_fork do not wait on them
+            self._loading = set()
+            self._warmups = set()
+    
+    def _after_fork(self):
+        """
+        Forked worker (gunicorn.conf.py preload): torch detectors are kept and share
+        the parent's weights copy-on-write. ONNX Runtime sessions are not fork-safe
+        (their thread pools stay in the parent), so those models reload on first use.
+        """
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._loading = set()
+        for key, detector in list(self._detectors.items()):
+            if detector.backend is not None and detector.backend.name != "torch":
+                del self._detectors[key]
+                del self._stats[key]
+        # Warm-up threads do not survive the fork either
+        for key in self._warmups - set(self._detectors):
+            self.warmup(*key, background=True)
+
+
+registry = ModelRegistry()
+os.register_at_fork(after_in_child=registry._after_fork)
+
+
+def get_detector(model_name=DEFAULT_MODEL, device=DEFAULT_DEVICE, precision=DEFAULT_PRECISION):
+    """Shared detector for this process"""
+    return registry.get(model_name, device, precision)
@@ -0,0 +1,193 @@
+"""
+Staged Pipeline Executor - TAHLEEL.ai
+Run decode → preprocess → infer → postprocess concurrently: every stage has its own
+worker threads, stages are joined by bounded queues (backpressure), and results are
+yielded in source order.
+"""
+
+import os
+import queue
+import threading
+import logging
+
+from utils.metrics import propagate
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "16"))
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+
+_DONE = object()
+_POLL_SECONDS = 0.1
+
+
+class StageError(Exception):
+    """Yielded in place of a result when a stage fails for one item; later stages skip it"""
+
+    def __init__(self, stage, error, item):
+        super().__init__(f"{stage}: {error}")
+        self.stage = stage
+        self.error = error
+        self.item = item
+
+
+class Stage:
+    """
+    One pipeline step. `fn(item) -> result`, or with batch_size > 1
+    `fn(list_of_items) -> list_of_results` of the same length.
+    """
+
+    def __init__(self, name, fn, workers=1, batch_size=1):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, int(workers))
+        self.batch_size = max(1, int(batch_size))
+
+
+class StagedPipeline:
+    """
+    Threads per stage joined by bounded queues. The source iterable is consumed on
+    its own thread (the decode stage). Items in flight are capped so the reorder
+    buffer stays bounded even when one item is slow.
+    """
+
+    def __init__(self, stages, queue_size=PIPELINE_QUEUE_SIZE, name="pipeline"):
+        self.stages = list(stages)
+        self.queue_size = max(1, int(queue_size))
+        self.name = name
+        self.max_in_flight = self.queue_size * (len(self.stages) + 1)
+
+    def run(self, source):
+        """Generator yielding one result (or StageError) per source item, in source order"""
+        stop = threading.Event()
+        in_flight = threading.BoundedSemaphore(self.max_in_flight)
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        # Worker threads record their spans into the caller's job trace (utils/metrics.py)
+        threads = [threading.Thread(target=propagate(self._feed), args=(source, queues[0], stop, in_flight),
+                                    name=f"{self.name}-decode", daemon=True)]
+
+        for i, stage in enumerate(self.stages):
+            remaining = [stage.workers]
+            lock = threading.Lock()
+            for w in range(stage.workers):
+                threads.append(threading.Thread(
+                    target=propagate(self._work), args=(stage, queues[i], queues[i + 1], stop, remaining, lock),
+                    name=f"{self.name}-{stage.name}-{w}", daemon=True))
+
+        for t in threads:
+            t.start()
+
+        output = queues[-1]
+        pending = {}
+        next_seq = 0
+        try:
+            while True:
+                item = _get(output, stop)
+                if item is _DONE:
+                    break
+                seq, value = item
+                pending[seq] = value
+                while next_seq in pending:
+                    value = pending.pop(next_seq)
+                    next_seq += 1
+                    in_flight.release()
+                    yield value
+            # Anything left means a sequence gap, which only happens on early stop
+            for seq in sorted(pending):
+                yield pending.pop(seq)
+        finally:
+            stop.set()
+            for t in threads:
+                t.join(timeout=1)
+
+    def _feed(self, source, out, stop, in_flight):
+        seq = 0
+        try:
+            for item in source:
+                while not in_flight.acquire(timeout=_POLL_SECONDS):
+                    if stop.is_set():
+                        return
+                if not _put(out, (seq, item), stop):
+                    return
+                seq += 1
+        except Exception as e:
+            logger.error(f"❌ {self.name} source failed: {e}")
+            if in_flight.acquire(timeout=_POLL_SECONDS):
+                _put(out, (seq, StageError("decode", e, None)), stop)
+        finally:
+            _put(out, _DONE, stop)
+
+    def _work(self, stage, inbox, out, stop, remaining, lock):
+        done = False
+        while not done and not stop.is_set():
+            item = _get(inbox, stop)
+            if item is _DONE:
+                break
+            batch = [item]
+            while len(batch) < stage.batch_size:
+                try:
+                    nxt = inbox.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is _DONE:
+                    done = True
+                    break
+                batch.append(nxt)
+
+            for seq, value in self._apply(stage, batch):
+                if not _put(out, (seq, value), stop):
+                    return
+
+        # Let sibling workers see the end marker; the last one forwards it
+        _put(inbox, _DONE, stop)
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            _put(out, _DONE, stop)
+
+    def _apply(self, stage, batch):
+        ready = [(seq, value) for seq, value in batch if not isinstance(value, StageError)]
+        failed = [(seq, value) for seq, value in batch if isinstance(value, StageError)]
+        if not ready:
+            return failed
+
+        try:
+            if stage.batch_size > 1:
+                results = stage.fn([value for _, value in ready])
+                done = list(zip([seq for seq, _ in ready], results))
+            else:
+                done = [(ready[0][0], stage.fn(ready[0][1]))]
+        except Exception as e:
+            if len(ready) == 1:
+                logger.error(f"❌ Stage {stage.name} failed: {e}")
+                return failed + [(ready[0][0], StageError(stage.name, e, ready[0][1]))]
+            # Retry a failed batch item by item so one bad frame does not sink the rest
+            done = []
+            for seq, value in ready:
+                try:
+                    done.append((seq, stage.fn([value])[0]))
+                except Exception as item_error:
+                    logger.error(f"❌ Stage {stage.name} failed: {item_error}")
+                    done.append((seq, StageError(stage.name, item_error, value)))
+        return failed + done
+
+
+def _put(q, item, stop):
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=_POLL_SECONDS)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q, stop):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=_POLL_SECONDS)
+        except queue.Empty:
+            continue
+    return _DONE
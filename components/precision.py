@@ -0,0 +1,199 @@
+"""
+Inference Precision - TAHLEEL.ai
+CPU precision modes and graph compilation for YOLOX, plus an accuracy-vs-speed
+check that compares each mode's (and inference backend's) boxes against torch
+fp32 on a reference frame set.
+
+Precisions:
+- fp32: reference
+- bf16: torch.autocast on CPU (fast on CPUs with AVX512-BF16 / AMX, slow elsewhere)
+- int8_dynamic: dynamic quantization of nn.Linear layers. YOLOX is convolutional,
+  so this only helps models with Linear layers; kept so the check can show it
+- int8_static: FX graph mode post-training quantization of the backbone
+  (CSPDarknet + PAFPN), calibrated on real frames. The decoupled head stays fp32
+  because its decode step is not FX-traceable
+
+Compile modes: none | jit (torch.jit.trace + freeze) | compile (torch.compile,
+minutes of compilation on first call per input shape).
+"""
+
+import copy
+import time
+import logging
+from contextlib import nullcontext
+
+import numpy as np
+import torch
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PRECISIONS = ("fp32", "bf16", "int8_dynamic", "int8_static")
+COMPILE_MODES = ("none", "jit", "compile")
+
+
+def autocast_context(precision):
+    """Context manager every forward pass runs under for `precision`"""
+    if precision == "bf16":
+        return torch.autocast("cpu", dtype=torch.bfloat16)
+    return nullcontext()
+
+
+def quantize_dynamic(model):
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def quantize_static(model, calibration_batches):
+    """Quantize model.backbone to int8 in place, calibrating observers on `calibration_batches`"""
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+    if not calibration_batches:
+        raise ValueError("int8_static needs calibration frames")
+    engine = "x86" if "x86" in torch.backends.quantized.supported_engines else "fbgemm"
+    torch.backends.quantized.engine = engine
+    prepared = prepare_fx(model.backbone, get_default_qconfig_mapping(engine), (calibration_batches[0],))
+    with torch.no_grad():
+        for batch in calibration_batches:
+            prepared(batch)
+    model.backbone = convert_fx(prepared)
+    return model
+
+
+def compile_model(model, mode, example, precision="fp32"):
+    """Wrap the model for `mode`; returns the callable to run forward passes with"""
+    if mode == "none":
+        return model
+    if mode == "jit":
+        with torch.no_grad(), autocast_context(precision):
+            traced = torch.jit.trace(model, example, check_trace=False)
+        return torch.jit.freeze(traced)
+    if mode == "compile":
+        # Batch size varies with the last batch of a video
+        return torch.compile(model, dynamic=True)
+    raise ValueError(f"Unsupported compile mode '{mode}'. Allowed: {COMPILE_MODES}")
+
+
+def prepare_model(model, precision="fp32", compile_mode="none", example=None, calibration_batches=None):
+    """Apply a precision mode and compile mode to an eval-mode fp32 model"""
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unsupported precision '{precision}'. Allowed: {PRECISIONS}")
+    if compile_mode not in COMPILE_MODES:
+        raise ValueError(f"Unsupported compile mode '{compile_mode}'. Allowed: {COMPILE_MODES}")
+
+    if precision == "int8_dynamic":
+        model = quantize_dynamic(model)
+    elif precision == "int8_static":
+        model = quantize_static(model, calibration_batches)
+    return compile_model(model, compile_mode, example, precision)
+
+
+# Accuracy vs speed
+
+def box_iou(a, b):
+    """Pairwise IoU of (N, 4) and (M, 4) x1y1x2y2 boxes"""
+    a = np.asarray(a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float64).reshape(-1, 4)
+    lt = np.maximum(a[:, None, :2], b[None, :, :2])
+    rb = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(rb - lt, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def match_detections(reference, candidate, iou_thresh=0.5):
+    """
+    Greedy one-to-one IoU matching of one frame's detections.
+    Returns (matched, ious of matches, |conf difference| of matches).
+    """
+    if not reference or not candidate:
+        return 0, [], []
+    ious = box_iou([d['bbox'] for d in reference], [d['bbox'] for d in candidate])
+    matched_ious, conf_diffs = [], []
+    while ious.size and ious.max() >= iou_thresh:
+        i, j = np.unravel_index(np.argmax(ious), ious.shape)
+        matched_ious.append(float(ious[i, j]))
+        conf_diffs.append(abs(reference[i]['conf'] - candidate[j]['conf']))
+        ious[i, :] = -1
+        ious[:, j] = -1
+    return len(matched_ious), matched_ious, conf_diffs
+
+
+def compare_to_reference(reference_dets, candidate_dets, reference_raw, candidate_raw, iou_thresh=0.5):
+    """Box agreement (recall/precision/IoU/conf) and raw head-output error against the fp32 reference"""
+    n_ref = sum(len(d) for d in reference_dets)
+    n_cand = sum(len(d) for d in candidate_dets)
+    matched, ious, conf_diffs = 0, [], []
+    for ref, cand in zip(reference_dets, candidate_dets):
+        m, frame_ious, frame_diffs = match_detections(ref, cand, iou_thresh)
+        matched += m
+        ious += frame_ious
+        conf_diffs += frame_diffs
+
+    # Raw output error is meaningful even when (e.g. with random weights) few boxes pass the threshold
+    rel_error = float((candidate_raw - reference_raw).abs().mean() / reference_raw.abs().mean().clamp_min(1e-12))
+    return {
+        "boxes": n_cand,
+        "reference_boxes": n_ref,
+        "box_recall": round(matched / n_ref, 4) if n_ref else None,
+        "box_precision": round(matched / n_cand, 4) if n_cand else None,
+        "mean_iou": round(float(np.mean(ious)), 4) if ious else None,
+        "mean_conf_diff": round(float(np.mean(conf_diffs)), 4) if conf_diffs else None,
+        "output_rel_error": round(rel_error, 5),
+    }
+
+
+def _timed_run(detector, frames, repeats):
+    """(detections per frame, raw head outputs, seconds per frame)"""
+    batch = torch.cat([detector._preprocess_frame(frame) for frame in frames])
+    raw = detector._forward(batch).float()  # also warms up
+    start = time.perf_counter()
+    for _ in range(repeats):
+        detector._forward(batch)
+    seconds = (time.perf_counter() - start) / (repeats * len(frames))
+    detections = [detector._to_detections(output, *frame.shape[:2])
+                  for frame, output in zip(frames, detector._postprocess(raw.clone()))]
+    return detections, raw, seconds
+
+
+def evaluate_precisions(frames, modes=None, model_name="yolox_m", pretrained=True, calibration_frames=None,
+                        repeats=3, iou_thresh=0.5):
+    """
+    Run every (precision, compile mode[, backend]) in `modes` on the same reference
+    frames and compare each against torch fp32. Returns one row per mode with
+    seconds/frame, speedup and agreement metrics. Use the frames of a real match
+    for numbers worth deploying on.
+    """
+    from components.yolox_detector import YOLOXDetector
+    from components.inference_backend import create_backend
+
+    modes = [tuple(m) + ("torch",) * (3 - len(m)) for m in (modes or [(p, "none") for p in PRECISIONS])]
+    calibration_frames = calibration_frames if calibration_frames is not None else frames
+    reference = YOLOXDetector(model_name, "cpu", batch_size=len(frames), pretrained=pretrained, compile_mode="none", backend="torch")
+    reference.detection_cache = None
+    ref_dets, ref_raw, ref_seconds = _timed_run(reference, frames, repeats)
+
+    rows = [{"backend": "torch", "precision": "fp32", "compile": "none", "seconds_per_frame": round(ref_seconds, 4),
+             "speedup": 1.0, **compare_to_reference(ref_dets, ref_dets, ref_raw, ref_raw, iou_thresh)}]
+    for precision, compile_mode, backend in modes:
+        if (precision, compile_mode, backend) == ("fp32", "none", "torch"):
+            continue
+        row = {"backend": backend, "precision": precision, "compile": compile_mode}
+        try:
+            # Same weights as the reference, even when they are random
+            detector = copy.deepcopy(reference)
+            detector.precision = precision
+            detector.compile_mode = compile_mode
+            detector.backend = create_backend(
+                backend, detector.model, precision, compile_mode,
+                example=torch.cat([detector._preprocess_frame(frames[0])]),
+                calibration_batches=[detector._preprocess_frame(f) for f in calibration_frames],
+                test_size=detector.test_size)
+            dets, raw, seconds = _timed_run(detector, frames, repeats)
+            rows.append(dict(row, seconds_per_frame=round(seconds, 4), speedup=round(ref_seconds / seconds, 2),
+                             **compare_to_reference(ref_dets, dets, ref_raw, raw, iou_thresh)))
+        except Exception as e:
+            logger.error(f"❌ {backend}/{precision}/{compile_mode} failed: {e}")
+            rows.append(dict(row, error=str(e)))
+    return rows
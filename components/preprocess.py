@@ -0,0 +1,92 @@
+"""
+Frame Preprocessing - TAHLEEL.ai
+YOLOX input preparation shared by both entry points, matching YOLOX's own
+ValTransform: BGR channel order, 0-255 values (no /255), aspect-preserving
+resize into the top-left corner of a test_size canvas padded with 114.
+
+Buffers are reused instead of allocated per frame:
+- letterbox() resizes straight into a pooled uint8 HWC canvas (thread-safe)
+- batch() converts canvases into one preallocated float32 (batch, 3, H, W)
+  tensor, fusing HWC->CHW and uint8->float32 into a single copy per frame.
+  The returned tensor is a view of that buffer, valid until the next batch()
+  call, so each LetterboxPreprocessor must have a single consumer.
+"""
+
+import threading
+
+import cv2
+import numpy as np
+import torch
+
+PAD_VALUE = 114
+
+
+def letterbox_ratio(h, w, test_size):
+    """Scale applied to an h x w frame; boxes map back to the frame by dividing by it"""
+    return min(test_size[0] / h, test_size[1] / w)
+
+
+def letterbox_into(frame, canvas):
+    """Letterbox `frame` into a (H, W, 3) uint8 canvas in place; returns the ratio"""
+    h, w = frame.shape[:2]
+    ratio = letterbox_ratio(h, w, canvas.shape[:2])
+    rh, rw = min(int(h * ratio), canvas.shape[0]), min(int(w * ratio), canvas.shape[1])
+    cv2.resize(frame, (rw, rh), dst=canvas[:rh, :rw], interpolation=cv2.INTER_LINEAR)
+    canvas[rh:, :] = PAD_VALUE
+    canvas[:rh, rw:] = PAD_VALUE
+    return ratio
+
+
+def preprocess_frame(frame, test_size=(640, 640), device="cpu"):
+    """One frame as a new (1, 3, H, W) float32 tensor (for one-off use; pipelines use LetterboxPreprocessor)"""
+    canvas = np.empty((test_size[0], test_size[1], 3), dtype=np.uint8)
+    letterbox_into(frame, canvas)
+    tensor = torch.empty((1, 3, test_size[0], test_size[1]), dtype=torch.float32)
+    np.copyto(tensor.numpy()[0], canvas.transpose(2, 0, 1))
+    return tensor.to(device)
+
+
+class LetterboxPreprocessor:
+    def __init__(self, test_size=(640, 640), max_batch=1, device="cpu"):
+        self.test_size = tuple(test_size)
+        self.device = torch.device(device)
+        self._pin = self.device.type == "cuda" and torch.cuda.is_available()
+        self._lock = threading.Lock()
+        self._free = []
+        self._buffer = None
+        self._allocate(max_batch)
+
+    def _allocate(self, max_batch):
+        # Pinned host memory makes the host->GPU copy asynchronous
+        self._buffer = torch.empty((max(1, max_batch), 3, *self.test_size), dtype=torch.float32, pin_memory=self._pin)
+        self._array = self._buffer.numpy()
+
+    def letterbox(self, frame):
+        """(canvas, ratio): `frame` letterboxed into a pooled canvas; hand the canvas to batch() or release()"""
+        with self._lock:
+            canvas = self._free.pop() if self._free else None
+        if canvas is None:
+            canvas = np.empty((self.test_size[0], self.test_size[1], 3), dtype=np.uint8)
+        return canvas, letterbox_into(frame, canvas)
+
+    def release(self, canvas):
+        with self._lock:
+            self._free.append(canvas)
+
+    def batch(self, canvases, release=True):
+        """(n, 3, H, W) input tensor from letterboxed canvases, written into the reused buffer"""
+        if len(canvases) > len(self._array):
+            self._allocate(len(canvases))
+        for i, canvas in enumerate(canvases):
+            np.copyto(self._array[i], canvas.transpose(2, 0, 1))
+            if release:
+                self.release(canvas)
+        batch = self._buffer[:len(canvases)]
+        if self.device.type != "cpu":
+            batch = batch.to(self.device, non_blocking=self._pin)
+        return batch
+
+    def __call__(self, frames):
+        """Letterbox + batch in one call; returns (batch tensor, ratios)"""
+        letterboxed = [self.letterbox(frame) for frame in frames]
+        return self.batch([canvas for canvas, _ in letterboxed]), [ratio for _, ratio in letterboxed]
@@ -0,0 +1,95 @@
+"""
+Multi-Process Serving - TAHLEEL.ai
+Run app.py as several gunicorn worker processes sharing one copy of the YOLOX
+weights (gunicorn.conf.py).
+
+With PRELOAD_MODEL the master imports the app before forking, so
+MODEL_WARMUP=eager loads the model once and every worker reads the weights
+through copy-on-write pages. Inference never writes parameters, so those pages
+stay shared; gc.freeze() before each fork keeps the collector from dirtying the
+pages holding the master's Python objects. Each worker then pins torch to its
+share of the CPUs (cpu_count // WEB_WORKERS intra-op threads unless
+WORKER_TORCH_THREADS is set), so N workers do not run N x cpu_count threads.
+
+Process-wide state that must not cross a fork (GCS connection pool, SQLite
+connections, scheduler threads, ONNX Runtime sessions) is reset in the child by
+os.register_at_fork hooks in the modules that own it.
+"""
+
+import os
+import gc
+import sys
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", "1"))
+WEB_THREADS = int(os.getenv("WEB_THREADS", "8"))
+# Load the app (and with MODEL_WARMUP=eager, the model) in the master before forking workers
+PRELOAD_MODEL = os.getenv("PRELOAD_MODEL", "true").lower() == "true"
+# torch intra-op threads per worker; 0 = an even share of the CPUs
+WORKER_TORCH_THREADS = int(os.getenv("WORKER_TORCH_THREADS", "0"))
+
+
+def worker_threads(workers=WEB_WORKERS, threads=WORKER_TORCH_THREADS, cpus=None):
+    """torch intra-op threads for each of `workers` processes"""
+    if threads > 0:
+        return threads
+    return max(1, (cpus or os.cpu_count() or 1) // max(1, workers))
+
+
+def before_fork():
+    """Master, right before forking a worker"""
+    gc.collect()
+    gc.freeze()
+
+
+def configure_worker(threads):
+    """Worker, right after the fork: pin torch's thread pools"""
+    import torch
+
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # inter-op pool already started in the master; it is idle during inference
+    logger.info(f"🧵 Worker {os.getpid()}: {threads} torch threads")
+
+
+def memory_stats(pid="self"):
+    """RSS, PSS and shared memory of a process in MB (Linux)"""
+    stats = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty"):
+                    stats[key] = int(value.split()[0]) / 1024
+    except OSError:
+        return {}
+    return {
+        "rss_mb": round(stats["Rss"], 1),
+        "pss_mb": round(stats["Pss"], 1),
+        "shared_mb": round(stats["Shared_Clean"] + stats["Shared_Dirty"], 1),
+        "private_mb": round(stats["Private_Clean"] + stats["Private_Dirty"], 1),
+    }
+
+
+def process_stats():
+    # torch only once something has imported it; /health must not pay for the import
+    torch = sys.modules.get("torch")
+    return {"pid": os.getpid(), "torch_threads": torch.get_num_threads() if torch else None, **memory_stats()}
+
+
+def readiness(warmup_mode):
+    """
+    (ready, body) for a readiness probe. With a warm-up ("eager" / "background")
+    the service is ready once the model is loaded; "lazy" loads it on the first
+    request, so there is nothing to wait for.
+    """
+    from components.model_registry import registry
+
+    model = registry.state()
+    ready = model["status"] == "ready" or (warmup_mode == "lazy" and model["status"] != "failed")
+    return ready, {"status": "ready" if ready else model["status"], "warmup": warmup_mode, "model": model}
@@ -0,0 +1,277 @@
+"""
+Sharded Detection - TAHLEEL.ai
+Split a long video into time-range shards, run frame extraction + YOLOX on the
+shards in parallel and merge the results back into one DetectionTable.
+
+Backends (SHARD_BACKEND):
+- none: one linear pass (default)
+- process: a local pool of SHARD_WORKERS processes, each with its own detector and
+  an even share of the CPU threads; the video is downloaded once and shared
+- queue: one "analysis_shard" job per shard on the job store (utils/job_store.py),
+  so every process or node running job workers against the same store
+  (JOB_BACKEND=sqlite) takes shards. Shard tables travel through storage as .npz.
+  The coordinating worker runs queued shards itself while it waits, so a single
+  worker never deadlocks on its own shards
+
+Shard boundaries are planned in milliseconds and snapped to the sampling grid by
+FrameStream, so every sampled frame belongs to exactly one shard. Merging is
+deterministic: shards are concatenated in time order, frame numbers are
+reassigned in that order (as a single pass numbers them), and track ids continue
+across boundaries by IoU-matching the last frame of a shard with the first frame
+of the next. Team ids need no remapping: TeamColorModel always labels the darker
+kit 0.
+"""
+
+import os
+import math
+import time
+import logging
+import multiprocessing
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from components.detection_table import DetectionTable
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+GCS_BUCKET = os.getenv("GCS_BUCKET_NAME", "tahleel-ai-videos")
+SHARD_BACKEND = os.getenv("SHARD_BACKEND", "none")
+SHARD_SECONDS = float(os.getenv("SHARD_SECONDS", "600"))
+SHARD_WORKERS = int(os.getenv("SHARD_WORKERS", "2"))
+# How long the coordinator waits for queued shards before failing the job
+SHARD_TIMEOUT = float(os.getenv("SHARD_TIMEOUT", "7200"))
+BACKENDS = ("none", "process", "queue")
+SHARD_JOB_TYPE = "analysis_shard"
+
+Shard = namedtuple("Shard", ["index", "start_ms", "end_ms"])  # end_ms None = to the end of the video
+
+
+def plan_shards(duration_ms, shard_seconds=SHARD_SECONDS):
+    """Consecutive shards of `shard_seconds`; the last one runs to the end of the video"""
+    step = shard_seconds * 1000
+    count = max(1, math.ceil(duration_ms / step))
+    return [Shard(i, i * step, (i + 1) * step if i < count - 1 else None) for i in range(count)]
+
+
+def shard_result_path(video_id, index):
+    return f"results/{video_id}/shards/{index:04d}.npz"
+
+
+def detect_shard(gcs_url, shard, fps, resize, persist_frames=False, video_path=None, progress_callback=None):
+    """Frame extraction + detection for one shard; returns its DetectionTable"""
+    from components.frame_extractor import FrameStream
+    from components.yolox_detector import run_yolox_detection
+
+    frames = FrameStream(gcs_url, fps=fps, resize=tuple(resize), persist_frames=persist_frames,
+                         start_ms=shard.start_ms, end_ms=shard.end_ms, video_path=video_path)
+    if frames.metadata.get("error"):
+        raise RuntimeError(f"Shard {shard.index} extraction failed: {frames.metadata['error']}")
+    table = run_yolox_detection(frames, progress_callback=progress_callback, columnar=True)
+    table.metadata = {**frames.metadata, "shard": dict(shard._asdict(), **frames.metadata.get("shard", {}))}
+    return table
+
+
+def run_shard_job(payload, progress, video_path=None):
+    """Job handler for "analysis_shard" jobs: detect one shard and store its table"""
+    from utils.storage import get_storage
+
+    shard = Shard(**payload["shard"])
+    progress.stage("detecting")
+    table = detect_shard(payload["gcs_url"], shard, payload["fps"], payload["resize"], payload.get("persist_frames", False),
+                         video_path=video_path, progress_callback=progress.frames)
+    path = shard_result_path(payload["video_id"], shard.index)
+    get_storage(GCS_BUCKET).upload_bytes(path, table.to_bytes(), content_type="application/octet-stream")
+    return {"path": path, "frames": len(table)}
+
+
+# Merging
+
+def merge_shard_tables(tables, stitch_iou=None):
+    """One DetectionTable from per-shard tables (any order), as a single pass would produce it"""
+    from components.precision import box_iou
+    from components.tracker import TRACK_MATCH_IOU, _greedy_match
+
+    stitch_iou = TRACK_MATCH_IOU if stitch_iou is None else stitch_iou
+    tables = sorted(tables, key=lambda t: t.metadata.get("shard", {}).get("index", 0))
+    frames, boxes, urls, errors = [], [], [], {}
+    next_track = 1
+    tail = None  # previous shard's last frame boxes (with merged track ids)
+    row_offset = box_offset = 0
+
+    for table in tables:
+        shard_frames, shard_boxes = table.frames.copy(), table.boxes.copy()
+        track_ids = shard_boxes["track_id"]
+
+        mapping = {}
+        if tail is not None and len(shard_frames):
+            head = table.frame_boxes(0)
+            head, tail = head[head["track_id"] >= 0], tail[tail["track_id"] >= 0]
+            coords = ["x1", "y1", "x2", "y2"]
+            if len(head) and len(tail):
+                iou = box_iou(np.stack([tail[c] for c in coords], 1), np.stack([head[c] for c in coords], 1))
+                for t, h in _greedy_match(iou, stitch_iou):
+                    mapping[int(head["track_id"][h])] = int(tail["track_id"][t])
+        for track_id in np.unique(track_ids[track_ids >= 0]).tolist():
+            if track_id not in mapping:
+                mapping[track_id] = next_track
+                next_track += 1
+        tracked = track_ids >= 0
+        track_ids[tracked] = [mapping[t] for t in track_ids[tracked].tolist()]
+
+        shard_boxes["frame_idx"] += row_offset
+        shard_frames["box_start"] += box_offset
+        frames.append(shard_frames)
+        boxes.append(shard_boxes)
+        urls.extend(table.frame_urls)
+        errors.update({row + row_offset: message for row, message in table.errors.items()})
+        row_offset += len(shard_frames)
+        box_offset += len(shard_boxes)
+        tail = shard_boxes[shard_boxes["frame_idx"] == row_offset - 1] if len(shard_frames) else None
+
+    merged = DetectionTable(
+        frames=np.concatenate(frames) if frames else None,
+        boxes=np.concatenate(boxes) if boxes else None,
+        frame_urls=urls, errors=errors,
+        metadata={"shards": [t.metadata.get("shard") for t in tables]},
+    )
+    merged.frames["frame_number"] = np.arange(len(merged))
+    return merged
+
+
+# Backends
+
+def _init_process(threads):
+    import torch
+    torch.set_num_threads(threads)
+
+
+def _detect_shard_bytes(args):
+    """Shard table as bytes plus the stage timings measured in this process"""
+    from utils.metrics import job_trace
+
+    with job_trace(SHARD_JOB_TYPE) as trace:
+        table = detect_shard(*args)
+    return table.to_bytes(), trace.summary()["stages"]
+
+
+def _run_process_shards(gcs_url, shards, fps, resize, persist_frames, video_path, progress_callback, workers):
+    # spawn: forked children would inherit the parent's torch / OpenMP thread state
+    from utils.metrics import current_trace
+
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    trace = current_trace()
+    tables, done = [], 0
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_process, initargs=(threads,)) as pool:
+        futures = [pool.submit(_detect_shard_bytes, (gcs_url, shard, fps, resize, persist_frames, video_path))
+                   for shard in shards]
+        for future in as_completed(futures):
+            data, stages = future.result()
+            table = DetectionTable.from_bytes(data)
+            if trace is not None:
+                trace.merge(stages)
+            tables.append(table)
+            done += len(table)
+            if progress_callback:
+                progress_callback(done)
+    return tables
+
+
+def _run_queued_shards(video_id, gcs_url, shards, fps, resize, persist_frames, video_path, progress_callback,
+                       timeout=SHARD_TIMEOUT):
+    from utils.job_store import get_job_store
+    from utils.storage import get_storage
+    from components.job_worker import JobWorkerPool
+    from utils.metrics import current_trace
+
+    store = get_job_store()
+    trace = current_trace()
+    jobs = {}
+    for shard in shards:
+        payload = {"video_id": video_id, "gcs_url": gcs_url, "shard": shard._asdict(), "fps": fps,
+                   "resize": list(resize), "persist_frames": persist_frames}
+        jobs[store.create(SHARD_JOB_TYPE, payload)["id"]] = shard
+
+    # Shards of this video reuse the local copy when the coordinator runs them
+    helper = JobWorkerPool(store, {SHARD_JOB_TYPE: lambda payload, progress: run_shard_job(
+        payload, progress, video_path if payload["video_id"] == video_id else None)})
+    deadline = time.time() + timeout
+    results = {}
+    local = set()  # shards run here already count toward this job's trace
+    while True:
+        frames_done = 0
+        for job_id, shard in jobs.items():
+            if job_id not in results:
+                job = store.get(job_id)
+                if job["status"] == "failed":
+                    raise RuntimeError(f"Shard {shard.index} failed: {job['error']}")
+                if job["status"] == "complete":
+                    results[job_id] = job["result"]
+                    if trace is not None and job_id not in local:
+                        trace.merge(job["result"].get("timings", {}).get("stages", {}))
+                else:
+                    frames_done += job["frames_done"] or 0
+            if job_id in results:
+                frames_done += results[job_id]["frames"]
+        if progress_callback:
+            progress_callback(frames_done)
+        if len(results) == len(jobs):
+            break
+        if time.time() > deadline:
+            raise TimeoutError(f"{len(jobs) - len(results)} shards not finished after {timeout:.0f}s")
+        job = store.claim(timeout=1.0, types=(SHARD_JOB_TYPE,))
+        if job is not None:
+            local.add(job["id"])
+            helper.execute(job)
+
+    storage = get_storage(GCS_BUCKET)
+    return [DetectionTable.from_bytes(storage.download_bytes(results[job_id]["path"])) for job_id in jobs]
+
+
+def run_sharded_detection(video_id, gcs_url, fps=5, resize=(1280, 720), persist_frames=False, backend=SHARD_BACKEND,
+                          shard_seconds=SHARD_SECONDS, workers=SHARD_WORKERS, progress=None):
+    """
+    Detect a video shard by shard with `backend` (process | queue).
+    Returns (merged DetectionTable, video metadata) like FrameStream + run_yolox_detection.
+    `progress` is the job's JobProgress, or None.
+    """
+    from components.frame_extractor import FrameStream, download_video_from_gcs
+
+    if backend not in BACKENDS or backend == "none":
+        raise ValueError(f"Unsupported shard backend '{backend}'. Allowed: process, queue")
+
+    video_path = download_video_from_gcs(gcs_url)
+    if not video_path:
+        raise RuntimeError("Frame extraction failed: Video download failed")
+    try:
+        probe = FrameStream(gcs_url, fps=fps, resize=resize, video_path=video_path)
+        metadata = dict(probe.metadata)
+        probe.close()
+        if metadata.get("error"):
+            raise RuntimeError(f"Frame extraction failed: {metadata['error']}")
+
+        shards = plan_shards(metadata["duration_seconds"] * 1000, shard_seconds)
+        total = metadata.get("expected_frames")
+        logger.info(f"🧩 {metadata['duration_seconds']}s video in {len(shards)} shards of {shard_seconds:g}s ({backend})")
+        if progress:
+            progress.stage("detecting", frames_total=total)
+        callback = (lambda done, _=None: progress.frames(done, total)) if progress else None
+
+        start = time.perf_counter()
+        if len(shards) == 1:
+            tables = [detect_shard(gcs_url, shards[0], fps, resize, persist_frames, video_path, callback)]
+        elif backend == "process":
+            tables = _run_process_shards(gcs_url, shards, fps, resize, persist_frames, video_path, callback, workers)
+        else:
+            tables = _run_queued_shards(video_id, gcs_url, shards, fps, resize, persist_frames, video_path, callback)
+    finally:
+        if os.path.exists(video_path):
+            os.remove(video_path)
+
+    detections = merge_shard_tables(tables)
+    metadata.update(total_frames=len(detections), shards=len(shards), shard_backend=backend)
+    logger.info(f"🧩 Merged {len(shards)} shards: {len(detections)} frames in {time.perf_counter() - start:.1f}s")
+    return detections, metadata
@@ -0,0 +1,140 @@
+"""
+Team Color Model - TAHLEEL.ai
+Kit-color team assignment fitted once per video and updated incrementally,
+so each frame only needs a vectorized nearest-centroid lookup and team_id
+means the same team in every frame.
+"""
+
+import os
+import threading
+
+import cv2
+import numpy as np
+
+TEAM_MIN_SAMPLES = int(os.getenv("TEAM_MIN_SAMPLES", "40"))
+TEAM_MOMENTUM = float(os.getenv("TEAM_MOMENTUM", "0.02"))
+
+# BGR luminance weights; centroids are ordered darkest kit first so labels are canonical
+_LUMA = np.array([0.114, 0.587, 0.299])
+
+
+def box_colors(frame, bboxes):
+    """
+    Mean BGR color of the upper third (shirt) of every box, computed from one
+    integral image instead of cropping each box.
+    Returns (colors (N, 3) float, valid (N,) bool) — invalid boxes have empty crops.
+    """
+    if len(bboxes) == 0:
+        return np.zeros((0, 3)), np.zeros(0, dtype=bool)
+
+    h, w = frame.shape[:2]
+    boxes = np.asarray(bboxes, dtype=np.int64).reshape(-1, 4)
+    x1 = np.clip(boxes[:, 0], 0, w)
+    y1 = np.clip(boxes[:, 1], 0, h)
+    x2 = np.clip(boxes[:, 2], 0, w)
+    y2 = np.clip(boxes[:, 3], 0, h)
+    # Same crop as frame[y1:y2, x1:x2][:height // 3]
+    y2 = y1 + np.maximum(y2 - y1, 0) // 3
+
+    integral = cv2.integral(frame)  # (h + 1, w + 1, 3)
+    sums = integral[y2, x2] - integral[y1, x2] - integral[y2, x1] + integral[y1, x1]
+    area = (np.maximum(x2 - x1, 0) * np.maximum(y2 - y1, 0)).astype(np.float64)
+    valid = area > 0
+    colors = np.zeros((len(boxes), 3))
+    colors[valid] = sums[valid] / area[valid, None]
+    return colors, valid
+
+
+def two_means(colors, iterations=10):
+    """Deterministic 2-means: farthest-point init, Lloyd iterations, darkest centroid first"""
+    colors = np.asarray(colors, dtype=np.float64)
+    first = colors[np.argmax(((colors - colors.mean(axis=0)) ** 2).sum(axis=1))]
+    second = colors[np.argmax(((colors - first) ** 2).sum(axis=1))]
+    centroids = np.stack([first, second])
+
+    for _ in range(iterations):
+        labels = _nearest(colors, centroids)
+        updated = np.stack([colors[labels == k].mean(axis=0) if np.any(labels == k) else centroids[k] for k in (0, 1)])
+        if np.allclose(updated, centroids):
+            break
+        centroids = updated
+
+    return centroids[np.argsort(centroids @ _LUMA)]
+
+
+def _nearest(colors, centroids):
+    return ((colors[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+
+
+class TeamColorModel:
+    """
+    Two kit-color centroids per video. Until `min_samples` shirt colors have been
+    seen the model refits on everything buffered; after that it is frozen except
+    for a slow moving-average update, so team ids never swap mid-match.
+    """
+
+    def __init__(self, min_samples=TEAM_MIN_SAMPLES, momentum=TEAM_MOMENTUM):
+        self.min_samples = min_samples
+        self.momentum = momentum
+        self.centroids = None
+        self.fitted = False
+        self._buffer = []
+        self._buffered = 0
+        self._lock = threading.Lock()
+
+    def fit(self, colors):
+        self.centroids = two_means(colors)
+        self.fitted = True
+        self._buffer = []
+        return self
+
+    def predict(self, colors):
+        colors = np.asarray(colors, dtype=np.float64).reshape(-1, 3)
+        if self.centroids is None or len(colors) == 0:
+            return np.zeros(len(colors), dtype=np.int64)
+        return _nearest(colors, self.centroids)
+
+    def assign(self, colors):
+        """Team labels for one frame's shirt colors, learning from them as it goes"""
+        colors = np.asarray(colors, dtype=np.float64).reshape(-1, 3)
+        if len(colors) == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        with self._lock:
+            if not self.fitted:
+                self._buffer.append(colors)
+                self._buffered += len(colors)
+                samples = np.concatenate(self._buffer)
+                if len(samples) >= 2:
+                    self.centroids = two_means(samples)
+                if self._buffered >= self.min_samples:
+                    self.fit(samples)
+                return self.predict(colors)
+
+            labels = self.predict(colors)
+            for k in (0, 1):
+                members = colors[labels == k]
+                if len(members):
+                    self.centroids[k] += self.momentum * (members.mean(axis=0) - self.centroids[k])
+            return labels
+
+
+def assign_team_ids(colors, valid, team_model):
+    """
+    Team ids for one frame's boxes from precomputed shirt colors.
+    Returns (keep (N,) bool, team_ids for the kept boxes): boxes with empty crops
+    are dropped, except while the model has too few samples to cluster the frame.
+    """
+    valid = np.asarray(valid, dtype=bool)
+    if np.count_nonzero(valid) < 2 and not team_model.fitted:
+        return np.ones(len(valid), dtype=bool), np.zeros(len(valid), dtype=np.int64)
+    return valid, team_model.assign(colors[valid])
+
+
+def assign_teams(detections, colors, valid, team_model):
+    """Set det['team_id'] from precomputed shirt colors; drops boxes with empty crops"""
+    keep, team_ids = assign_team_ids(colors, valid, team_model)
+    kept = [det for det, k in zip(detections, keep) if k]
+    for det, team_id in zip(kept, team_ids):
+        det['team_id'] = int(team_id)
+    return kept
@@ -0,0 +1,241 @@
+"""
+Player Tracking - TAHLEEL.ai
+Persistent player track ids across frames, and cheap box propagation between
+YOLOX keyframes.
+
+- PlayerTracker: ByteTrack-style association. Each track has a constant-velocity
+  Kalman filter over (cx, cy, w, h); high-score detections are matched to the
+  predicted boxes first, then low-score detections get a second chance against the
+  tracks left over (occluded players often drop in score before they vanish).
+  Unmatched high-score detections start new tracks; tracks unmatched for
+  TRACK_MAX_LOST steps are dropped.
+- propagate_boxes: moves boxes from one frame to the next with sparse
+  Lucas-Kanade optical flow on a downscaled grayscale image, so YOLOX only has to
+  run every K frames (run_yolox_detection(keyframe_interval=K)).
+"""
+
+import os
+
+import cv2
+import numpy as np
+
+from components.precision import box_iou
+
+# Detections at or above this score start tracks / take part in the first association round
+TRACK_HIGH_THRESH = float(os.getenv("TRACK_HIGH_THRESH", "0.5"))
+# Minimum IoU between a predicted track box and a detection to match them
+TRACK_MATCH_IOU = float(os.getenv("TRACK_MATCH_IOU", "0.2"))
+# Steps (frames) a track survives without a matching detection; 15 = 3 s at 5 FPS
+TRACK_MAX_LOST = int(os.getenv("TRACK_MAX_LOST", "15"))
+# Width of the grayscale image optical flow runs on
+FLOW_WIDTH = int(os.getenv("FLOW_WIDTH", "640"))
+
+# Kalman noise, relative to box height (as in SORT / ByteTrack)
+_STD_POSITION = 1 / 20
+_STD_VELOCITY = 1 / 160
+
+
+class KalmanBoxFilter:
+    """Constant-velocity Kalman filter over (cx, cy, w, h, vcx, vcy, vw, vh)"""
+
+    _F = np.eye(8)
+    _F[:4, 4:] = np.eye(4)
+    _H = np.eye(4, 8)
+
+    def __init__(self, box):
+        self.mean = np.r_[_xyxy_to_cxcywh(box), np.zeros(4)]
+        h = max(self.mean[3], 1.0)
+        std = [2 * _STD_POSITION * h] * 4 + [10 * _STD_VELOCITY * h] * 4
+        self.cov = np.diag(np.square(std))
+
+    def predict(self):
+        h = max(self.mean[3], 1.0)
+        std = [_STD_POSITION * h] * 4 + [_STD_VELOCITY * h] * 4
+        self.mean = self._F @ self.mean
+        self.cov = self._F @ self.cov @ self._F.T + np.diag(np.square(std))
+
+    def update(self, box, noise=1.0):
+        """Correct with a measured box; `noise` > 1 trusts the measurement less (e.g. optical flow)"""
+        h = max(self.mean[3], 1.0)
+        R = np.diag(np.square([noise * _STD_POSITION * h] * 4))
+        S = self._H @ self.cov @ self._H.T + R
+        K = np.linalg.solve(S, self._H @ self.cov).T
+        self.mean = self.mean + K @ (_xyxy_to_cxcywh(box) - self._H @ self.mean)
+        self.cov = self.cov - K @ S @ K.T
+
+    @property
+    def box(self):
+        cx, cy, w, h = self.mean[:4]
+        return np.array([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2])
+
+
+class Track:
+    def __init__(self, track_id, box, score, team_id=-1):
+        self.track_id = track_id
+        self.kalman = KalmanBoxFilter(box)
+        self.score = float(score)
+        self.team_votes = {}
+        self.lost = 0
+        self.vote(team_id)
+
+    def vote(self, team_id):
+        if team_id >= 0:
+            self.team_votes[team_id] = self.team_votes.get(team_id, 0) + 1
+
+    @property
+    def team_id(self):
+        """Most frequent team this track was assigned at keyframes (-1 when never assigned)"""
+        return max(self.team_votes, key=self.team_votes.get) if self.team_votes else -1
+
+
+def _xyxy_to_cxcywh(box):
+    x1, y1, x2, y2 = np.asarray(box, dtype=np.float64)
+    return np.array([(x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1])
+
+
+def _greedy_match(iou, thresh):
+    """One-to-one (row, col) pairs, highest IoU first, all at or above `thresh`"""
+    if not iou.size:
+        return []
+    rows, cols = np.nonzero(iou >= thresh)
+    order = np.argsort(-iou[rows, cols], kind="stable")
+    used_rows, used_cols, pairs = set(), set(), []
+    for r, c in zip(rows[order].tolist(), cols[order].tolist()):
+        if r not in used_rows and c not in used_cols:
+            used_rows.add(r)
+            used_cols.add(c)
+            pairs.append((r, c))
+    return pairs
+
+
+class PlayerTracker:
+    """Assigns persistent track ids to one video's player boxes, fed in frame order"""
+
+    def __init__(self, high_thresh=TRACK_HIGH_THRESH, match_iou=TRACK_MATCH_IOU, max_lost=TRACK_MAX_LOST):
+        self.high_thresh = high_thresh
+        self.match_iou = match_iou
+        self.max_lost = max_lost
+        self.tracks = []
+        self._next_id = 1
+
+    def _predict(self):
+        for track in self.tracks:
+            track.kalman.predict()
+
+    def _associate(self, tracks, boxes):
+        if not tracks or not len(boxes):
+            return []
+        iou = box_iou(np.array([t.kalman.box for t in tracks]), boxes)
+        return _greedy_match(iou, self.match_iou)
+
+    def update(self, boxes, scores, team_ids=None):
+        """
+        Advance one frame with its detections: (N, 4) xyxy boxes, (N,) scores and
+        optional (N,) team ids. Returns (N,) track ids, -1 for low-score boxes no
+        track claimed.
+        """
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        scores = np.asarray(scores, dtype=np.float64)
+        team_ids = np.full(len(boxes), -1) if team_ids is None else np.asarray(team_ids)
+        track_ids = np.full(len(boxes), -1, dtype=np.int32)
+        self._predict()
+
+        # Round 1: high-score detections against every track; round 2: the rest against leftovers
+        high = np.flatnonzero(scores >= self.high_thresh)
+        low = np.flatnonzero(scores < self.high_thresh)
+        unmatched = list(self.tracks)
+        for candidates in (high, low):
+            pairs = self._associate(unmatched, boxes[candidates])
+            for t, d in pairs:
+                det = candidates[d]
+                track = unmatched[t]
+                track.kalman.update(boxes[det])
+                track.score = float(scores[det])
+                track.lost = 0
+                track.vote(int(team_ids[det]))
+                track_ids[det] = track.track_id
+            matched = {t for t, _ in pairs}
+            unmatched = [track for i, track in enumerate(unmatched) if i not in matched]
+
+        for track in unmatched:
+            track.lost += 1
+        self.tracks = [t for t in self.tracks if t.lost <= self.max_lost]
+
+        for det in high[track_ids[high] < 0]:
+            track = Track(self._next_id, boxes[det], scores[det], int(team_ids[det]))
+            self._next_id += 1
+            self.tracks.append(track)
+            track_ids[det] = track.track_id
+        return track_ids
+
+    def active(self):
+        """Tracks matched by the latest detections (the ones worth propagating)"""
+        return [t for t in self.tracks if t.lost == 0]
+
+    def propagate(self, boxes=None, ok=None, flow_noise=1.0):
+        """
+        Advance one frame without detections. `boxes` / `ok` are the active tracks'
+        boxes moved by optical flow (propagate_boxes); tracks flow could not follow
+        keep their Kalman prediction. Returns (track_ids, boxes, scores, team_ids)
+        of the active tracks.
+        """
+        active = self.active()
+        for track in self.tracks:
+            track.kalman.predict()
+        if boxes is not None:
+            for track, box, followed in zip(active, boxes, ok):
+                if followed:
+                    track.kalman.update(box, noise=flow_noise)
+        for track in self.tracks:
+            if track.lost:
+                track.lost += 1
+        self.tracks = [t for t in self.tracks if t.lost <= self.max_lost]
+        return (
+            np.array([t.track_id for t in active], dtype=np.int32),
+            np.array([t.kalman.box for t in active], dtype=np.float64).reshape(-1, 4),
+            np.array([t.score for t in active], dtype=np.float32),
+            np.array([t.team_id for t in active], dtype=np.int64),
+        )
+
+
+# Optical flow
+
+def flow_image(frame, width=FLOW_WIDTH):
+    """(grayscale image at most `width` wide, scale from frame to that image)"""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    scale = min(1.0, width / gray.shape[1])
+    if scale < 1.0:
+        gray = cv2.resize(gray, (round(gray.shape[1] * scale), round(gray.shape[0] * scale)), interpolation=cv2.INTER_AREA)
+    return gray, scale
+
+
+def propagate_boxes(prev, curr, boxes, grid=4, min_points=4):
+    """
+    Move frame-coordinate boxes from `prev` to `curr`, both flow_image() results.
+    Each box follows the median motion of a grid x grid set of points tracked
+    with pyramidal Lucas-Kanade; returns (moved boxes, ok mask), ok=False where
+    fewer than `min_points` points were tracked.
+    """
+    (prev_gray, scale), (curr_gray, _) = prev, curr
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    if not len(boxes):
+        return boxes, np.zeros(0, dtype=bool)
+
+    # Points spread over the box; a player's outline is where the texture is
+    steps = (np.arange(grid) + 0.5) / grid
+    fx, fy = np.meshgrid(steps, steps)
+    x1, y1, x2, y2 = (boxes * scale).T
+    px = x1[:, None] + fx.ravel()[None, :] * (x2 - x1)[:, None]
+    py = y1[:, None] + fy.ravel()[None, :] * (y2 - y1)[:, None]
+    points = np.stack([px, py], axis=-1).reshape(-1, 1, 2).astype(np.float32)
+
+    moved, status, _ = cv2.calcOpticalFlowPyrLK(prev_gray, curr_gray, points, None, winSize=(15, 15), maxLevel=2)
+    status = status.reshape(len(boxes), -1).astype(bool)
+    shift = (moved - points).reshape(len(boxes), -1, 2)
+
+    ok = status.sum(axis=1) >= min_points
+    out = boxes.copy()
+    for i in np.flatnonzero(ok):
+        dx, dy = np.median(shift[i][status[i]], axis=0) / scale
+        out[i] += [dx, dy, dx, dy]
+    return out, ok
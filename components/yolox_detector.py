@@ -2,46 +2,114 @@
 import torch
 import cv2
 import numpy as np
-from sklearn.cluster import KMeans
-from google.cloud import storage
 import logging
 import os
-import tempfile
+import threading
 from pathlib import Path
 
+from components.team_classifier import TeamColorModel, box_colors, assign_teams, assign_team_ids
+from utils.storage import get_storage, storage_for_url
+from utils.detection_cache import get_detection_cache, config_key
+from components.precision import PRECISIONS
+from components.inference_backend import create_backend
+from components.preprocess import LetterboxPreprocessor, letterbox_ratio, preprocess_frame
+from components.tracker import PlayerTracker, flow_image, propagate_boxes
+from utils.metrics import span
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 GCS_BUCKET = os.getenv("GCS_BUCKET_NAME", "tahleel-ai-videos")
+# Downloaded checkpoints (and their ONNX exports)
+WEIGHTS_DIR = "/tmp/yolox_models"
+YOLOX_BATCH_SIZE = int(os.getenv("YOLOX_BATCH_SIZE", "4"))
+CONF_THRESH = 0.25
+NMS_THRESH = 0.45
+PERSON_CLASS = 0
+# Bump when the meaning of cached boxes changes (e.g. rescaling), so old entries are not reused
+DETECTION_FORMAT = 3
+# torch | onnxruntime (components/inference_backend.py)
+YOLOX_BACKEND = os.getenv("YOLOX_BACKEND", "torch")
+# none | jit | compile (components/precision.py)
+YOLOX_COMPILE = os.getenv("YOLOX_COMPILE", "none")
+# int8_static calibrates on JPEG frames stored under this prefix
+CALIBRATION_PREFIX = os.getenv("YOLOX_CALIBRATION_PREFIX", "calibration/")
+CALIBRATION_FRAMES = int(os.getenv("YOLOX_CALIBRATION_FRAMES", "32"))
+# Run YOLOX on every Kth frame and propagate boxes with optical flow in between (1 = every frame)
+YOLOX_KEYFRAME_INTERVAL = int(os.getenv("YOLOX_KEYFRAME_INTERVAL", "1"))
+# Persistent player track ids (components/tracker.py); always on when the keyframe interval is > 1
+TRACKING_ENABLED = os.getenv("TRACKING_ENABLED", "true").lower() == "true"
 
 class YOLOXDetector:
-    def __init__(self, model_name="yolox_m", device="cpu"):
+    def __init__(self, model_name="yolox_m", device="cpu", batch_size=YOLOX_BATCH_SIZE, pretrained=True, precision="fp32",
+                 compile_mode=YOLOX_COMPILE, calibration_frames=None, backend=YOLOX_BACKEND):
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unsupported precision '{precision}'. Allowed: {PRECISIONS}")
         self.device = device
         self.model_name = model_name
+        self.precision = precision
+        self.compile_mode = compile_mode
+        self.calibration_frames = calibration_frames
+        self.backend_name = backend
         self.model = None
-        self.conf_thresh = 0.25
-        self.nms_thresh = 0.45
-        logger.info(f"🔧 YOLOXDetector: {model_name} on {device}")
+        # What forward passes run on (components/inference_backend.py)
+        self.backend = None
+        self.weights_path = None
+        self.conf_thresh = CONF_THRESH
+        self.nms_thresh = NMS_THRESH
+        self.batch_size = max(1, int(batch_size))
+        # pretrained=False keeps random weights (benchmarks / offline tests)
+        self.pretrained = pretrained
+        logger.info(f"🔧 YOLOXDetector: {model_name} on {device}, batch size {self.batch_size}, {backend}, {precision}, compile {compile_mode}")
         self._load_model()
+        # Random weights differ per instance, so only pretrained models are memoized
+        self.detection_cache = get_detection_cache() if pretrained else None
+        self.cache_config = self._cache_config()
+    
+    def _cache_config(self):
+        """Detection cache scope: everything that changes the boxes for the same frame"""
+        return config_key({
+            'model_name': self.model_name, 'precision': self.precision, 'backend': self.backend_name,
+            'weights': self._weights_fingerprint(), 'conf_thresh': self.conf_thresh,
+            'nms_thresh': self.nms_thresh, 'test_size': list(self.test_size), 'format': DETECTION_FORMAT,
+        })
+    
+    def _weights_fingerprint(self):
+        return weights_fingerprint(self.weights_path)
     
     def _load_model(self):
         try:
-            logger.info("📦 Loading YOLOx from GCS...")
-            weights_path = self._download_weights_from_gcs()
-            if not weights_path:
-                raise FileNotFoundError("Weights not found")
-            
             from yolox.exp import get_exp
             exp = get_exp(None, "yolox-m")
             self.model = exp.get_model()
             
-            ckpt = torch.load(weights_path, map_location=self.device)
-            self.model.load_state_dict(ckpt["model"])
+            if self.pretrained:
+                logger.info("📦 Loading YOLOx from GCS...")
+                self.weights_path = self._download_weights_from_gcs()
+                if not self.weights_path:
+                    raise FileNotFoundError("Weights not found")
+                
+                ckpt = torch.load(self.weights_path, map_location=self.device)
+                self.model.load_state_dict(ckpt["model"])
+            else:
+                logger.info("📦 Using randomly initialized YOLOx (no weights)")
+            
             self.model.to(self.device)
             self.model.eval()
             
             self.num_classes = exp.num_classes
             self.test_size = exp.test_size
+            self.backend = create_backend(
+                self.backend_name, self.model, self.precision, self.compile_mode,
+                example=torch.zeros(1, 3, *self.test_size, device=self.device),
+                calibration_batches=self._calibration_batches(),
+                # Exported once next to the cached weights
+                onnx_path=str(Path(self.weights_path).with_suffix(".onnx")) if self.weights_path else None,
+                weights_path=self.weights_path,
+                test_size=self.test_size)
+            if self.backend_name != "torch":
+                # The runtime holds its own copy of the weights
+                self.model = None
             logger.info("✅ YOLOx loaded!")
         except Exception as e:
             logger.error(f"❌ Load failed: {e}")
@@ -49,17 +117,12 @@ class YOLOXDetector:
     
     def _download_weights_from_gcs(self):
         try:
-            client = storage.Client()
-            bucket = client.bucket(GCS_BUCKET)
-            blob = bucket.blob(f"models/{self.model_name}.pth")
-            
-            local_dir = Path("/tmp/yolox_models")
-            local_dir.mkdir(exist_ok=True)
-            local_path = local_dir / f"{self.model_name}.pth"
+            local_path = Path(weights_path(self.model_name))
+            local_path.parent.mkdir(exist_ok=True)
             
             if not local_path.exists():
                 logger.info(f"📥 Downloading {self.model_name}.pth...")
-                blob.download_to_filename(str(local_path))
+                get_storage(GCS_BUCKET).download_to_file(f"models/{self.model_name}.pth", str(local_path))
                 logger.info("✅ Downloaded")
             else:
                 logger.info("✅ Using cached weights")
@@ -69,159 +132,453 @@ class YOLOXDetector:
             logger.error(f"❌ Download failed: {e}")
             return None
     
+    def _calibration_batches(self):
+        """Preprocessed frames for int8_static calibration (given, or downloaded from CALIBRATION_PREFIX)"""
+        if self.precision != "int8_static":
+            return None
+        frames = self.calibration_frames
+        if frames is None:
+            from utils.transfer_manager import get_transfer_manager
+            paths = [p for p in get_storage(GCS_BUCKET).list(CALIBRATION_PREFIX) if p.lower().endswith(('.jpg', '.jpeg', '.png'))]
+            results, _ = get_transfer_manager().download_many(paths[:CALIBRATION_FRAMES], decode=True)
+            frames = [r.data for r in results if r.ok]
+            logger.info(f"📥 {len(frames)} calibration frames from {CALIBRATION_PREFIX}")
+        return [self._preprocess_frame(frame) for frame in frames]
+    
     def _download_frame_from_gcs(self, frame_url):
         try:
-            parts = frame_url.replace("gs://", "").split("/", 1)
-            bucket_name = parts[0]
-            blob_path = parts[1]
-            
-            client = storage.Client()
-            bucket = client.bucket(bucket_name)
-            blob = bucket.blob(blob_path)
-            
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".jpg")
-            blob.download_to_filename(temp_file.name)
-            
-            frame = cv2.imread(temp_file.name)
-            os.unlink(temp_file.name)
-            return frame
+            # Decode straight from memory, no temp file
+            backend, blob_path = storage_for_url(frame_url)
+            data = backend.download_bytes(blob_path)
+            return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
         except Exception as e:
             logger.error(f"❌ Frame download failed: {e}")
             return None
     
     def _preprocess_frame(self, frame):
-        img = cv2.resize(frame, self.test_size)
-        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        img = img.astype(np.float32) / 255.0
-        img = np.transpose(img, (2, 0, 1))
-        img = np.expand_dims(img, axis=0)
-        return torch.from_numpy(img).to(self.device)
+        """One letterboxed frame as a new (1, 3, H, W) tensor (components/preprocess.py)"""
+        return preprocess_frame(frame, self.test_size, self.device)
     
-    def _detect_on_frame(self, frame):
+    def _preprocessor(self):
+        """This thread's reusable LetterboxPreprocessor for detect_batch"""
+        key = (tuple(self.test_size), str(self.device))
+        cache = getattr(_thread_preprocessors, "by_key", None)
+        if cache is None:
+            cache = _thread_preprocessors.by_key = {}
+        if key not in cache:
+            cache[key] = LetterboxPreprocessor(self.test_size, self.batch_size, self.device)
+        return cache[key]
+    
+    def _box_scale(self, h, w):
+        """(sx, sy) from model input to frame coordinates: the inverse letterbox ratio on both axes"""
+        ratio = letterbox_ratio(h, w, self.test_size)
+        return 1 / ratio, 1 / ratio
+    
+    def _to_arrays(self, output, h, w):
+        """One image's (boxes, scores) from _postprocess -> (int32 (N, 4) boxes in frame coordinates, float32 (N,) scores)"""
+        if output is None or len(output[0]) == 0:
+            return _empty_arrays()
+        boxes, scores = output
+        sx, sy = self._box_scale(h, w)
+        boxes = boxes.cpu().numpy().astype(np.float64) * np.array([sx, sy, sx, sy])
+        return boxes.astype(np.int32), scores.cpu().numpy().astype(np.float32)
+    
+    def _to_detections(self, output, h, w):
+        """Detection dicts in frame coordinates for one image's _postprocess output"""
+        return detections_from_arrays(*self._to_arrays(output, h, w))
+    
+    def _frame_key(self, frame):
+        """Detection cache key for a frame, or None when caching is off"""
+        if self.detection_cache is None or frame is None:
+            return None
         try:
-            if frame is None:
-                return []
-            
-            img_tensor = self._preprocess_frame(frame)
-            h, w = frame.shape[:2]
-            
-            with torch.no_grad():
-                outputs = self.model(img_tensor)
-            
-            from yolox.utils import postprocess
-            outputs = postprocess(outputs, self.num_classes, self.conf_thresh, self.nms_thresh, class_agnostic=True)
-            
-            if outputs[0] is None:
-                return []
-            
-            outputs = outputs[0].cpu().numpy()
-            ratio = min(self.test_size[0] / h, self.test_size[1] / w)
-            
-            detections = []
-            for det in outputs:
-                x1, y1, x2, y2, obj_conf, cls_conf, cls_id = det
-                
-                if int(cls_id) != 0:
-                    continue
-                
-                x1, y1, x2, y2 = int(x1/ratio), int(y1/ratio), int(x2/ratio), int(y2/ratio)
-                conf = obj_conf * cls_conf
-                
-                if conf < self.conf_thresh:
-                    continue
-                
-                detections.append({
-                    'bbox': [x1, y1, x2, y2],
-                    'conf': float(conf),
-                    'class_id': int(cls_id),
-                    'class_name': 'person'
-                })
-            
-            return detections
+            return self.detection_cache.hash(frame)
         except Exception as e:
-            logger.error(f"❌ Detection failed: {e}")
-            return []
+            logger.error(f"❌ Frame hash failed: {e}")
+            return None
     
-    def _assign_teams(self, frame, detections):
+    def _cached_detections(self, keys):
+        """{key: (boxes, scores)} for keys already in the detection cache"""
+        keys = [k for k in keys if k]
+        if not keys:
+            return {}
         try:
-            if len(detections) < 2:
-                for det in detections:
-                    det['team_id'] = 0
-                return detections
-            
-            colors = []
-            valid_dets = []
-            
-            for det in detections:
-                x1, y1, x2, y2 = det['bbox']
-                crop = frame[max(0,y1):min(frame.shape[0],y2), max(0,x1):min(frame.shape[1],x2)]
-                
-                if crop.size == 0:
-                    continue
-                
-                upper = crop[:crop.shape[0]//3, :]
-                if upper.size == 0:
-                    continue
-                
-                colors.append(upper.mean(axis=(0,1)))
-                valid_dets.append(det)
-            
-            if len(colors) < 2:
-                for det in detections:
-                    det['team_id'] = 0
-                return detections
-            
-            kmeans = KMeans(n_clusters=2, random_state=42, n_init=10)
-            labels = kmeans.fit_predict(np.array(colors))
-            
-            for det, label in zip(valid_dets, labels):
-                det['team_id'] = int(label)
+            cached = self.detection_cache.get_many(keys, self.cache_config)
+            return {key: _unpack_rows(rows) for key, rows in cached.items()}
+        except Exception as e:
+            logger.error(f"❌ Detection cache lookup failed: {e}")
+            return {}
+    
+    def _remember_detections(self, entries):
+        """Store [(key, boxes, scores)]"""
+        entries = [(k, _pack_rows(boxes, scores)) for k, boxes, scores in entries if k]
+        if not entries:
+            return
+        try:
+            self.detection_cache.put_many(entries, self.cache_config)
+        except Exception as e:
+            logger.error(f"❌ Detection cache store failed: {e}")
+    
+    def _forward(self, img_tensor):
+        """Raw float32 head outputs (batch, anchors, 5 + classes) from the inference backend"""
+        with span("forward"):
+            return self.backend.forward(img_tensor)
+    
+    def _postprocess(self, outputs):
+        """
+        Person boxes per image from raw head outputs (batch, anchors, 5 + classes):
+        [(boxes (N, 4) xyxy in model input coordinates, scores (N,))], highest score first.
+        Anchors whose best class is not person are dropped before NMS, and one
+        batched NMS call covers every image in the batch.
+        """
+        import torchvision
+        
+        obj = outputs[..., 4]
+        cls_scores = outputs[..., 5:5 + self.num_classes]
+        scores = obj * cls_scores[..., PERSON_CLASS]
+        keep = (cls_scores.argmax(-1) == PERSON_CLASS) & (scores >= self.conf_thresh)
+        image_idx, anchor_idx = keep.nonzero(as_tuple=True)
+        
+        cxcywh = outputs[image_idx, anchor_idx, :4]
+        boxes = torch.cat([cxcywh[:, :2] - cxcywh[:, 2:] / 2, cxcywh[:, :2] + cxcywh[:, 2:] / 2], dim=1)
+        scores = scores[image_idx, anchor_idx]
+        kept = torchvision.ops.batched_nms(boxes, scores, image_idx, self.nms_thresh)
+        boxes, scores, image_idx = boxes[kept], scores[kept], image_idx[kept]
+        return [(boxes[image_idx == i], scores[image_idx == i]) for i in range(len(outputs))]
+    
+    def _infer_batch(self, img_tensor):
+        """One forward pass + one postprocess call; returns per-image (boxes, scores)"""
+        outputs = self._forward(img_tensor)
+        with span("nms"):
+            return self._postprocess(outputs)
+    
+    def detect_batch(self, frames):
+        """
+        Detect on a list of frames with one forward pass and one postprocess call.
+        Returns one detection list per input frame (empty for None frames).
+        Frames found in the detection cache skip inference.
+        """
+        results = [[] for _ in frames]
+        valid = [i for i, frame in enumerate(frames) if frame is not None]
+        if not valid:
+            return results
+        
+        keys = {i: self._frame_key(frames[i]) for i in valid}
+        cached = self._cached_detections(keys.values())
+        for i in valid:
+            if keys[i] in cached:
+                results[i] = detections_from_arrays(*cached[keys[i]])
+        valid = [i for i in valid if keys[i] not in cached]
+        if not valid:
+            return results
+        
+        try:
+            img_tensor, _ = self._preprocessor()([frames[i] for i in valid])
+            outputs = self._infer_batch(img_tensor)
             
-            return valid_dets
+            entries = []
+            for i, output in zip(valid, outputs):
+                h, w = frames[i].shape[:2]
+                boxes, scores = self._to_arrays(output, h, w)
+                results[i] = detections_from_arrays(boxes, scores)
+                entries.append((keys[i], boxes, scores))
+            self._remember_detections(entries)
+        except Exception as e:
+            logger.error(f"❌ Batch detection failed: {e}")
+        
+        return results
+    
+    def _detect_on_frame(self, frame):
+        return self.detect_batch([frame])[0]
+    
+    def _assign_teams(self, frame, detections, team_model=None):
+        """
+        Label detections by shirt color. Pass the video's TeamColorModel so team_id
+        stays consistent across frames; without one the frame is clustered on its own.
+        """
+        try:
+            colors, valid = box_colors(frame, [det['bbox'] for det in detections])
+            return assign_teams(detections, colors, valid, team_model or TeamColorModel(min_samples=2))
         except Exception as e:
             logger.error(f"❌ Team assignment failed: {e}")
             for det in detections:
                 det['team_id'] = 0
             return detections
 
-def run_yolox_detection(frame_urls, device='cpu'):
-    logger.info(f"🔍 REAL YOLOx detection on {len(frame_urls)} frames")
-    detector = YOLOXDetector("yolox_m", device)
-    all_detections = []
+_thread_preprocessors = threading.local()
+
+def weights_path(model_name):
+    """Where a model's checkpoint is downloaded to"""
+    return os.path.join(WEIGHTS_DIR, f"{model_name}.pth")
+
+def weights_fingerprint(path):
+    """Size and mtime of a checkpoint, so a new file at the same path starts a new cache scope; None if absent"""
+    if not path:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+def _empty_arrays():
+    return np.zeros((0, 4), dtype=np.int32), np.zeros(0, dtype=np.float32)
+
+def _pack_rows(boxes, scores):
+    """Detection cache value: [[x1, y1, x2, y2, conf], ...]"""
+    return [box + [score] for box, score in zip(boxes.tolist(), scores.tolist())]
+
+def _unpack_rows(rows):
+    if not rows:
+        return _empty_arrays()
+    rows = np.asarray(rows, dtype=np.float64)
+    return rows[:, :4].astype(np.int32), rows[:, 4].astype(np.float32)
+
+def detections_from_arrays(boxes, scores, team_ids=None, track_ids=None):
+    """Per-box detection dicts (the API format) from box / score / team id / track id arrays"""
+    detections = [
+        {'bbox': box, 'conf': score, 'class_id': PERSON_CLASS, 'class_name': 'person'}
+        for box, score in zip(np.asarray(boxes).tolist(), np.asarray(scores, dtype=np.float32).tolist())
+    ]
+    if team_ids is not None:
+        for det, team_id in zip(detections, np.asarray(team_ids).tolist()):
+            det['team_id'] = team_id
+    if track_ids is not None:
+        for det, track_id in zip(detections, np.asarray(track_ids).tolist()):
+            if track_id >= 0:
+                det['track_id'] = track_id
+    return detections
+
+def _prefetch_frames(frame_urls):
+    """Download + decode frame URLs concurrently (in order) with the shared TransferManager"""
+    from components.frame_extractor import Frame
+    from utils.transfer_manager import get_transfer_manager
     
-    for idx, frame_url in enumerate(frame_urls):
-        try:
-            frame = detector._download_frame_from_gcs(frame_url)
-            if frame is None:
-                all_detections.append({'frame_number': idx, 'frame_url': frame_url, 'player_detections': [], 'ball_detections': [], 'error': 'Download failed'})
-                continue
-            
-            detections = detector._detect_on_frame(frame)
-            detections = detector._assign_teams(frame, detections)
-            players = [d for d in detections if d['class_name'] == 'person']
-            
-            all_detections.append({
-                'frame_number': idx,
-                'frame_url': frame_url,
-                'player_detections': players,
-                'ball_detections': [],
-                'total_players': len(players)
-            })
-            
-            if (idx + 1) % 10 == 0:
-                logger.info(f"✅ Processed {idx + 1}/{len(frame_urls)}")
-        except Exception as e:
-            logger.error(f"❌ Frame {idx} error: {e}")
-            all_detections.append({'frame_number': idx, 'frame_url': frame_url, 'player_detections': [], 'ball_detections': [], 'error': str(e)})
+    for idx, result in enumerate(get_transfer_manager().iter_download(frame_urls, decode=True)):
+        if not result.ok:
+            logger.error(f"❌ Frame download failed: {result.error}")
+        yield Frame(idx, result.data, result.url)
+
+def _resolve_frame(detector, idx, item):
+    """Accept either a GCS frame URL (legacy) or an in-memory Frame from a FrameStream"""
+    if isinstance(item, str):
+        return idx, item, detector._download_frame_from_gcs(item)
+    return item.number, item.url, item.image
+
+def _frame_record(task, detections=None, error=None, propagated=False):
+    if error is not None:
+        record = {'frame_number': task['frame_number'], 'frame_url': task['frame_url'], 'player_detections': [], 'ball_detections': [], 'error': error}
+    else:
+        players = [d for d in detections if d['class_name'] == 'person']
+        record = {
+            'frame_number': task['frame_number'],
+            'frame_url': task['frame_url'],
+            'player_detections': players,
+            'ball_detections': [],
+            'total_players': len(players)
+        }
+    if task.get('timestamp_ms') is not None:
+        record['timestamp_ms'] = round(task['timestamp_ms'], 1)
+    if propagated:
+        record['propagated'] = True
+    return record
+
+def _error_record(failure):
+    """Frame record for a StageError raised at any pipeline stage"""
+    item = failure.item
+    if isinstance(item, dict):
+        task = item
+    elif isinstance(item, tuple):
+        idx, source = item
+        task = {'frame_number': idx, 'frame_url': source if isinstance(source, str) else getattr(source, 'url', None)}
+    else:
+        task = {'frame_number': -1, 'frame_url': None}
+    return _frame_record(task, error=str(failure.error))
+
+def run_yolox_detection(frames, device='cpu', batch_size=None, workers=None, progress_callback=None, columnar=False,
+                        keyframe_interval=None, track=None):
+    """
+    Run detection + team assignment over `frames`: a list of GCS frame URLs,
+    or an iterable of in-memory frames such as a FrameStream.
+    `progress_callback(frames_done, frames_total)` is called as frames complete.
+    
+    Runs as a staged pipeline (components/pipeline.py): decoding/downloading feeds
+    `workers` preprocess threads, one inference thread batches `batch_size` frames
+    per forward pass, and `workers` threads rescale boxes and sample shirt colors.
+    Frames already in the detection cache bypass the inference stage.
+    Teams are assigned in frame order against one TeamColorModel per video.
+    
+    With tracking (`track`, default TRACKING_ENABLED) every player box carries a
+    persistent track_id (components/tracker.py). With `keyframe_interval` K > 1
+    (default YOLOX_KEYFRAME_INTERVAL) YOLOX only runs on every Kth frame and on
+    frames already in the detection cache; the boxes of the frames in between are
+    moved from the previous frame with optical flow, keep their track's team, and
+    the frame record is marked 'propagated'.
+    
+    Returns a list of frame records, or with `columnar=True` a DetectionTable
+    (components/detection_table.py) that holds the boxes as NumPy columns.
+    """
+    from components.model_registry import get_detector
+    from components.pipeline import Stage, StagedPipeline, StageError, PIPELINE_WORKERS
+    
+    total = len(frames) if hasattr(frames, '__len__') else getattr(frames, 'metadata', {}).get('expected_frames')
+    logger.info(f"🔍 REAL YOLOx detection on {total if total is not None else 'streamed'} frames")
+    detector = get_detector("yolox_m", device)
+    batch_size = max(1, batch_size or detector.batch_size)
+    workers = max(1, workers or PIPELINE_WORKERS)
+    keyframe_interval = max(1, keyframe_interval or YOLOX_KEYFRAME_INTERVAL)
+    track = (TRACKING_ENABLED if track is None else track) or keyframe_interval > 1
+    
+    # Reused letterbox canvases + input batch buffer for this run (only the infer stage batches)
+    preprocessor = LetterboxPreprocessor(detector.test_size, batch_size, detector.device)
+    
+    # Legacy URL lists: fetch frames concurrently ahead of the pipeline
+    if isinstance(frames, (list, tuple)) and frames and all(isinstance(f, str) for f in frames):
+        frames = _prefetch_frames(frames)
+    
+    def preprocess(item):
+        with span("preprocess"):
+            return _preprocess(item)
+    
+    def _preprocess(item):
+        idx, source = item
+        frame_number, frame_url, frame = _resolve_frame(detector, idx, source)
+        task = {'frame_number': frame_number, 'frame_url': frame_url, 'frame': frame, 'timestamp_ms': getattr(source, 'timestamp_ms', None)}
+        if frame is None:
+            task['error'] = 'Download failed'
+            return task
+        task['key'] = detector._frame_key(frame)
+        cached = detector._cached_detections([task['key']]).get(task['key'])
+        if cached is not None:
+            task['boxes'], task['scores'] = cached
+        elif idx % keyframe_interval == 0:
+            task['canvas'], _ = preprocessor.letterbox(frame)
+        else:
+            task['propagate'] = True
+        if keyframe_interval > 1:
+            task['flow'] = flow_image(frame)
+        return task
+    
+    def infer(tasks):
+        ready = [t for t in tasks if 'canvas' in t]
+        if ready:
+            # Canvases are copied into the run's one input buffer. They stay on the tasks until
+            # the forward pass succeeds, so the pipeline can retry a failed batch frame by frame.
+            outputs = detector._infer_batch(preprocessor.batch([t['canvas'] for t in ready], release=False))
+            for task, output in zip(ready, outputs):
+                preprocessor.release(task.pop('canvas'))
+                task['output'] = output
+        return tasks
+    
+    def postprocess(task):
+        if task.get('error'):
+            return task
+        frame = task.pop('frame')
+        if task.get('propagate'):
+            # Boxes depend on the previous frame's, so they are moved on the in-order consumer
+            return task
+        with span("postprocess"):
+            if 'boxes' not in task:
+                h, w = frame.shape[:2]
+                task['boxes'], task['scores'] = detector._to_arrays(task.pop('output'), h, w)
+                detector._remember_detections([(task['key'], task['boxes'], task['scores'])])
+            task['colors'], task['valid'] = box_colors(frame, task['boxes'])
+        return task
+    
+    # One color model and one tracker per video, updated in frame order on the consumer thread
+    team_model = TeamColorModel()
+    tracker = PlayerTracker() if track else None
+    prev_flow = None
+    
+    pipeline = StagedPipeline([
+        Stage("preprocess", preprocess, workers=workers),
+        # A batch_size=1 stage is called with single items; infer always takes a list
+        Stage("infer", infer if batch_size > 1 else lambda task: infer([task])[0], batch_size=batch_size),
+        Stage("postprocess", postprocess, workers=workers),
+    ], name="yolox")
+    
+    if columnar:
+        from components.detection_table import DetectionTable
+        all_detections = DetectionTable()
+    else:
+        all_detections = []
+    players = 0
+    propagated = 0
+    
+    def emit(task, boxes, scores, team_ids, track_ids, propagated=False):
+        # Columnar results never build per-box dicts
+        if columnar:
+            all_detections.append_arrays(task['frame_number'], boxes, scores, team_ids, track_ids=track_ids,
+                                         frame_url=task['frame_url'], timestamp_ms=task.get('timestamp_ms'),
+                                         propagated=propagated)
+        else:
+            all_detections.append(_frame_record(task, detections_from_arrays(boxes, scores, team_ids, track_ids),
+                                                propagated=propagated))
+    
+    # Flow is chained from the last good keyframe; after a failed frame, propagated frames
+    # only coast on the tracker's predictions until the next keyframe succeeds
+    for task in pipeline.run(enumerate(frames)):
+        if isinstance(task, StageError):
+            prev_flow = None
+            all_detections.append(_error_record(task))
+        elif task.get('error'):
+            prev_flow = None
+            all_detections.append(_frame_record(task, error=task['error']))
+        elif task.get('propagate'):
+            try:
+                with span("optical_flow"):
+                    flow = task.pop('flow')
+                    moved, ok = None, None
+                    if prev_flow is not None:
+                        moved, ok = propagate_boxes(prev_flow, flow, [t.kalman.box for t in tracker.active()])
+                        prev_flow = flow
+                    track_ids, boxes, scores, team_ids = tracker.propagate(moved, ok)
+                emit(task, boxes.round().astype(np.int32), scores, team_ids, track_ids, propagated=True)
+                players += len(boxes)
+                propagated += 1
+            except Exception as e:
+                logger.error(f"❌ Box propagation failed: {e}")
+                prev_flow = None
+                all_detections.append(_frame_record(task, error=str(e)))
+        else:
+            try:
+                with span("team_assignment"):
+                    keep, team_ids = assign_team_ids(task['colors'], task['valid'], team_model)
+                boxes, scores = task['boxes'][keep], task['scores'][keep]
+                with span("tracking"):
+                    track_ids = tracker.update(boxes, scores, team_ids) if tracker else None
+                prev_flow = task.pop('flow', None)
+                emit(task, boxes, scores, team_ids, track_ids)
+                players += len(boxes)
+            except Exception as e:
+                logger.error(f"❌ Team assignment failed: {e}")
+                prev_flow = None
+                all_detections.append(_frame_record(task, error=str(e)))
+        
+        if progress_callback:
+            progress_callback(len(all_detections), total)
+        
+        if len(all_detections) % 10 == 0:
+            logger.info(f"✅ Processed {len(all_detections)}/{total if total is not None else '?'}")
     
-    total = sum(d.get('total_players', 0) for d in all_detections)
-    avg = total / len(all_detections) if all_detections else 0
+    avg = players / len(all_detections) if all_detections else 0
     logger.info(f"🎉 Complete! Avg players: {avg:.1f}")
+    if keyframe_interval > 1:
+        logger.info(f"🎞️ YOLOX ran on {len(all_detections) - propagated} frames, {propagated} propagated with optical flow")
+    if detector.detection_cache is not None:
+        logger.info(f"🗃️ Detection cache: {detector.detection_cache.stats()}")
     return all_detections
 
 def load_yolox_model(device='cpu'):
+    """
+    The shared detector's torch module, or None when loading fails. Other backends
+    (YOLOX_BACKEND=onnxruntime) hold no torch module and raise; use get_detector().
+    """
+    from components.model_registry import get_detector
     try:
-        detector = YOLOXDetector("yolox_m", device)
-        return detector.model
-    except:
+        detector = get_detector("yolox_m", device)
+    except Exception:
         return None
+    if detector.model is None:
+        raise RuntimeError(f"YOLOX backend '{detector.backend_name}' has no torch module; use get_detector()")
+    return detector.model
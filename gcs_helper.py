@@ -1,50 +1,31 @@
 """
 Google Cloud Storage Helper for TAHLEEL.ai
 Production-ready GCS integration for video/frame/results upload/download.
+All calls go through the shared storage layer (utils/storage.py): one pooled
+client per process, cached bucket handles, request metrics.
 """
 
 import os
-from google.cloud import storage
+
+from utils.storage import get_client, get_storage
 
 GCS_BUCKET_NAME = os.environ.get("GCS_BUCKET_NAME", "tahleel-ai-videos")
 
 def get_gcs_client():
-    return storage.Client()
+    return get_client()
 
 def upload_file(local_path, gcs_path, bucket_name=None):
-    bucket_name = bucket_name or GCS_BUCKET_NAME
-    client = get_gcs_client()
-    bucket = client.bucket(bucket_name)
-    blob = bucket.blob(gcs_path)
-    blob.upload_from_filename(local_path)
     # Return GCS URI instead of public URL
-    return f"gs://{bucket_name}/{gcs_path}"
+    return get_storage(bucket_name or GCS_BUCKET_NAME).upload_file(local_path, gcs_path)
 
 def upload_bytes(data, gcs_path, bucket_name=None):
-    bucket_name = bucket_name or GCS_BUCKET_NAME
-    client = get_gcs_client()
-    bucket = client.bucket(bucket_name)
-    blob = bucket.blob(gcs_path)
-    blob.upload_from_string(data)
-    return f"gs://{bucket_name}/{gcs_path}"
+    return get_storage(bucket_name or GCS_BUCKET_NAME).upload_bytes(gcs_path, data)
 
 def download_file(gcs_path, local_path, bucket_name=None):
-    bucket_name = bucket_name or GCS_BUCKET_NAME
-    client = get_gcs_client()
-    bucket = client.bucket(bucket_name)
-    blob = bucket.blob(gcs_path)
-    blob.download_to_filename(local_path)
-    return local_path
+    return get_storage(bucket_name or GCS_BUCKET_NAME).download_to_file(gcs_path, local_path)
 
 def list_files(prefix="", bucket_name=None):
-    bucket_name = bucket_name or GCS_BUCKET_NAME
-    client = get_gcs_client()
-    bucket = client.bucket(bucket_name)
-    return [b.name for b in bucket.list_blobs(prefix=prefix)]
+    return get_storage(bucket_name or GCS_BUCKET_NAME).list(prefix)
 
 def get_signed_url(gcs_path, expires=3600, bucket_name=None):
-    bucket_name = bucket_name or GCS_BUCKET_NAME
-    client = get_gcs_client()
-    bucket = client.bucket(bucket_name)
-    blob = bucket.blob(gcs_path)
-    return blob.generate_signed_url(expiration=expires)
+    return get_storage(bucket_name or GCS_BUCKET_NAME).signed_url(gcs_path, expires)
@@ -0,0 +1,32 @@
+"""
+Gunicorn Config - TAHLEEL.ai
+Multi-process serving of app.py with one shared copy of the model weights
+(components/serving.py):
+
+    WEB_WORKERS=4 gunicorn app:app
+
+WEB_WORKERS processes x WEB_THREADS threads; PRELOAD_MODEL loads the app in the
+master so workers fork with YOLOX already in memory. MODEL_WARMUP=background is for
+fast cold starts instead: every worker imports the app itself (in well under a
+second) and loads the model on its own warm-up thread.
+"""
+
+import os
+
+from components.serving import (WEB_WORKERS, WEB_THREADS, PRELOAD_MODEL, worker_threads, before_fork,
+                                configure_worker)
+
+bind = f":{os.getenv('PORT', '8080')}"
+workers = WEB_WORKERS
+threads = WEB_THREADS
+timeout = 0
+# A background warm-up started in the master would be wasted (its thread does not survive the fork)
+preload_app = PRELOAD_MODEL and os.getenv("MODEL_WARMUP", "eager").lower() == "eager"
+
+
+def pre_fork(server, worker):
+    before_fork()
+
+
+def post_fork(server, worker):
+    configure_worker(worker_threads(server.cfg.workers))
@@ -6,12 +6,18 @@ October 15, 2025 - COMPLETE PIPELINE
 import os
 import uuid
 import time
+import hashlib
 from fastapi import FastAPI, File, UploadFile, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 
 app = FastAPI(title="TAHLEEL.ai API", version="1.0.0")
 
+# "eager" / "background" load YOLOX on a warm-up thread at startup (the server answers
+# /health/live meanwhile, /health/ready once loaded); "lazy" loads it on the first /analyze
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "lazy").lower()
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -20,8 +26,21 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+def startup():
+    from components.job_worker import ensure_workers
+    ensure_workers()
+    if MODEL_WARMUP in ("eager", "background"):
+        from components.model_registry import registry
+        registry.warmup(background=True)
+
 @app.get("/health")
 def health():
+    from components.model_registry import registry
+    from utils.storage import metrics as storage_metrics
+    from utils.result_cache import get_result_cache
+    from utils.detection_cache import get_detection_cache
+    detection_cache = get_detection_cache()
     return {
         "status": "healthy",
         "service": "TAHLEEL.ai API - COMPLETE",
@@ -33,9 +52,33 @@ def health():
             "yolox_detection": "ready",
             "tactical_analysis": "ready",
             "claude_ai": "ready"
+        },
+        "models": registry.stats(),
+        "storage": storage_metrics.snapshot(),
+        "caches": {
+            "results": get_result_cache().stats(),
+            "detections": detection_cache.stats() if detection_cache else None
         }
     }
 
+@app.get("/health/live")
+def live():
+    """Liveness: the process is up and serving requests, warm or not"""
+    return {"status": "alive"}
+
+@app.get("/health/ready")
+def ready():
+    """Readiness: 503 until the warm-up has loaded the model (or after it failed)"""
+    from components.serving import readiness
+    is_ready, body = readiness(MODEL_WARMUP)
+    return JSONResponse(status_code=200 if is_ready else 503, content=body)
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus text format: stage / job latency histograms and storage counters of this process"""
+    from utils.metrics import render_prometheus
+    return Response(content=render_prometheus(), media_type="text/plain; version=0.0.4")
+
 @app.post("/upload")
 async def upload_video(video: UploadFile = File(...)):
     """Upload video to GCS"""
@@ -60,55 +103,79 @@ async def upload_video(video: UploadFile = File(...)):
 
 @app.post("/analyze")
 async def analyze_video(video: UploadFile = File(...)):
-    """COMPLETE PIPELINE: Upload → Frames → Detection → Tactical Analysis"""
+    """
+    COMPLETE PIPELINE: Upload → Frames → Detection → Tactical Analysis
+    Uploads the video, queues the analysis job and returns immediately; poll /jobs/{job_id}.
+    """
     try:
-        from utils.cloud_storage import upload_video_to_gcs, upload_json_to_gcs
-        from components.frame_extractor import extract_frames
-        from components.yolox_detector import run_yolox_detection
-        from components.tactical_processor import process_tactical_analysis
+        from utils.cloud_storage import upload_video_to_gcs, delete_video_from_gcs
+        from utils.job_store import get_job_store
+        from utils.result_cache import get_result_cache, cache_key, RESULT_CACHE_ENABLED
+        from components.job_worker import ensure_workers
+        from components.analysis_pipeline import pipeline_params
         
         video_id = str(uuid.uuid4())
         
-        # Step 1: Upload video
-        gcs_url = await upload_video_to_gcs(video, video_id)
+        # Step 1: Upload video, hashing it as it streams
+        digest = hashlib.sha256()
+        gcs_url = await upload_video_to_gcs(video, video_id, digest=digest)
         if not gcs_url:
             raise HTTPException(status_code=500, detail="Upload failed")
         
-        # Step 2: Extract frames
-        frames, metadata = extract_frames(gcs_url, fps=5, resize=(1280, 720))
-        if not frames:
-            raise HTTPException(status_code=500, detail="Frame extraction failed")
+        # Same video + same pipeline settings: answer from the result cache
+        params = pipeline_params()
+        # Until the weights are downloaded there is nothing to tie a cached result to
+        use_cache = RESULT_CACHE_ENABLED and params["weights"] is not None
+        key = cache_key(digest.hexdigest(), params)
+        if use_cache:
+            # Cache and storage lookups block on I/O; keep them off the event loop
+            cached = await run_in_threadpool(get_result_cache().get, key)
+            if cached is not None:
+                await run_in_threadpool(delete_video_from_gcs, video_id)
+                return JSONResponse(content={
+                    "success": True,
+                    "status": "complete",
+                    "cache": "hit",
+                    "video_id": cached.get("video_id", video_id),
+                    "result": cached,
+                    "message": "Identical video already analyzed"
+                })
         
-        # Step 3: Run YOLOX detection
-        detections = run_yolox_detection(frames)
-        
-        # Step 4: TACTICAL ANALYSIS with Claude AI
-        tactical_report = process_tactical_analysis(video_id, detections, metadata)
-        
-        # Save complete analysis to GCS
-        upload_json_to_gcs(tactical_report, f"{video_id}-tactical-report")
-        upload_json_to_gcs(
-            {"detections": detections, "metadata": metadata},
-            f"{video_id}-detections"
-        )
+        # Steps 2-4 run on a background worker
+        job = get_job_store().create("analysis", {
+            "video_id": video_id,
+            "gcs_url": gcs_url,
+            "cache_key": key if use_cache else None
+        })
+        ensure_workers()
         
-        # Return complete analysis
-        return JSONResponse(content={
-            **tactical_report,
+        return JSONResponse(status_code=202, content={
+            "success": True,
+            "job_id": job["id"],
+            "video_id": video_id,
             "gcs_url": gcs_url,
-            "storage": {
-                "video_url": gcs_url,
-                "frames_folder": f"gs://tahleel-ai-videos/frames/{video_id}/",
-                "tactical_report": f"gs://tahleel-ai-videos/results/{video_id}-tactical-report.json",
-                "detections_json": f"gs://tahleel-ai-videos/results/{video_id}-detections.json"
-            },
-            "message": "Complete tactical analysis ready for coach!",
-            "ready_for": "Arab League presentation"
+            "status": "queued",
+            "status_url": f"/jobs/{job['id']}",
+            "message": "Analysis queued"
         })
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """Stage, progress (frames done/total), ETA and, once complete, the analysis result"""
+    from utils.job_store import get_job_store, job_status
+    
+    job = get_job_store().get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={
+            "status": "not_found",
+            "job_id": job_id,
+            "message": "Job not found"
+        })
+    return JSONResponse(content=job_status(job))
+
 @app.get("/results/{video_id}")
 def get_results(video_id: str):
     """Get tactical analysis results"""
@@ -134,3 +201,35 @@ def get_results(video_id: str):
             
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/results/{video_id}/detections")
+def get_detections(video_id: str, format: str = "npz"):
+    """
+    Per-frame detections. Default is the stored columnar .npz (frames + boxes
+    NumPy arrays); format=json builds the per-frame JSON records on demand.
+    """
+    if format not in ("npz", "json"):
+        raise HTTPException(status_code=400, detail="format must be 'npz' or 'json'")
+    
+    from utils.cloud_storage import get_detections_from_gcs
+    
+    table = get_detections_from_gcs(video_id)
+    if table is None:
+        return JSONResponse(status_code=404, content={
+            "status": "not_found",
+            "video_id": video_id,
+            "message": "Detections not found"
+        })
+    
+    if format == "json":
+        return JSONResponse(content={
+            "video_id": video_id,
+            "metadata": table.metadata,
+            "summary": table.summary(),
+            "detections": table.to_records()
+        })
+    return Response(
+        content=table.to_bytes(),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{video_id}-detections.npz"'}
+    )
@@ -0,0 +1,135 @@
+"""
+TAHLEEL.ai Inference Scheduler Tests
+
+Purpose:
+- Frames from concurrent callers must be batched together and each caller must
+  get the outputs of its own frames back
+- Batches must take frames from jobs round-robin, so a large job cannot starve
+  a small one
+- Forward errors must reach every caller of the failed batch
+- A model loading for a new scheduler must not block scheduler stats
+
+Dependencies:
+- pytest
+- numpy, torch
+"""
+
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("numpy")
+torch = pytest.importorskip("torch")
+
+import components.batch_scheduler as batch_scheduler
+import components.model_registry as model_registry
+from components.batch_scheduler import InferenceScheduler
+
+
+class RecordingForward:
+    """Doubles its input; records the batches it was called with"""
+
+    def __init__(self, gate=None):
+        self.batches = []
+        self.gate = gate
+        self.entered = threading.Event()
+
+    def __call__(self, batch):
+        self.entered.set()
+        if self.gate is not None:
+            self.gate.wait()
+        self.batches.append(batch[:, 0, 0, 0].tolist())
+        return batch * 2
+
+
+def frame(value):
+    return torch.full((3, 4, 4), float(value))
+
+
+def test_concurrent_callers_share_batches():
+    forward = RecordingForward()
+    scheduler = InferenceScheduler(forward, max_batch=4, max_wait_ms=200)
+    results = {}
+    start = threading.Barrier(4)
+
+    def caller(value):
+        start.wait()
+        results[value] = scheduler.infer(frame(value).unsqueeze(0), job=value)
+
+    threads = [threading.Thread(target=caller, args=(v,)) for v in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    scheduler.close()
+
+    for value, output in results.items():
+        assert output.shape == (1, 3, 4, 4)
+        assert torch.all(output == 2 * value)
+    assert len(forward.batches) < 4
+    stats = scheduler.stats()
+    assert stats["frames"] == 4
+    assert stats["avg_jobs_per_batch"] > 1
+
+
+def test_jobs_are_served_round_robin():
+    gate = threading.Event()
+    forward = RecordingForward(gate)
+    scheduler = InferenceScheduler(forward, max_batch=4, max_wait_ms=0)
+
+    # The first batch blocks in forward while both jobs queue up behind it
+    blocker = scheduler.submit(frame(-1), job="blocker")
+    assert forward.entered.wait(5)
+    big = [scheduler.submit(frame(100 + i), job="big") for i in range(8)]
+    small = [scheduler.submit(frame(200 + i), job="small") for i in range(2)]
+    gate.set()
+    for future in [blocker] + big + small:
+        future.result(timeout=5)
+    scheduler.close()
+
+    # The small job's frames go out in the first batch after the blocker, not after all of "big"
+    assert forward.batches[1] == [100.0, 200.0, 101.0, 201.0]
+    assert sum(len(b) for b in forward.batches) == 11
+
+
+def test_forward_errors_reach_callers():
+    def broken(batch):
+        raise RuntimeError("out of memory")
+
+    scheduler = InferenceScheduler(broken, max_batch=2, max_wait_ms=0)
+    with pytest.raises(RuntimeError, match="out of memory"):
+        scheduler.infer(torch.stack([frame(1), frame(2)]), timeout=5)
+    scheduler.close()
+    with pytest.raises(RuntimeError, match="closed"):
+        scheduler.submit(frame(3))
+
+
+def test_model_load_does_not_block_scheduler_stats(monkeypatch):
+    loading, release = threading.Event(), threading.Event()
+
+    def slow_get(*key):
+        loading.set()
+        release.wait(timeout=30)
+        return SimpleNamespace(_forward=RecordingForward())
+
+    monkeypatch.setattr(model_registry, "registry", SimpleNamespace(get=slow_get))
+    monkeypatch.setattr(batch_scheduler, "_schedulers", {})
+    schedulers = []
+    callers = [threading.Thread(target=lambda: schedulers.append(batch_scheduler.get_scheduler("m", "cpu", "fp32")))
+               for _ in range(2)]
+    for caller in callers:
+        caller.start()
+    assert loading.wait(timeout=30)
+
+    stats = []
+    reader = threading.Thread(target=lambda: stats.append(batch_scheduler.scheduler_stats()))
+    reader.start()
+    reader.join(timeout=5)
+    assert stats == [{}]
+
+    release.set()
+    for caller in callers:
+        caller.join(timeout=30)
+    assert len(schedulers) == 2 and schedulers[0] is schedulers[1]
+    assert list(batch_scheduler.scheduler_stats()) == ["m/cpu/fp32"]
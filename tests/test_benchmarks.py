@@ -0,0 +1,41 @@
+"""
+TAHLEEL.ai Benchmark Harness Tests
+
+Purpose:
+- Ground-truth player boxes of the synthetic video must cover the drawn players
+- Baseline comparison must flag slowdowns beyond the tolerance only
+
+Dependencies:
+- pytest
+- numpy, opencv-python, torch (imported by the benchmark module)
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+pytest.importorskip("torch")
+
+from benchmarks.synthetic_video import TEAM_COLORS, match_frames, player_boxes
+
+
+def test_player_boxes_cover_drawn_players():
+    frame = next(iter(match_frames(1, size=(640, 360))))
+    boxes = player_boxes(1, size=(640, 360))[0]
+
+    assert boxes.shape == (23, 4)
+    # The first player wears the first kit; its shirt is inside its box
+    x1, y1, x2, y2 = boxes[0]
+    shirt = frame[y1:y2, x1:x2].reshape(-1, 3)
+    assert (shirt == TEAM_COLORS[0]).all(axis=1).sum() > 0.2 * len(shirt)
+
+
+def test_compare_flags_regressions():
+    from benchmarks.bench_pipeline import compare
+
+    baseline = {"phases": {"detect": {"fps": 10.0, "latency_p95_ms": 100.0}, "teams": {"fps": 500.0}}}
+    current = {"phases": {"detect": {"fps": 8.0, "latency_p95_ms": 110.0}, "teams": {"fps": 480.0},
+                          "serialize": {"fps": 1.0}}}
+
+    rows = {(phase, key): regressed for phase, key, _, _, _, regressed in compare(current, baseline, tolerance=0.15)}
+    assert rows == {("detect", "fps"): True, ("detect", "latency_p95_ms"): False, ("teams", "fps"): False}
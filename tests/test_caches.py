@@ -0,0 +1,191 @@
+"""
+TAHLEEL.ai Cache Tests
+
+Purpose:
+- Result cache keys depend on video content and pipeline parameters only
+- Local LRU layer stays within its byte budget and falls back to storage
+- /analyze answers a re-uploaded video straight from the result cache
+- Per-frame detections are reused only for the same frame and model config
+
+Dependencies:
+- pytest
+- httpx (for HTTP calls)
+"""
+
+import hashlib
+
+import cv2
+import numpy as np
+import pytest
+
+import utils.storage as storage
+import utils.result_cache as result_cache
+from utils.result_cache import LocalLRUCache, ResultCache, cache_key
+from utils.detection_cache import DetectionCache, frame_hash
+
+
+@pytest.fixture
+def local_storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "STORAGE_BACKEND", "local")
+    monkeypatch.setattr(storage, "LOCAL_STORAGE_ROOT", str(tmp_path / "storage"))
+    monkeypatch.setattr(storage, "_backends", {})
+    return storage.get_storage()
+
+
+@pytest.fixture
+def weights(tmp_path, monkeypatch):
+    """A downloaded checkpoint for the pipeline model; result cache keys depend on it"""
+    import components.yolox_detector as yolox_detector
+    monkeypatch.setattr(yolox_detector, "WEIGHTS_DIR", str(tmp_path / "models"))
+    path = tmp_path / "models" / "yolox_m.pth"
+    path.parent.mkdir()
+    path.write_bytes(b"checkpoint v1")
+    return path
+
+
+def test_cache_key_depends_on_content_and_params():
+    params = {"fps": 5, "resize": [1280, 720], "model_name": "yolox_m"}
+    assert cache_key("abc", params) == cache_key("abc", dict(reversed(list(params.items()))))
+    assert cache_key("abc", params) != cache_key("abd", params)
+    assert cache_key("abc", params) != cache_key("abc", dict(params, fps=10))
+
+
+def test_pipeline_params_follow_the_inference_mode(monkeypatch, weights):
+    import components.model_registry as model_registry
+    import components.yolox_detector as yolox_detector
+    import utils.detection_cache as detection_cache
+    from components.analysis_pipeline import pipeline_params
+
+    keys = [cache_key("abc", pipeline_params())]
+    monkeypatch.setattr(model_registry, "DEFAULT_PRECISION", "int8_dynamic")
+    keys.append(cache_key("abc", pipeline_params()))
+    monkeypatch.setattr(yolox_detector, "YOLOX_BACKEND", "onnxruntime")
+    keys.append(cache_key("abc", pipeline_params()))
+    monkeypatch.setattr(detection_cache, "DETECTION_CACHE_HASH", "perceptual")
+    keys.append(cache_key("abc", pipeline_params()))
+    weights.write_bytes(b"checkpoint v2, retrained")
+    keys.append(cache_key("abc", pipeline_params()))
+    assert len(set(keys)) == len(keys)
+
+    weights.unlink()
+    assert pipeline_params()["weights"] is None
+
+
+def test_local_lru_evicts_least_recently_used(tmp_path):
+    cache = LocalLRUCache(str(tmp_path), max_bytes=25)
+    cache.put("a", b"x" * 10)
+    cache.put("b", b"y" * 10)
+    assert cache.get("a") == b"x" * 10  # "b" is now least recently used
+    cache.put("c", b"z" * 10)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["bytes"] == 20
+    # The index is rebuilt from disk by a new instance
+    assert LocalLRUCache(str(tmp_path), max_bytes=25).stats()["entries"] == 2
+
+
+def test_result_cache_falls_back_to_storage(local_storage, tmp_path):
+    first = ResultCache(LocalLRUCache(str(tmp_path / "a")))
+    first.put("key1", {"status": "success", "video_id": "v1"})
+
+    # Fresh local layer: served from storage, then cached locally
+    second = ResultCache(LocalLRUCache(str(tmp_path / "b")))
+    assert second.get("key1") == {"status": "success", "video_id": "v1"}
+    assert second.get("key1") == {"status": "success", "video_id": "v1"}
+    assert second.stats()["hits"] == {"local": 1, "storage": 1}
+    assert second.get("missing") is None and second.misses == 1
+
+
+@pytest.mark.asyncio
+async def test_analyze_returns_cached_result_for_same_video(local_storage, weights, tmp_path, monkeypatch):
+    httpx = pytest.importorskip("httpx")
+    from main import app
+    from components.analysis_pipeline import pipeline_params
+
+    video = b"same match video bytes" * 1000
+    cache = ResultCache(LocalLRUCache(str(tmp_path / "cache")))
+    cache.put(cache_key(hashlib.sha256(video).hexdigest(), pipeline_params()), {"video_id": "first-upload", "status": "success"})
+    monkeypatch.setattr(result_cache, "_cache", cache)
+
+    async with httpx.AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.post("/analyze", files={"video": ("match.mp4", video, "video/mp4")})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["cache"] == "hit" and data["video_id"] == "first-upload"
+    assert local_storage.list("videos/") == []  # duplicate upload removed
+
+
+def _frame(seed):
+    rng = np.random.default_rng(seed)
+    frame = cv2.resize(rng.integers(0, 255, (18, 32, 3), dtype=np.uint8), (320, 180), interpolation=cv2.INTER_LINEAR)
+    return frame
+
+
+def test_frame_hash_modes():
+    frame = _frame(0)
+    reencoded = cv2.imdecode(cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 90])[1], cv2.IMREAD_COLOR)
+
+    assert frame_hash(frame, "exact") == frame_hash(frame.copy(), "exact")
+    assert frame_hash(frame, "exact") != frame_hash(reencoded, "exact")
+    assert frame_hash(frame, "perceptual") == frame_hash(reencoded, "perceptual")
+    assert frame_hash(frame, "perceptual") != frame_hash(_frame(1), "perceptual")
+
+
+def test_detection_cache_is_scoped_by_config_and_evicts(tmp_path):
+    cache = DetectionCache(str(tmp_path / "dets.sqlite3"), max_entries=2)
+    dets = [{"bbox": [1, 2, 3, 4], "conf": 0.9, "class_id": 0, "class_name": "person"}]
+    cache.put("a", dets, "cfg1")
+    cache.put("b", [], "cfg1")
+    assert cache.get("a", "cfg1") == dets
+    assert cache.get("a", "cfg2") is None
+
+    cache.put("c", [], "cfg1")  # "b" is least recently used
+    assert cache.evict() == 1
+    assert cache.get("b", "cfg1") is None
+    assert cache.get("c", "cfg1") == []
+    assert cache.stats()["entries"] == 2
+
+
+def test_detector_cache_scope_follows_the_weights_file(tmp_path):
+    from components.yolox_detector import YOLOXDetector
+
+    weights = tmp_path / "yolox_m.pth"
+    weights.write_bytes(b"checkpoint v1")
+    detector = YOLOXDetector.__new__(YOLOXDetector)
+    detector.model_name, detector.precision, detector.backend_name = "yolox_m", "fp32", "torch"
+    detector.conf_thresh, detector.nms_thresh, detector.test_size = 0.25, 0.45, (640, 640)
+    detector.weights_path = str(weights)
+    before = detector._cache_config()
+
+    weights.write_bytes(b"checkpoint v2, retrained")
+    assert detector._cache_config() != before
+
+
+def test_detect_batch_skips_inference_for_cached_frames(tmp_path):
+    from components.yolox_detector import YOLOXDetector
+
+    detector = YOLOXDetector.__new__(YOLOXDetector)
+    detector.detection_cache = DetectionCache(str(tmp_path / "dets.sqlite3"))
+    detector.cache_config = "cfg"
+    detector.test_size = (64, 64)
+    detector.device = "cpu"
+    detector.batch_size = 4
+    detector.conf_thresh = 0.25
+    batches = []
+
+    def fake_infer(img_tensor):
+        batches.append(len(img_tensor))
+        return [None] * len(img_tensor)
+
+    detector._infer_batch = fake_infer
+    detector._to_arrays = lambda output, h, w: (np.array([[0, 0, w, h]], dtype=np.int32), np.array([1.0], dtype=np.float32))
+
+    frames = [_frame(0), _frame(1)]
+    first = detector.detect_batch(frames)
+    second = detector.detect_batch(frames + [_frame(2)])
+
+    assert batches == [2, 1]
+    assert second[:2] == first
+    assert detector.detection_cache.stats()["hits"] == 2
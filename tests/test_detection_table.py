@@ -0,0 +1,92 @@
+"""
+TAHLEEL.ai Detection Table Tests
+
+Purpose:
+- Columnar table reproduces the per-frame records run_yolox_detection returns
+- .npz round trip is lossless and much smaller than the JSON it replaces
+- /results/{video_id}/detections serves .npz by default and JSON on request
+
+Dependencies:
+- pytest
+- httpx (for HTTP calls)
+"""
+
+import io
+import json
+
+import numpy as np
+import pytest
+
+import utils.storage as storage
+from components.detection_table import DetectionTable
+from utils.cloud_storage import upload_detections_to_gcs
+
+
+def make_records(n_frames=50, players=20):
+    rng = np.random.default_rng(0)
+    records = []
+    for i in range(n_frames):
+        if i == 3:
+            records.append({'frame_number': i, 'frame_url': None, 'player_detections': [], 'ball_detections': [],
+                            'error': 'Download failed', 'timestamp_ms': 600.0})
+            continue
+        dets = []
+        for _ in range(players):
+            x, y = (int(v) for v in rng.integers(0, 1200, 2))
+            dets.append({'bbox': [x, y, x + 30, y + 80], 'conf': float(np.float32(rng.random())),
+                         'class_id': 0, 'class_name': 'person', 'team_id': int(rng.integers(0, 2))})
+        records.append({'frame_number': i, 'frame_url': f"gs://bucket/frames/v/frame_{i:04d}.jpg",
+                        'player_detections': dets, 'ball_detections': [], 'total_players': len(dets),
+                        'timestamp_ms': i * 200.0})
+    return records
+
+
+@pytest.fixture
+def local_storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "STORAGE_BACKEND", "local")
+    monkeypatch.setattr(storage, "LOCAL_STORAGE_ROOT", str(tmp_path / "storage"))
+    monkeypatch.setattr(storage, "_backends", {})
+    return storage.get_storage()
+
+
+def test_table_reproduces_records():
+    records = make_records()
+    table = DetectionTable.from_records(records)
+
+    assert len(table) == len(records)
+    assert table.to_records() == records
+    assert table[-1] == records[-1]
+    assert table.summary() == {"frames": 50, "boxes": 49 * 20, "failed_frames": 1, "avg_players": 19.6,
+                               "tracks": 0, "propagated_frames": 0}
+    assert np.all(table.frame_boxes(5)["frame_idx"] == 5)
+
+
+def test_npz_round_trip_is_lossless_and_compact():
+    records = make_records()
+    table = DetectionTable.from_records(records, metadata={"video_id": "v", "extraction_fps": 5})
+    data = table.to_bytes()
+
+    restored = DetectionTable.from_bytes(data)
+    assert restored.to_records() == records
+    assert restored.metadata == {"video_id": "v", "extraction_fps": 5}
+    assert len(data) * 5 < len(json.dumps({"detections": records}, indent=2))
+
+
+@pytest.mark.asyncio
+async def test_detections_endpoint_formats(local_storage):
+    httpx = pytest.importorskip("httpx")
+    from main import app
+
+    records = make_records(n_frames=5)
+    upload_detections_to_gcs(DetectionTable.from_records(records), "vid-1")
+
+    async with httpx.AsyncClient(app=app, base_url="http://test") as ac:
+        binary = await ac.get("/results/vid-1/detections")
+        as_json = await ac.get("/results/vid-1/detections", params={"format": "json"})
+        missing = await ac.get("/results/nope/detections")
+
+    assert binary.status_code == 200
+    with np.load(io.BytesIO(binary.content), allow_pickle=False) as npz:
+        assert len(npz["boxes"]) == 4 * 20
+    assert as_json.json()["detections"] == records
+    assert missing.status_code == 404
@@ -0,0 +1,141 @@
+"""
+TAHLEEL.ai YOLOX Detector Tests
+
+Purpose:
+- detect_batch / _infer_batch must hand every frame its own detections back in
+  order, for any number of frames per batch
+- A forward pass that fails for one frame of a batch must not lose the other
+  frames' detections in run_yolox_detection
+
+Dependencies:
+- pytest
+- numpy, opencv-python, torch
+"""
+
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+torch = pytest.importorskip("torch")
+
+BAD_VALUE = 7
+
+
+def fake_detector(test_size=(64, 64), batch_size=4):
+    """YOLOXDetector without a model; the backend or _infer_batch is set by each test"""
+    from components.yolox_detector import YOLOXDetector, CONF_THRESH, NMS_THRESH
+
+    detector = YOLOXDetector.__new__(YOLOXDetector)
+    detector.detection_cache = None
+    detector.test_size = test_size
+    detector.device = "cpu"
+    detector.batch_size = batch_size
+    detector.num_classes = 80
+    detector.conf_thresh = CONF_THRESH
+    detector.nms_thresh = NMS_THRESH
+    return detector
+
+
+class PixelBackend:
+    """
+    Raw YOLOX head outputs where each image has one person centered on its
+    top-left pixel value v (box [v-5, v-5, v+5, v+5]) and one non-person anchor
+    """
+
+    def __init__(self):
+        self.batches = []
+
+    def forward(self, img_tensor):
+        self.batches.append(len(img_tensor))
+        outputs = torch.zeros(len(img_tensor), 2, 85)
+        for i, image in enumerate(img_tensor):
+            v = float(image[0, 0, 0])
+            outputs[i, :, :4] = torch.tensor([v, v, 10.0, 10.0])
+            outputs[i, :, 4] = 0.9
+            outputs[i, 0, 5] = 1.0  # person
+            outputs[i, 1, 6] = 1.0  # bicycle, dropped
+        return outputs
+
+
+def frame(value):
+    return np.full((64, 64, 3), value, dtype=np.uint8)
+
+
+def box(value):
+    return [value - 5, value - 5, value + 5, value + 5]
+
+
+def test_detect_batch_returns_each_frames_detections_in_order():
+    detector = fake_detector(batch_size=2)
+    detector.backend = PixelBackend()
+    values = [20, 30, 40, 50, 60]
+    frames = [frame(v) for v in values]
+    frames.insert(2, None)
+
+    results = detector.detect_batch(frames)
+
+    assert detector.backend.batches == [5]  # one forward pass for every valid frame
+    assert results[2] == []
+    assert [[d['bbox'] for d in r] for r in results[:2] + results[3:]] == [[box(v)] for v in values]
+    assert all(d['class_name'] == 'person' for r in results for d in r)
+
+
+@pytest.mark.parametrize("batch_size", [1, 3, 4])
+def test_run_yolox_detection_keeps_frames_apart_across_batches(monkeypatch, batch_size):
+    import components.model_registry as model_registry
+    from components.frame_extractor import Frame
+    from components.yolox_detector import run_yolox_detection
+
+    detector = fake_detector(batch_size=batch_size)
+    detector.backend = PixelBackend()
+    monkeypatch.setattr(model_registry, "get_detector", lambda *args, **kwargs: detector)
+    values = [20 + 5 * i for i in range(7)]  # 7 frames never divide evenly into batches
+
+    records = run_yolox_detection([Frame(i, frame(v), None) for i, v in enumerate(values)], batch_size=batch_size,
+                                  workers=2, keyframe_interval=1, track=False)
+
+    assert sum(detector.backend.batches) == 7
+    assert max(detector.backend.batches) <= batch_size
+    assert [r['frame_number'] for r in records] == list(range(7))
+    assert [[d['bbox'] for d in r['player_detections']] for r in records] == [[box(v)] for v in values]
+
+
+def test_failed_forward_only_fails_the_bad_frame(monkeypatch):
+    import components.model_registry as model_registry
+    import components.pipeline as pipeline
+    from components.frame_extractor import Frame
+    from components.yolox_detector import run_yolox_detection
+
+    # The infer stage batches whatever is queued; pausing after its first pick-up lets all four frames queue up
+    get = pipeline._get
+
+    def slow_get(*args):
+        item = get(*args)
+        if isinstance(item, tuple) and isinstance(item[1], dict) and 'canvas' in item[1]:
+            time.sleep(0.2)
+        return item
+
+    monkeypatch.setattr(pipeline, "_get", slow_get)
+    detector = fake_detector()
+    batches = []
+
+    def fake_infer(img_tensor):
+        batches.append(len(img_tensor))
+        if (img_tensor[:, 0, 0, 0] == BAD_VALUE).any():
+            raise RuntimeError("bad frame")
+        return [(torch.tensor([[8.0, 8.0, 24.0, 40.0]]), torch.tensor([0.9])) for _ in img_tensor]
+
+    detector._infer_batch = fake_infer
+    monkeypatch.setattr(model_registry, "get_detector", lambda *args, **kwargs: detector)
+
+    frames = [Frame(i, np.full((64, 64, 3), BAD_VALUE if i == 2 else 100, dtype=np.uint8), None) for i in range(4)]
+    records = run_yolox_detection(frames, batch_size=4, workers=1, keyframe_interval=1, track=False)
+
+    assert batches[0] == 4  # the whole batch first, then frame by frame
+    assert [r['frame_number'] for r in records] == [0, 1, 2, 3]
+    assert records[2]['error'] == "bad frame"
+    for i in (0, 1, 3):
+        assert 'error' not in records[i]
+        assert [d['bbox'] for d in records[i]['player_detections']] == [[8, 8, 24, 40]]
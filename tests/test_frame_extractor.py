@@ -0,0 +1,102 @@
+"""
+TAHLEEL.ai Frame Extraction Tests
+
+Purpose:
+- FrameStream must yield frames in order, numbered consecutively, on the
+  video's sampling grid, with start_ms / end_ms snapping forward to that grid
+- FramePersister must never block the stream: frames are dropped when its
+  queue is full, and close() uploads everything that was queued
+
+Dependencies:
+- pytest
+- numpy, opencv-python
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+import utils.storage as storage
+import components.frame_extractor as frame_extractor
+from benchmarks.synthetic_video import generate_match_video
+from components.frame_extractor import FramePersister, FrameStream
+
+
+@pytest.fixture(scope="module")
+def video_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("video") / "match.mp4")
+    return generate_match_video(path, seconds=2, fps=25, size=(160, 96))
+
+
+@pytest.fixture
+def local_storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "STORAGE_BACKEND", "local")
+    monkeypatch.setattr(storage, "LOCAL_STORAGE_ROOT", str(tmp_path / "storage"))
+    monkeypatch.setattr(storage, "_backends", {})
+
+
+def stream(video_path, **window):
+    return FrameStream("gs://bucket/videos/match.mp4", fps=5, resize=(80, 48), video_path=video_path, **window)
+
+
+def test_stream_yields_frames_in_order_on_the_sampling_grid(video_path):
+    frames = stream(video_path)
+    assert frames.metadata["expected_frames"] == 10
+    seen = list(frames)
+
+    assert [f.number for f in seen] == list(range(10))
+    assert [f.source_index for f in seen] == list(range(0, 50, 5))  # 25 FPS sampled at 5
+    assert all(f.image.shape == (48, 80, 3) for f in seen)
+    assert frames.metadata["total_frames"] == 10
+
+
+def test_window_snaps_forward_to_the_sampling_grid(video_path):
+    # 130 ms is source frame 3.25 -> 5 (frame 1); 590 ms is 14.75 -> 15
+    frames = stream(video_path, start_ms=130, end_ms=590)
+    assert [(f.number, f.source_index) for f in frames] == [(1, 5), (2, 10)]
+    assert frames.metadata["shard"]["first_source_frame"] == 5
+    assert frames.metadata["shard"]["end_source_frame"] == 15
+
+    # A boundary exactly on the grid is not moved
+    assert [f.source_index for f in stream(video_path, start_ms=200, end_ms=400)] == [5]
+
+
+class BlockedManager:
+    """TransferManager stand-in whose uploads wait until released"""
+
+    concurrency = 1
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.uploaded = []
+
+    def upload_many(self, items, content_type=None):
+        self.release.wait(timeout=30)
+        self.uploaded.extend(path for _, path in items)
+        return [SimpleNamespace(ok=True) for _ in items], None
+
+
+def test_persister_drops_when_full_and_close_flushes(local_storage, monkeypatch):
+    manager = BlockedManager()
+    monkeypatch.setattr(frame_extractor, "get_transfer_manager", lambda: manager)
+    persister = FramePersister("video", max_pending=2)
+    frame = np.zeros((8, 8, 3), dtype=np.uint8)
+
+    start = time.perf_counter()
+    urls = [persister.submit(frame, number) for number in range(10)]
+    assert time.perf_counter() - start < 1  # the stalled upload never blocks submit
+
+    accepted = [number for number, url in enumerate(urls) if url is not None]
+    # At most one batch (concurrency * 2) in flight plus a full queue
+    assert 2 <= len(accepted) <= 4
+    assert persister.dropped == 10 - len(accepted)
+
+    manager.release.set()
+    persister.close(timeout=30)
+    assert persister.uploaded == len(accepted)
+    assert manager.uploaded == [frame_extractor.frame_path("video", number) for number in accepted]
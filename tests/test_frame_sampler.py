@@ -0,0 +1,74 @@
+"""
+TAHLEEL.ai Frame Sampler Tests
+
+Purpose:
+- Every sampling strategy must return the same frames with exact timestamps
+- Adaptive sampling must favor moving play and skip non-pitch shots
+- Uses a small synthetic match video, no GCS access
+
+Dependencies:
+- pytest
+- opencv-python
+"""
+
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+from benchmarks.synthetic_video import generate_match_video, match_frames
+from components.frame_sampler import FrameSampler, AdaptiveSampler, choose_strategy, SEEK_STRIDE_THRESHOLD
+
+
+@pytest.fixture(scope="module")
+def video_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("video") / "match.mp4")
+    return generate_match_video(path, seconds=4, fps=25, size=(320, 180))
+
+
+@pytest.mark.parametrize("stride", [1, 7, 40])
+def test_strategies_sample_identical_frames(video_path, stride):
+    sampled = {}
+    for strategy in ("read", "grab", "seek"):
+        cap = cv2.VideoCapture(video_path)
+        sampled[strategy] = [(i, t, frame.sum()) for i, t, frame in FrameSampler(cap, stride, strategy=strategy)]
+        cap.release()
+
+    assert sampled["read"] == sampled["grab"] == sampled["seek"]
+    assert [i for i, _, _ in sampled["read"]] == list(range(0, 100, stride))
+    assert all(t == pytest.approx(i * 1000 / 25) for i, t, _ in sampled["read"])
+
+
+def test_max_frames_and_start(video_path):
+    cap = cv2.VideoCapture(video_path)
+    indexes = [i for i, _, _ in FrameSampler(cap, 10, start=5, max_frames=3)]
+    cap.release()
+    assert indexes == [5, 15, 25]
+
+
+def test_auto_strategy_switches_to_seek_for_large_strides():
+    assert choose_strategy(5) == "grab"
+    assert choose_strategy(SEEK_STRIDE_THRESHOLD) == "seek"
+
+
+def test_adaptive_sampling_follows_motion_and_skips_non_pitch(tmp_path):
+    # 3 s stoppage (frozen frame), 4 s of play, 2 s crowd shot, at 25 FPS
+    path = str(tmp_path / "segments.mp4")
+    play = list(match_frames(100, (320, 180)))
+    crowd = cv2.GaussianBlur(np.random.default_rng(0).integers(0, 255, (180, 320, 3), dtype=np.uint8), (9, 9), 0)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 25, (320, 180))
+    for frame in [play[0]] * 75 + play + [np.roll(crowd, 3 * i, axis=1) for i in range(50)]:
+        writer.write(frame)
+    writer.release()
+
+    cap = cv2.VideoCapture(path)
+    sampler = AdaptiveSampler(cap, min_fps=2, max_fps=10)
+    indexes = [i for i, _, _ in sampler]
+    cap.release()
+
+    stoppage = [i for i in indexes if i < 75]
+    moving = [i for i in indexes if 75 <= i < 175]
+    assert all(i < 175 for i in indexes)
+    assert sampler.stats["non_pitch"] == 25  # every crowd candidate (stride 2)
+    assert 5 <= len(stoppage) <= 8  # ~2 FPS over 3 s
+    assert len(moving) / 4 > 2 * len(stoppage) / 3
@@ -0,0 +1,98 @@
+"""
+TAHLEEL.ai Inference Backend Tests
+
+Purpose:
+- ONNX Runtime backend matches the torch backend (raw outputs and final boxes)
+- Exported .onnx is cached and reused
+- Sessions size their thread pool from torch's thread count at creation (a
+  gunicorn worker's share), not at import
+- load_yolox_model refuses a backend without a torch module instead of returning None
+
+Dependencies:
+- pytest
+- torch, onnxruntime (YOLOX for the detector parity test)
+"""
+
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import torch
+from torch import nn
+
+pytest.importorskip("onnxruntime")
+
+from components.inference_backend import ONNXRuntimeBackend, TorchBackend, create_backend
+
+
+class TinyHead(nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.conv = nn.Sequential(nn.Conv2d(3, 8, 3, stride=2, padding=1), nn.SiLU(), nn.Conv2d(8, 85, 1))
+
+    def forward(self, x):
+        return self.conv(x).flatten(2).transpose(1, 2).sigmoid()
+
+
+def test_onnxruntime_matches_torch_and_caches_export(tmp_path):
+    torch.manual_seed(0)
+    model = TinyHead().eval()
+    onnx_path = str(tmp_path / "tiny.onnx")
+    batch = torch.rand(3, 3, 32, 32) * 255
+
+    ort_backend = ONNXRuntimeBackend(model, onnx_path, test_size=(32, 32))
+    expected = TorchBackend(model).forward(batch)
+    np.testing.assert_allclose(ort_backend.forward(batch).numpy(), expected.numpy(), atol=1e-5)
+
+    mtime = os.path.getmtime(onnx_path)
+    ONNXRuntimeBackend(model, onnx_path, test_size=(32, 32))
+    assert os.path.getmtime(onnx_path) == mtime
+
+
+def test_onnxruntime_threads_follow_torch_at_session_creation(tmp_path):
+    threads = torch.get_num_threads()
+    try:
+        torch.set_num_threads(1)
+        backend = ONNXRuntimeBackend(TinyHead().eval(), str(tmp_path / "tiny.onnx"), test_size=(32, 32))
+    finally:
+        torch.set_num_threads(threads)
+    assert backend.session.get_session_options().intra_op_num_threads == 1
+
+
+def test_onnxruntime_rejects_reduced_precision():
+    with pytest.raises(ValueError):
+        create_backend("onnxruntime", TinyHead().eval(), precision="bf16")
+    with pytest.raises(ValueError):
+        create_backend("tensorrt", TinyHead().eval())
+
+
+def test_yolox_detector_parity():
+    pytest.importorskip("yolox")
+    from components.yolox_detector import YOLOXDetector
+
+    detector = YOLOXDetector(pretrained=False, backend="torch")
+    # Lower the threshold so random weights still produce boxes to compare
+    detector.conf_thresh = 0.01
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 255, (360, 640, 3), dtype=np.uint8) for _ in range(2)]
+    expected = detector.detect_batch(frames)
+
+    detector.backend = create_backend("onnxruntime", detector.model, test_size=detector.test_size)
+    actual = detector.detect_batch(frames)
+
+    assert [len(d) for d in actual] == [len(d) for d in expected]
+    for frame_expected, frame_actual in zip(expected, actual):
+        for e, a in zip(frame_expected, frame_actual):
+            assert np.abs(np.array(e['bbox']) - np.array(a['bbox'])).max() <= 1
+            assert a['conf'] == pytest.approx(e['conf'], abs=1e-4)
+
+
+def test_load_yolox_model_raises_without_torch_module(monkeypatch):
+    import components.model_registry as model_registry
+    from components.yolox_detector import load_yolox_model
+
+    detector = SimpleNamespace(model=None, backend_name="onnxruntime")
+    monkeypatch.setattr(model_registry, "get_detector", lambda *args, **kwargs: detector)
+    with pytest.raises(RuntimeError, match="onnxruntime"):
+        load_yolox_model()
@@ -0,0 +1,98 @@
+"""
+TAHLEEL.ai Job Queue Tests
+
+Purpose:
+- Job store backends (memory, SQLite) queue, claim and report progress the same way
+- Worker pool runs handlers and records results/failures
+- /jobs/{job_id} reports stage, progress and result
+
+Dependencies:
+- pytest
+- httpx (for HTTP calls)
+"""
+
+import time
+
+import pytest
+
+from utils.job_store import InMemoryJobStore, SQLiteJobStore, get_job_store, job_status
+from components.job_worker import JobWorkerPool
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteJobStore(str(tmp_path / "jobs.sqlite3"), poll_interval=0.01)
+    return InMemoryJobStore()
+
+
+def test_claim_is_fifo_and_marks_running(store):
+    first = store.create("analysis", {"video_id": "a"})
+    second = store.create("analysis", {"video_id": "b"})
+
+    claimed = store.claim(timeout=0.1)
+    assert claimed["id"] == first["id"]
+    assert claimed["status"] == "running" and claimed["payload"] == {"video_id": "a"}
+    assert store.claim(timeout=0.1)["id"] == second["id"]
+    assert store.claim(timeout=0.05) is None
+
+
+def test_claim_filters_by_type(store):
+    analysis = store.create("analysis", {})
+    shard = store.create("analysis_shard", {})
+
+    assert store.claim(timeout=0.05, types=("analysis_shard",))["id"] == shard["id"]
+    assert store.claim(timeout=0.05, types=("analysis_shard",)) is None
+    assert store.claim(timeout=0.05)["id"] == analysis["id"]
+
+
+def test_progress_and_eta(store):
+    job = store.create("analysis", {})
+    store.claim(timeout=0.1)
+    store.update(job["id"], stage="detecting", frames_total=100, frames_done=25, started_at=time.time() - 10)
+
+    status = job_status(store.get(job["id"]))
+    assert status["stage"] == "detecting"
+    assert status["progress"] == {"frames_done": 25, "frames_total": 100, "percent": 25.0}
+    assert status["eta_seconds"] == pytest.approx(30, rel=0.05)
+
+
+def test_worker_pool_records_results_and_failures(store):
+    def handler(payload, progress):
+        progress.stage("detecting", frames_total=2)
+        progress.frames(2, 2)
+        if payload.get("fail"):
+            raise RuntimeError("no frames")
+        return {"ok": payload["n"]}
+
+    ok = store.create("analysis", {"n": 1})
+    bad = store.create("analysis", {"fail": True})
+    pool = JobWorkerPool(store, {"analysis": handler}, workers=2).start()
+    try:
+        deadline = time.time() + 5
+        while time.time() < deadline and any(store.get(j["id"])["status"] in ("queued", "running") for j in (ok, bad)):
+            time.sleep(0.02)
+    finally:
+        pool.stop(timeout=2)
+
+    result = job_status(store.get(ok["id"]))["result"]
+    assert result["ok"] == 1
+    assert result["timings"]["wall_seconds"] >= 0
+    assert store.get(ok["id"])["frames_done"] == 2
+    failed = store.get(bad["id"])
+    assert failed["status"] == "failed" and failed["error"] == "no frames"
+
+
+@pytest.mark.asyncio
+async def test_jobs_endpoint():
+    httpx = pytest.importorskip("httpx")
+    from main import app
+
+    job = get_job_store().create("noop", {})
+    async with httpx.AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.get(f"/jobs/{job['id']}")
+        assert response.status_code == 200
+        assert response.json()["status"] == "queued"
+
+        response = await ac.get("/jobs/does-not-exist")
+        assert response.status_code == 404
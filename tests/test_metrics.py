@@ -0,0 +1,107 @@
+"""
+TAHLEEL.ai Pipeline Metrics Tests
+
+Purpose:
+- Spans recorded on pipeline worker threads must add up in the job's trace
+- So must the spans of streamed frame downloads on transfer pool threads
+- Nested traces (shards run by their coordinator) must count toward the parent
+- /metrics must serve Prometheus histograms
+
+Dependencies:
+- pytest, pytest-asyncio
+- httpx (for the endpoint test)
+"""
+
+import numpy as np
+import pytest
+
+import utils.storage as storage
+import utils.metrics as metrics
+from utils.metrics import span, job_trace
+from components.pipeline import Stage, StagedPipeline
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def test_pipeline_thread_spans_reach_the_job_trace():
+    def work(item):
+        with span("work"):
+            return item * 2
+
+    with job_trace("analysis") as trace:
+        results = list(StagedPipeline([Stage("work", work, workers=3)]).run(range(10)))
+
+    assert results == [i * 2 for i in range(10)]
+    stages = trace.summary()["stages"]
+    assert stages["work"]["count"] == 10
+    # Spans outside any trace only reach the process-wide histogram
+    with span("work"):
+        pass
+    assert metrics.stage_seconds.snapshot()["work"][2] == 11
+
+
+def test_streamed_download_spans_reach_the_job_trace(tmp_path, monkeypatch):
+    from utils.transfer_manager import TransferManager
+
+    monkeypatch.setattr(storage, "STORAGE_BACKEND", "local")
+    monkeypatch.setattr(storage, "LOCAL_STORAGE_ROOT", str(tmp_path))
+    monkeypatch.setattr(storage, "_backends", {})
+    manager = TransferManager(concurrency=2)
+    frame = np.zeros((16, 16, 3), dtype=np.uint8)
+    manager.upload_many([(frame, f"frames/{i}.jpg") for i in range(3)])
+
+    with job_trace("analysis") as trace:
+        results = list(manager.iter_download([f"frames/{i}.jpg" for i in range(3)], decode=True))
+    manager.close()
+
+    assert all(r.ok for r in results)
+    stages = trace.summary()["stages"]
+    assert stages["frame_download"]["count"] == 3
+    assert stages["jpeg_decode"]["count"] == 3
+
+
+def test_nested_traces_count_toward_the_parent():
+    with job_trace("analysis") as parent:
+        with job_trace("analysis_shard") as child:
+            metrics.observe("forward", 0.5)
+        parent.merge({"forward": {"count": 2, "seconds": 1.0, "max_ms": 600.0}})
+
+    assert child.summary()["stages"]["forward"]["count"] == 1
+    forward = parent.summary()["stages"]["forward"]
+    assert forward["count"] == 3
+    assert forward["seconds"] == pytest.approx(1.5)
+    assert forward["max_ms"] == pytest.approx(600.0)
+
+
+def test_prometheus_histograms():
+    metrics.observe("nms", 0.003)
+    metrics.observe("nms", 0.2)
+    with pytest.raises(RuntimeError):
+        with job_trace("analysis"):
+            raise RuntimeError("boom")
+
+    text = metrics.render_prometheus()
+    assert "# TYPE tahleel_stage_seconds histogram" in text
+    assert 'tahleel_stage_seconds_bucket{stage="nms",le="0.0025"} 0' in text
+    assert 'tahleel_stage_seconds_bucket{stage="nms",le="0.005"} 1' in text
+    assert 'tahleel_stage_seconds_bucket{stage="nms",le="+Inf"} 2' in text
+    assert 'tahleel_stage_seconds_count{stage="nms"} 2' in text
+    assert 'tahleel_jobs_total{type="analysis",status="failed"} 1' in text
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint():
+    httpx = pytest.importorskip("httpx")
+    from main import app
+
+    metrics.observe("decode", 0.01)
+    async with httpx.AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'tahleel_stage_seconds_count{stage="decode"} 1' in response.text
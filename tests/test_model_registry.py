@@ -0,0 +1,98 @@
+"""
+TAHLEEL.ai Model Registry Tests
+
+Purpose:
+- Concurrent first requests for a model must share a single load
+- A failed load must be recorded, and the next get() must try again
+- clear() must forget warm-ups in flight
+
+Dependencies:
+- pytest
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import components.yolox_detector as yolox_detector
+from components.model_registry import ModelRegistry
+
+
+class CountingDetector:
+    """Stands in for YOLOXDetector: a slow load that fails while `failures` is non-zero"""
+
+    loads = 0
+    failures = 0
+    release = None  # an Event to hold loads until set
+    lock = threading.Lock()
+
+    def __init__(self, model_name, device, precision):
+        with CountingDetector.lock:
+            CountingDetector.loads += 1
+            fail = CountingDetector.failures > 0
+            CountingDetector.failures -= fail
+        time.sleep(0.05)
+        if CountingDetector.release is not None:
+            CountingDetector.release.wait(timeout=30)
+        if fail:
+            raise RuntimeError("weights unavailable")
+        self.backend = SimpleNamespace(name="torch", param_bytes=lambda: 0)
+
+
+@pytest.fixture
+def detector_class(monkeypatch):
+    monkeypatch.setattr(CountingDetector, "loads", 0)
+    monkeypatch.setattr(CountingDetector, "failures", 0)
+    monkeypatch.setattr(CountingDetector, "release", None)
+    monkeypatch.setattr(yolox_detector, "YOLOXDetector", CountingDetector)
+    return CountingDetector
+
+
+def test_concurrent_first_calls_load_once(detector_class):
+    registry = ModelRegistry()
+    start = threading.Barrier(8)
+    results = []
+
+    def first_call():
+        start.wait()
+        results.append(registry.get("yolox_m", "cpu", "fp32"))
+
+    threads = [threading.Thread(target=first_call) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=30)
+
+    assert detector_class.loads == 1
+    assert len(results) == 8 and all(r is results[0] for r in results)
+    assert [s["model_name"] for s in registry.stats()] == ["yolox_m"]
+
+
+def test_failed_load_is_recorded_and_retried(detector_class):
+    registry = ModelRegistry()
+    detector_class.failures = 1
+
+    with pytest.raises(RuntimeError, match="weights unavailable"):
+        registry.get("yolox_m", "cpu", "fp32")
+    assert registry.state("yolox_m", "cpu", "fp32") == {"status": "failed", "error": "weights unavailable"}
+    assert not registry.is_loaded("yolox_m", "cpu", "fp32")
+
+    detector = registry.get("yolox_m", "cpu", "fp32")
+    assert detector_class.loads == 2
+    assert registry.state("yolox_m", "cpu", "fp32")["status"] == "ready"
+    assert registry.get("yolox_m", "cpu", "fp32") is detector
+
+
+def test_clear_forgets_warmups_in_flight(detector_class):
+    registry = ModelRegistry()
+    detector_class.release = threading.Event()
+    thread = registry.warmup("yolox_m", "cpu", "fp32", background=True)
+    assert registry.state("yolox_m", "cpu", "fp32")["status"] == "loading"
+
+    registry.clear()
+    assert registry.state("yolox_m", "cpu", "fp32")["status"] == "not_loaded"
+    assert not registry._warmups
+    detector_class.release.set()
+    thread.join(timeout=30)
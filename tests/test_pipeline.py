@@ -0,0 +1,83 @@
+"""
+TAHLEEL.ai Staged Pipeline Tests
+
+Purpose:
+- Verify components/pipeline.py keeps frame order across parallel stages
+- Verify batching, per-item error isolation and bounded in-flight work
+
+Dependencies:
+- pytest
+"""
+
+import random
+import threading
+import time
+
+from components.pipeline import Stage, StagedPipeline, StageError
+
+
+def test_results_keep_source_order_with_parallel_workers():
+    def jitter(x):
+        time.sleep(random.random() * 0.005)
+        return x
+
+    pipeline = StagedPipeline([
+        Stage("a", jitter, workers=4),
+        Stage("b", lambda x: x * 2, workers=3),
+    ], queue_size=4)
+
+    assert list(pipeline.run(range(200))) == [x * 2 for x in range(200)]
+
+
+def test_batched_stage_receives_lists():
+    sizes = []
+
+    def infer(batch):
+        sizes.append(len(batch))
+        return [x + 1 for x in batch]
+
+    pipeline = StagedPipeline([Stage("infer", infer, batch_size=8)], queue_size=32)
+
+    assert list(pipeline.run(range(50))) == list(range(1, 51))
+    assert max(sizes) <= 8
+
+
+def test_failed_item_becomes_stage_error_and_skips_later_stages():
+    seen = []
+
+    def fail_on_three(x):
+        if x == 3:
+            raise ValueError("bad frame")
+        return x
+
+    def record(x):
+        seen.append(x)
+        return x
+
+    pipeline = StagedPipeline([Stage("pre", fail_on_three, workers=2), Stage("post", record)])
+    results = list(pipeline.run(range(6)))
+
+    assert isinstance(results[3], StageError)
+    assert results[3].stage == "pre" and results[3].item == 3
+    assert [r for r in results if not isinstance(r, StageError)] == [0, 1, 2, 4, 5]
+    assert 3 not in seen
+
+
+def test_source_is_throttled_by_bounded_queues():
+    produced = []
+    lock = threading.Lock()
+
+    def source():
+        for i in range(100):
+            with lock:
+                produced.append(i)
+            yield i
+
+    pipeline = StagedPipeline([Stage("slow", lambda x: x)], queue_size=2)
+    results = pipeline.run(source())
+    first = next(results)
+    time.sleep(0.2)
+
+    assert first == 0
+    assert len(produced) <= pipeline.max_in_flight + 2
+    assert list(results) == list(range(1, 100))
@@ -0,0 +1,86 @@
+"""
+TAHLEEL.ai Postprocess Tests
+
+Purpose:
+- Vectorized person postprocess matches YOLOX's postprocess + per-box filter
+- Non-person boxes are removed before NMS and never suppress people
+- Boxes map back to frame coordinates through the letterbox ratio
+
+Dependencies:
+- pytest
+- torch, torchvision
+"""
+
+import numpy as np
+import pytest
+import torch
+
+from components.yolox_detector import YOLOXDetector, CONF_THRESH, NMS_THRESH
+
+
+def make_detector(test_size=(640, 640)):
+    detector = YOLOXDetector.__new__(YOLOXDetector)
+    detector.num_classes = 80
+    detector.test_size = test_size
+    detector.conf_thresh = CONF_THRESH
+    detector.nms_thresh = NMS_THRESH
+    return detector
+
+
+def make_outputs(boxes, batch=1, anchors=50, seed=0):
+    """Raw head outputs with low-score noise plus `boxes`: [(image, cx, cy, w, h, obj, class_id, cls_score)]"""
+    rng = np.random.default_rng(seed)
+    outputs = np.zeros((batch, anchors, 85), dtype=np.float32)
+    outputs[..., :2] = rng.uniform(0, 640, (batch, anchors, 2))
+    outputs[..., 2:4] = rng.uniform(10, 80, (batch, anchors, 2))
+    outputs[..., 4] = rng.uniform(0, 0.2, (batch, anchors))
+    outputs[..., 5:] = rng.uniform(0, 0.2, (batch, anchors, 80))
+    for k, (image, cx, cy, w, h, obj, class_id, cls_score) in enumerate(boxes):
+        outputs[image, k] = 0
+        outputs[image, k, :5] = (cx, cy, w, h, obj)
+        outputs[image, k, 5 + class_id] = cls_score
+    return torch.from_numpy(outputs)
+
+
+def reference_detections(detector, outputs, h, w):
+    """The previous implementation: YOLOX postprocess, then a per-box Python filter"""
+    yolox_utils = pytest.importorskip("yolox.utils")
+    results = []
+    for output in yolox_utils.postprocess(outputs.clone(), 80, CONF_THRESH, NMS_THRESH, class_agnostic=True):
+        dets = []
+        for x1, y1, x2, y2, obj_conf, cls_conf, cls_id in ([] if output is None else output.numpy()):
+            if int(cls_id) == 0 and obj_conf * cls_conf >= CONF_THRESH:
+                dets.append([int(x1 * w / 640), int(y1 * h / 640), int(x2 * w / 640), int(y2 * h / 640)])
+        results.append(sorted(dets))
+    return results
+
+
+def test_matches_yolox_postprocess_for_people():
+    detector = make_detector()
+    people = [(i % 2, 60 + 70 * i, 300, 40, 90, 0.9, 0, 0.8 - 0.02 * i) for i in range(8)]
+    overlapping = [(0, 62, 302, 40, 90, 0.9, 0, 0.5)]  # suppressed by NMS
+    outputs = make_outputs(people + overlapping, batch=2)
+
+    results = detector._postprocess(outputs.clone())
+    actual = [sorted(detector._to_arrays(r, 640, 640)[0].tolist()) for r in results]
+    assert actual == reference_detections(detector, outputs, 640, 640)
+    assert [len(a) for a in actual] == [4, 4]
+
+
+def test_non_person_boxes_are_dropped_before_nms():
+    detector = make_detector()
+    # A higher-scoring "sports ball" box on top of a player used to suppress the player
+    outputs = make_outputs([(0, 300, 300, 40, 90, 0.9, 0, 0.6), (0, 300, 300, 40, 90, 0.95, 32, 0.9)])
+
+    boxes, scores = detector._to_arrays(detector._postprocess(outputs)[0], 640, 640)
+    assert len(boxes) == 1
+    assert scores[0] == pytest.approx(0.54)
+
+
+def test_boxes_scale_back_from_letterbox():
+    detector = make_detector()
+    outputs = make_outputs([(0, 320, 320, 64, 128, 1.0, 0, 1.0)])
+
+    boxes, _ = detector._to_arrays(detector._postprocess(outputs)[0], 720, 1280)
+    # 1280x720 is letterboxed into 640x360 (ratio 0.5), so both axes scale by 2
+    assert boxes.tolist() == [[576, 512, 704, 768]]
@@ -0,0 +1,70 @@
+"""
+TAHLEEL.ai Precision Mode Tests
+
+Purpose:
+- Precision / compile modes keep outputs close to fp32 on a small conv model
+- Box agreement metrics used by the accuracy-vs-speed check
+
+Dependencies:
+- pytest
+- torch
+"""
+
+import pytest
+import torch
+from torch import nn
+
+from components.precision import prepare_model, autocast_context, match_detections, compare_to_reference
+
+
+class TinyDetector(nn.Module):
+    """Same layout as YOLOX: a quantizable `backbone` followed by an fp32 head"""
+
+    def __init__(self):
+        super().__init__()
+        self.backbone = nn.Sequential(nn.Conv2d(3, 8, 3, padding=1), nn.ReLU(), nn.Conv2d(8, 8, 3, padding=1), nn.ReLU())
+        self.head = nn.Conv2d(8, 6, 1)
+
+    def forward(self, x):
+        return self.head(self.backbone(x)).flatten(2).transpose(1, 2)
+
+
+@pytest.mark.parametrize("precision,compile_mode", [
+    ("bf16", "none"), ("int8_dynamic", "none"), ("int8_static", "none"), ("fp32", "jit"), ("int8_static", "jit"),
+])
+def test_modes_stay_close_to_fp32(precision, compile_mode):
+    torch.manual_seed(0)
+    model = TinyDetector().eval()
+    batches = [torch.rand(2, 3, 32, 32) for _ in range(4)]
+    with torch.no_grad():
+        reference = model(batches[0])
+
+    prepared = prepare_model(model, precision, compile_mode, example=batches[0], calibration_batches=batches)
+    with torch.no_grad(), autocast_context(precision):
+        output = prepared(batches[0]).float()
+
+    rel_error = (output - reference).abs().mean() / reference.abs().mean()
+    assert output.shape == reference.shape
+    assert rel_error < 0.05
+
+
+def test_unknown_modes_and_missing_calibration_are_rejected():
+    with pytest.raises(ValueError):
+        prepare_model(TinyDetector().eval(), "fp16")
+    with pytest.raises(ValueError):
+        prepare_model(TinyDetector().eval(), "fp32", "tensorrt")
+    with pytest.raises(ValueError):
+        prepare_model(TinyDetector().eval(), "int8_static", calibration_batches=[])
+
+
+def test_box_agreement_metrics():
+    ref = [[{'bbox': [0, 0, 10, 10], 'conf': 0.9}, {'bbox': [50, 50, 60, 60], 'conf': 0.8}]]
+    cand = [[{'bbox': [1, 0, 11, 10], 'conf': 0.85}, {'bbox': [100, 100, 110, 110], 'conf': 0.5}]]
+
+    assert match_detections(ref[0], cand[0])[0] == 1
+    raw = torch.ones(1, 4, 6)
+    metrics = compare_to_reference(ref, cand, raw, raw * 1.01)
+    assert metrics["box_recall"] == 0.5 and metrics["box_precision"] == 0.5
+    assert metrics["mean_iou"] == pytest.approx(9 / 11, abs=1e-3)
+    assert metrics["mean_conf_diff"] == pytest.approx(0.05)
+    assert metrics["output_rel_error"] == pytest.approx(0.01)
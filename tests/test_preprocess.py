@@ -0,0 +1,50 @@
+"""
+TAHLEEL.ai Preprocessing Tests
+
+Purpose:
+- Letterboxing matches YOLOX's ValTransform (BGR, 0-255, pad 114, top-left)
+- Canvases and the batch input buffer are reused across frames
+
+Dependencies:
+- pytest
+- numpy, opencv, torch
+"""
+
+import numpy as np
+import pytest
+
+from components.preprocess import LetterboxPreprocessor, preprocess_frame, PAD_VALUE
+
+
+def frame(h, w, seed=0):
+    return np.random.default_rng(seed).integers(0, 255, (h, w, 3), dtype=np.uint8)
+
+
+@pytest.mark.parametrize("shape", [(720, 1280), (1080, 1440), (640, 640), (300, 500)])
+def test_matches_yolox_val_transform(shape):
+    data_augment = pytest.importorskip("yolox.data.data_augment")
+    img = frame(*shape)
+    expected, _ = data_augment.ValTransform(legacy=False)(img, None, (640, 640))
+
+    np.testing.assert_array_equal(preprocess_frame(img).numpy()[0], expected)
+
+
+def test_buffers_are_reused_and_padding_refreshed():
+    preprocessor = LetterboxPreprocessor((64, 64), max_batch=2)
+
+    first, ratios = preprocessor([frame(32, 64), frame(64, 32, seed=1)])
+    canvas, _ = preprocessor.letterbox(frame(16, 64, seed=2))
+    second = preprocessor.batch([canvas])
+
+    assert ratios == [1.0, 1.0]
+    assert second.data_ptr() == first.data_ptr()
+    assert len(preprocessor._free) == 2
+    # Rows 16..63 were image content for the previous frame in this canvas, now padding
+    assert (second[0, :, 16:, :] == PAD_VALUE).all()
+    np.testing.assert_array_equal(second[0].numpy(), preprocess_frame(frame(16, 64, seed=2), (64, 64)).numpy()[0])
+
+
+def test_batch_grows_past_max_batch():
+    preprocessor = LetterboxPreprocessor((32, 32), max_batch=1)
+    batch, _ = preprocessor([frame(32, 32, seed=i) for i in range(3)])
+    assert tuple(batch.shape) == (3, 3, 32, 32)
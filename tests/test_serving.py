@@ -0,0 +1,106 @@
+"""
+TAHLEEL.ai Multi-Process Serving Tests
+
+Purpose:
+- Workers must split the CPUs between them instead of each using all of them
+- Forked workers must keep preloaded torch models but not the parent's
+  connections, transfer threads or ONNX Runtime sessions
+- Readiness must follow a background warm-up: loading (503), then ready, or
+  failed when the model cannot load
+
+Dependencies:
+- pytest
+"""
+
+import threading
+import multiprocessing
+from types import SimpleNamespace
+
+import utils.storage as storage
+import utils.transfer_manager as transfer_manager
+import components.model_registry as model_registry
+import components.yolox_detector as yolox_detector
+from components.model_registry import ModelRegistry
+from components.serving import worker_threads, readiness
+
+
+def test_worker_threads_split_the_cpus():
+    assert worker_threads(1, cpus=8) == 8
+    assert worker_threads(3, cpus=8) == 2
+    assert worker_threads(16, cpus=8) == 1
+    assert worker_threads(4, threads=3, cpus=8) == 3
+
+
+def test_registry_after_fork_keeps_only_torch_models():
+    registry = ModelRegistry()
+    for name, backend in (("torch_model", "torch"), ("onnx_model", "onnxruntime")):
+        key = (name, "cpu", "fp32")
+        registry._detectors[key] = SimpleNamespace(backend=SimpleNamespace(name=backend))
+        registry._stats[key] = {"model_name": name}
+
+    registry._after_fork()
+
+    assert registry.is_loaded("torch_model", "cpu", "fp32")
+    assert not registry.is_loaded("onnx_model", "cpu", "fp32")
+    assert [s["model_name"] for s in registry.stats()] == ["torch_model"]
+
+
+def _child_backends(queue):
+    queue.put(len(storage._backends))
+
+
+def test_forked_worker_drops_storage_connections(monkeypatch):
+    monkeypatch.setattr(storage, "_backends", {("gcs", "bucket"): object()})
+    context = multiprocessing.get_context("fork")
+    queue = context.Queue()
+    child = context.Process(target=_child_backends, args=(queue,))
+    child.start()
+    assert queue.get(timeout=30) == 0
+    child.join()
+    assert len(storage._backends) == 1
+
+
+def _child_transfer(queue, parent_manager):
+    manager = transfer_manager.get_transfer_manager()
+    queue.put((manager is not parent_manager, manager._executor.submit(lambda: "ran").result(timeout=10)))
+
+
+def test_forked_worker_gets_its_own_transfer_pool():
+    manager = transfer_manager.get_transfer_manager()
+    manager._executor.submit(lambda: None).result()  # parent pool threads are running
+    context = multiprocessing.get_context("fork")
+    queue = context.Queue()
+    child = context.Process(target=_child_transfer, args=(queue, manager))
+    child.start()
+    assert queue.get(timeout=30) == (True, "ran")
+    child.join()
+
+
+def test_readiness_follows_background_warmup(monkeypatch):
+    release = threading.Event()
+
+    class SlowDetector:
+        backend = SimpleNamespace(name="torch", param_bytes=lambda: 0)
+
+        def __init__(self, model_name, device, precision):
+            release.wait(timeout=30)
+            if model_name == "broken":
+                raise RuntimeError("no weights")
+
+    registry = ModelRegistry()
+    monkeypatch.setattr(model_registry, "registry", registry)
+    monkeypatch.setattr(yolox_detector, "YOLOXDetector", SlowDetector)
+
+    assert readiness("eager")[1]["status"] == "not_loaded"
+    assert readiness("lazy")[0]
+
+    threads = [registry.warmup(background=True), registry.warmup("broken", background=True)]
+    ready, body = readiness("background")
+    assert not ready and body["status"] == "loading"
+
+    release.set()
+    for thread in threads:
+        thread.join(timeout=30)
+    assert readiness("background")[0]
+    assert registry.state("broken")["status"] == "failed"
+    assert registry.state("broken")["error"] == "no weights"
@@ -0,0 +1,106 @@
+"""
+TAHLEEL.ai Sharded Detection Tests
+
+Purpose:
+- Time-range shards must split the frames of a full pass exactly, even when
+  boundaries fall between sampled frames
+- Merging must be deterministic: frame order, numbering and track ids continuing
+  across shard boundaries
+- Queued shards must finish even with no other worker running
+
+Dependencies:
+- pytest
+- numpy, opencv-python
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+import utils.job_store as job_store
+import utils.storage as storage
+import components.sharding as sharding
+from benchmarks.synthetic_video import generate_match_video
+from components.detection_table import DetectionTable
+from components.frame_extractor import FrameStream
+from components.sharding import Shard, plan_shards, merge_shard_tables
+
+
+@pytest.fixture(scope="module")
+def video_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("video") / "match.mp4")
+    return generate_match_video(path, seconds=4, fps=25, size=(320, 180))
+
+
+def stream_frames(video_path, **window):
+    frames = FrameStream("gs://bucket/videos/match.mp4", fps=5, resize=(160, 90), video_path=video_path, **window)
+    return [(f.number, f.source_index, f.timestamp_ms) for f in frames]
+
+
+def shard_table(index, frames, track_ids):
+    """One box per frame at x = 10 * global position, tracked as track_ids[i]"""
+    table = DetectionTable(metadata={"shard": {"index": index}})
+    for number, track_id in zip(frames, track_ids):
+        table.append_arrays(number, [[10 * number, 0, 10 * number + 20, 40]], [0.9], [0], track_ids=[track_id],
+                            timestamp_ms=200.0 * number)
+    return table
+
+
+def test_plan_shards_covers_the_video():
+    shards = plan_shards(25_000, shard_seconds=10)
+    assert shards == [Shard(0, 0, 10_000), Shard(1, 10_000, 20_000), Shard(2, 20_000, None)]
+    assert plan_shards(500, shard_seconds=10) == [Shard(0, 0, None)]
+
+
+def test_shards_partition_the_full_pass(video_path):
+    full = stream_frames(video_path)
+    # Boundaries off the 200 ms sampling grid
+    bounds = [0, 1130, 2500, None]
+    sharded = []
+    for start_ms, end_ms in zip(bounds, bounds[1:]):
+        sharded += stream_frames(video_path, start_ms=start_ms, end_ms=end_ms)
+
+    assert len(full) == 20
+    assert sharded == full
+
+
+def test_merge_is_deterministic_and_stitches_tracks():
+    # Shard 0 tracks one player as 1, shard 1 (separately) as 1 and a newcomer as 2
+    first = shard_table(0, [0, 1, 2], [1, 1, 1])
+    second = shard_table(1, [0, 1], [1, 1])
+    second.append_arrays(2, [[500, 0, 520, 40]], [0.9], [1], track_ids=[2])
+    second.metadata = {"shard": {"index": 1}}
+
+    merged = merge_shard_tables([second, first])
+    again = merge_shard_tables([first, second])
+
+    assert merged.to_bytes() == again.to_bytes()
+    assert merged.frames["frame_number"].tolist() == [0, 1, 2, 3, 4, 5]
+    # Shard 1 starts where shard 0 ended (x = 20 vs x = 0): too far to be the same box
+    assert merged.boxes["track_id"].tolist() == [1, 1, 1, 2, 2, 3]
+
+    stitched = merge_shard_tables([shard_table(0, [0, 1, 2], [5, 5, 5]), shard_table(1, [2, 3], [7, 7])])
+    assert stitched.boxes["track_id"].tolist() == [1, 1, 1, 1, 1]
+
+
+def test_queued_shards_run_on_the_coordinator(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "STORAGE_BACKEND", "local")
+    monkeypatch.setattr(storage, "LOCAL_STORAGE_ROOT", str(tmp_path / "storage"))
+    monkeypatch.setattr(storage, "_backends", {})
+    monkeypatch.setattr(job_store, "_store", job_store.InMemoryJobStore())
+
+    def fake_detect_shard(gcs_url, shard, fps, resize, persist_frames=False, video_path=None, progress_callback=None):
+        assert video_path == "/tmp/local.mp4"
+        return shard_table(shard.index, [3 * shard.index, 3 * shard.index + 1, 3 * shard.index + 2], [1, 1, 1])
+
+    monkeypatch.setattr(sharding, "detect_shard", fake_detect_shard)
+    shards = plan_shards(30_000, shard_seconds=10)
+    done = []
+    tables = sharding._run_queued_shards("match", "gs://bucket/videos/match.mp4", shards, 5, (160, 90), False,
+                                         "/tmp/local.mp4", lambda frames: done.append(frames))
+
+    merged = merge_shard_tables(tables)
+    assert len(merged) == 9
+    assert merged.boxes["x1"].tolist() == [10 * i for i in range(9)]
+    assert done[-1] == 9
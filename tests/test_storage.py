@@ -0,0 +1,137 @@
+"""
+TAHLEEL.ai Storage Tests
+
+Purpose:
+- Streaming video upload through the local filesystem storage backend (no GCS)
+- Uploads are read in fixed-size chunks and over-size uploads leave nothing behind
+- Shared backend operations, URL routing and request metrics
+- Bulk transfers keep input order and retry transient failures
+
+Dependencies:
+- pytest
+- fastapi (UploadFile)
+"""
+
+import io
+import os
+
+import pytest
+
+pytest.importorskip("fastapi")
+from fastapi import UploadFile
+
+import utils.cloud_storage as cloud_storage
+import utils.storage as storage
+from utils.transfer_manager import TransferManager
+
+
+class CountingBytesIO(io.BytesIO):
+    def __init__(self, data):
+        super().__init__(data)
+        self.read_sizes = []
+
+    def read(self, size=-1):
+        self.read_sizes.append(size)
+        return super().read(size)
+
+
+@pytest.fixture
+def local_storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "STORAGE_BACKEND", "local")
+    monkeypatch.setattr(storage, "LOCAL_STORAGE_ROOT", str(tmp_path))
+    monkeypatch.setattr(storage, "_backends", {})
+    return storage.get_storage(cloud_storage.GCS_BUCKET)
+
+
+@pytest.mark.asyncio
+async def test_streaming_upload_reads_fixed_chunks(local_storage, monkeypatch):
+    monkeypatch.setattr(cloud_storage, "UPLOAD_CHUNK_SIZE", 1024)
+    data = os.urandom(10 * 1024 + 7)
+    source = CountingBytesIO(data)
+
+    url = await cloud_storage.upload_video_to_gcs(UploadFile(file=source, filename="match.mp4"), "vid-1")
+
+    assert url == f"local://{cloud_storage.GCS_BUCKET}/videos/vid-1.mp4"
+    with open(local_storage.local_path("videos/vid-1.mp4"), "rb") as f:
+        assert f.read() == data
+    assert set(source.read_sizes) == {1024}
+
+
+@pytest.mark.asyncio
+async def test_oversize_upload_is_aborted(local_storage, monkeypatch):
+    monkeypatch.setattr(cloud_storage, "UPLOAD_CHUNK_SIZE", 1024)
+    monkeypatch.setattr(cloud_storage, "MAX_VIDEO_SIZE", 4096)
+
+    url = await cloud_storage.upload_video_to_gcs(UploadFile(file=io.BytesIO(b"0" * 5000), filename="big.mp4"), "vid-2")
+
+    assert url is None
+    videos_dir = os.path.dirname(local_storage.local_path("videos/vid-2.mp4"))
+    assert os.listdir(videos_dir) == []
+
+
+def test_local_backend_rejects_paths_outside_root(local_storage):
+    with pytest.raises(ValueError):
+        local_storage.local_path("../../etc/passwd")
+
+
+def test_backend_round_trip_and_metrics(local_storage, tmp_path):
+    storage.metrics.reset()
+    url = local_storage.upload_bytes("frames/v/frame_0000.jpg", b"jpeg-bytes")
+    local_storage.upload_bytes("frames/v/frame_0001.jpg", b"more")
+
+    backend, path = storage.storage_for_url(url)
+    assert backend is local_storage
+    assert backend.download_bytes(path) == b"jpeg-bytes"
+    assert backend.exists(path) and not backend.exists("frames/v/missing.jpg")
+    assert backend.list("frames/v/") == ["frames/v/frame_0000.jpg", "frames/v/frame_0001.jpg"]
+
+    target = str(tmp_path / "copy.jpg")
+    backend.download_to_file(path, target)
+    assert open(target, "rb").read() == b"jpeg-bytes"
+
+    stats = storage.metrics.snapshot()
+    assert stats["upload"]["requests"] == 2 and stats["upload"]["bytes"] == 14
+    assert stats["download"]["requests"] == 2 and stats["download"]["bytes"] == 20
+    assert stats["exists"]["requests"] == 2
+
+
+def test_json_results_use_shared_backend(local_storage):
+    assert cloud_storage.upload_json_to_gcs({"status": "success"}, "vid-3-tactical-report")
+    assert cloud_storage.get_analysis_result_from_gcs("vid-3-tactical-report") == {"status": "success"}
+    assert cloud_storage.get_analysis_result_from_gcs("missing") is None
+
+
+class FlakyLocalStorage(storage.LocalStorage):
+    """Local backend whose first upload of every path fails with a transient error"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.seen = set()
+
+    def upload_bytes(self, path, data, content_type=None):
+        if path not in self.seen:
+            self.seen.add(path)
+            raise ConnectionError("transient")
+        return super().upload_bytes(path, data, content_type)
+
+
+def test_bulk_upload_and_download_keep_order_and_retry(local_storage, tmp_path, monkeypatch):
+    flaky = FlakyLocalStorage(local_storage.bucket_name, str(tmp_path))
+    monkeypatch.setitem(storage._backends, ("local", local_storage.bucket_name), flaky)
+    manager = TransferManager(concurrency=4, retries=2, backoff=0.001, bucket_name=local_storage.bucket_name)
+
+    items = [(f"frame-{i}".encode(), f"frames/v/frame_{i:04d}.jpg") for i in range(20)]
+    results, stats = manager.upload_many(items)
+
+    assert [r.path for r in results] == [path for _, path in items]
+    assert all(r.ok and r.attempts == 2 for r in results)
+    assert stats["objects"] == 20 and stats["failed"] == 0 and stats["retries"] == 20
+
+    downloads, stats = manager.download_many([r.url for r in results] + ["frames/v/missing.jpg"])
+    assert [d.data for d in downloads[:-1]] == [data for data, _ in items]
+    assert not downloads[-1].ok and downloads[-1].attempts == 1
+    assert stats["failed"] == 1
+
+    streamed = list(manager.iter_download([path for _, path in items], window=3))
+    assert [d.data for d in streamed] == [data for data, _ in items]
+    manager.close()
@@ -0,0 +1,77 @@
+"""
+TAHLEEL.ai Team Color Model Tests
+
+Purpose:
+- Vectorized shirt colors must match the per-box crop they replace
+- team_id must stay attached to the same kit across frames
+
+Dependencies:
+- pytest
+- numpy, opencv-python
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from components.team_classifier import TeamColorModel, box_colors, assign_teams
+
+BLUE, RED = (200, 40, 40), (40, 40, 210)
+
+
+def make_frame(players, rng):
+    frame = np.full((200, 300, 3), (40, 140, 40), np.uint8)
+    boxes = []
+    for color in players:
+        x, y = rng.integers(0, 280), rng.integers(0, 160)
+        frame[y:y + 12, x:x + 10] = color
+        boxes.append([int(x), int(y), int(x) + 10, int(y) + 36])
+    return frame, boxes
+
+
+def test_box_colors_match_crop_mean():
+    rng = np.random.default_rng(1)
+    frame = rng.integers(0, 255, (120, 160, 3), dtype=np.uint8)
+    boxes = [[10, 5, 40, 65], [-5, -5, 20, 30], [150, 100, 200, 160], [50, 50, 50, 80]]
+    colors, valid = box_colors(frame, boxes)
+
+    for (x1, y1, x2, y2), color, ok in zip(boxes, colors, valid):
+        crop = frame[max(0, y1):min(120, y2), max(0, x1):min(160, x2)]
+        upper = crop[:crop.shape[0] // 3]
+        assert ok == (upper.size > 0)
+        if ok:
+            assert np.allclose(color, upper.mean(axis=(0, 1)))
+
+
+def test_team_ids_stay_consistent_across_frames():
+    rng = np.random.default_rng(2)
+    model = TeamColorModel(min_samples=10)
+    kit_to_team = {}
+
+    for _ in range(20):
+        kits = [BLUE] * 5 + [RED] * 5
+        rng.shuffle(kits)
+        frame, boxes = make_frame(kits, rng)
+        detections = [{'bbox': b} for b in boxes]
+        colors, valid = box_colors(frame, boxes)
+        for det, kit in zip(assign_teams(detections, colors, valid, model), kits):
+            assert kit_to_team.setdefault(kit, det['team_id']) == det['team_id']
+
+    assert model.fitted
+    assert kit_to_team[BLUE] != kit_to_team[RED]
+
+
+def test_labels_are_canonical_darkest_kit_first():
+    first = TeamColorModel().fit(np.array([RED, BLUE, RED, BLUE], float))
+    second = TeamColorModel().fit(np.array([BLUE, RED, BLUE, RED], float))
+    assert np.allclose(first.centroids, second.centroids)
+
+
+def test_single_detection_uses_fitted_model():
+    model = TeamColorModel().fit(np.array([BLUE, RED] * 5, float))
+    detections = [{'bbox': [0, 0, 10, 30]}]
+    frame = np.zeros((40, 40, 3), np.uint8)
+    frame[:10, :10] = RED
+    colors, valid = box_colors(frame, [d['bbox'] for d in detections])
+    assert assign_teams(detections, colors, valid, model)[0]['team_id'] == model.predict([RED])[0]
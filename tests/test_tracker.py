@@ -0,0 +1,138 @@
+"""
+TAHLEEL.ai Player Tracking Tests
+
+Purpose:
+- Track ids must persist across frames, including through low-score detections
+- Optical flow must follow a moving player between keyframes
+- run_yolox_detection(keyframe_interval=K) must only run inference on every Kth frame
+- After a failed keyframe, boxes must not be moved with optical flow from an
+  older frame until the next keyframe succeeds
+
+Dependencies:
+- pytest
+- numpy, opencv-python, torch
+"""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+torch = pytest.importorskip("torch")
+
+from components.tracker import PlayerTracker, flow_image, propagate_boxes
+
+BOX = np.array([20, 30, 40, 60])
+STEP = np.array([3, 1, 3, 1])
+
+
+def moving_frames(count, size=(96, 128), seed=0):
+    """Static textured background with one bright textured block moving by STEP per frame"""
+    rng = np.random.default_rng(seed)
+    background = rng.integers(0, 60, (*size, 3), dtype=np.uint8)
+    block = rng.integers(200, 256, (BOX[3] - BOX[1], BOX[2] - BOX[0], 3), dtype=np.uint8)
+    frames = []
+    for i in range(count):
+        frame = background.copy()
+        x1, y1, x2, y2 = BOX + i * STEP
+        frame[y1:y2, x1:x2] = block
+        frames.append(frame)
+    return frames
+
+
+def test_track_ids_persist_and_low_scores_extend_tracks():
+    tracker = PlayerTracker(high_thresh=0.5)
+    boxes = np.array([[10, 10, 30, 60], [100, 10, 120, 60]])
+    first = tracker.update(boxes, [0.9, 0.8])
+    second = tracker.update(boxes + [2, 0, 2, 0], [0.85, 0.3])  # second player partly occluded
+    third = tracker.update(boxes[:1] + [4, 0, 4, 0], [0.9])
+
+    assert len(set(first.tolist())) == 2
+    assert second.tolist() == first.tolist()
+    assert third.tolist() == first[:1].tolist()
+
+    # A low-score box nothing claims gets no track
+    assert tracker.update(np.array([[300, 300, 320, 350]]), [0.3]).tolist() == [-1]
+
+
+def test_optical_flow_follows_moving_block():
+    frames = moving_frames(2)
+    moved, ok = propagate_boxes(flow_image(frames[0]), flow_image(frames[1]), [BOX])
+    assert ok.tolist() == [True]
+    np.testing.assert_allclose(moved[0], BOX + STEP, atol=1.0)
+
+
+def test_keyframe_interval_propagates_between_detections(monkeypatch):
+    import components.model_registry as model_registry
+    from components.frame_extractor import Frame
+    from components.yolox_detector import YOLOXDetector, run_yolox_detection
+
+    detector = YOLOXDetector.__new__(YOLOXDetector)
+    detector.detection_cache = None
+    detector.test_size = (128, 128)
+    detector.device = "cpu"
+    detector.batch_size = 2
+    inferred = []
+
+    def fake_infer(img_tensor):
+        outputs = []
+        for image in img_tensor:
+            ys, xs = torch.nonzero(image[0] > 190, as_tuple=True)
+            outputs.append((torch.tensor([[xs.min(), ys.min(), xs.max() + 1, ys.max() + 1]], dtype=torch.float32),
+                            torch.tensor([0.9])))
+        inferred.append(len(img_tensor))
+        return outputs
+
+    detector._infer_batch = fake_infer
+    monkeypatch.setattr(model_registry, "get_detector", lambda *args, **kwargs: detector)
+
+    frames = [Frame(i, image, None) for i, image in enumerate(moving_frames(7))]
+    records = run_yolox_detection(frames, batch_size=2, workers=2, keyframe_interval=3)
+
+    assert sum(inferred) == 3  # frames 0, 3 and 6
+    assert [r.get('propagated', False) for r in records] == [False, True, True, False, True, True, False]
+    assert len({r['player_detections'][0]['track_id'] for r in records}) == 1
+    for i, record in enumerate(records):
+        np.testing.assert_allclose(record['player_detections'][0]['bbox'], BOX + i * STEP, atol=2)
+
+
+def test_failed_keyframe_stops_flow_until_the_next_keyframe(monkeypatch):
+    import components.model_registry as model_registry
+    import components.yolox_detector as yolox_detector
+    from components.frame_extractor import Frame
+    from components.yolox_detector import YOLOXDetector, run_yolox_detection
+
+    detector = YOLOXDetector.__new__(YOLOXDetector)
+    detector.detection_cache = None
+    detector.test_size = (128, 128)
+    detector.device = "cpu"
+    detector.batch_size = 1
+    calls = []
+
+    def fake_infer(img_tensor):
+        calls.append(len(img_tensor))
+        if len(calls) == 2:  # keyframe 3
+            raise RuntimeError("forward failed")
+        ys, xs = torch.nonzero(img_tensor[0, 0] > 190, as_tuple=True)
+        return [(torch.tensor([[xs.min(), ys.min(), xs.max() + 1, ys.max() + 1]], dtype=torch.float32),
+                 torch.tensor([0.9]))]
+
+    flows = []
+    real_propagate = yolox_detector.propagate_boxes
+
+    def recording_propagate(prev, curr, boxes):
+        flows.append(len(boxes))
+        return real_propagate(prev, curr, boxes)
+
+    detector._infer_batch = fake_infer
+    monkeypatch.setattr(model_registry, "get_detector", lambda *args, **kwargs: detector)
+    monkeypatch.setattr(yolox_detector, "propagate_boxes", recording_propagate)
+
+    frames = [Frame(i, image, None) for i, image in enumerate(moving_frames(9))]
+    records = run_yolox_detection(frames, batch_size=1, workers=1, keyframe_interval=3)
+
+    assert records[3]['error'] == "forward failed"
+    # Frames 1, 2 follow keyframe 0 and frames 7, 8 keyframe 6; frames 4, 5 only coast
+    assert len(flows) == 4
+    assert [r.get('propagated', False) for r in records[4:6]] == [True, True]
+    for i in (7, 8):
+        np.testing.assert_allclose(records[i]['player_detections'][0]['bbox'], BOX + i * STEP, atol=2)
@@ -1,49 +1,106 @@
 import os
 import json
-from google.cloud import storage
+import asyncio
+
+from utils.storage import get_storage, UPLOAD_CHUNK_SIZE
+from utils.validators import MAX_VIDEO_SIZE
+from utils.metrics import span
 
 GCS_BUCKET = os.getenv("GCS_BUCKET_NAME", "tahleel-ai-videos")
 
-async def upload_video_to_gcs(video_file, video_id):
+async def upload_video_to_gcs(video_file, video_id, digest=None):
+    """
+    Stream an UploadFile to storage in UPLOAD_CHUNK_SIZE chunks (GCS resumable upload),
+    so memory per request stays bounded regardless of video size.
+    `digest` (e.g. hashlib.sha256()) is updated with every chunk as it streams.
+    Storage calls block on HTTP, so they run on worker threads, off the event loop.
+    """
+    writer = None
     try:
-        client = storage.Client()
-        bucket = client.bucket(GCS_BUCKET)
-        blob = bucket.blob(f"videos/{video_id}.mp4")
+        backend = await asyncio.to_thread(get_storage, GCS_BUCKET)
+        path = f"videos/{video_id}.mp4"
+        writer = await asyncio.to_thread(backend.open_writer, path, content_type="video/mp4")
+        
+        def write(chunk):
+            writer.write(chunk)
+            if digest is not None:
+                digest.update(chunk)
         
-        content = await video_file.read()
-        blob.upload_from_string(content, content_type="video/mp4")
+        while True:
+            chunk = await video_file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            if writer.bytes_written + len(chunk) > MAX_VIDEO_SIZE:
+                raise ValueError(f"Video exceeds {MAX_VIDEO_SIZE // 1024 // 1024}MB limit")
+            await asyncio.to_thread(write, chunk)
         
-        return f"gs://{GCS_BUCKET}/videos/{video_id}.mp4"
+        await asyncio.to_thread(writer.commit)
+        return backend.url(path)
     except Exception as e:
         print(f"❌ Upload failed: {e}")
+        if writer is not None:
+            await asyncio.to_thread(writer.abort)
         return None
 
 def upload_json_to_gcs(data, video_id):
     """Upload JSON results to GCS"""
-    import json
     try:
-        client = storage.Client()
-        bucket = client.bucket(GCS_BUCKET)
-        blob = bucket.blob(f"results/{video_id}.json")
-        blob.upload_from_string(
-            json.dumps(data, indent=2),
-            content_type="application/json"
-        )
-        return f"gs://{GCS_BUCKET}/results/{video_id}.json"
+        with span("json_upload"):
+            return get_storage(GCS_BUCKET).upload_bytes(
+                f"results/{video_id}.json",
+                json.dumps(data, indent=2),
+                content_type="application/json"
+            )
     except Exception as e:
         print(f"❌ JSON upload failed: {e}")
         return None
 
 def get_analysis_result_from_gcs(video_id):
     """Retrieve analysis JSON from GCS"""
-    import json
     try:
-        client = storage.Client()
-        bucket = client.bucket(GCS_BUCKET)
-        blob = bucket.blob(f"results/{video_id}.json")
-        if not blob.exists():
+        backend = get_storage(GCS_BUCKET)
+        path = f"results/{video_id}.json"
+        if not backend.exists(path):
             return None
-        return json.loads(blob.download_as_string())
+        return json.loads(backend.download_bytes(path))
     except Exception as e:
         print(f"❌ Retrieval failed: {e}")
         return None
+
+def upload_detections_to_gcs(table, video_id):
+    """Upload a DetectionTable as compressed columnar .npz"""
+    try:
+        with span("detections_upload"):
+            return get_storage(GCS_BUCKET).upload_bytes(
+                f"results/{video_id}-detections.npz",
+                table.to_bytes(),
+                content_type="application/octet-stream"
+            )
+    except Exception as e:
+        print(f"❌ Detections upload failed: {e}")
+        return None
+
+def get_detections_from_gcs(video_id):
+    """Retrieve a video's DetectionTable (falls back to the legacy detections JSON)"""
+    from components.detection_table import DetectionTable
+    try:
+        backend = get_storage(GCS_BUCKET)
+        path = f"results/{video_id}-detections.npz"
+        if backend.exists(path):
+            return DetectionTable.from_bytes(backend.download_bytes(path))
+        legacy = get_analysis_result_from_gcs(f"{video_id}-detections")
+        if legacy is None:
+            return None
+        return DetectionTable.from_records(legacy["detections"], metadata=legacy.get("metadata"))
+    except Exception as e:
+        print(f"❌ Detections retrieval failed: {e}")
+        return None
+
+def delete_video_from_gcs(video_id):
+    """Remove an uploaded video (e.g. a duplicate upload answered from the result cache)"""
+    try:
+        get_storage(GCS_BUCKET).delete(f"videos/{video_id}.mp4")
+        return True
+    except Exception as e:
+        print(f"❌ Delete failed: {e}")
+        return False
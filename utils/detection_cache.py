@@ -0,0 +1,201 @@
+"""
+Detection Cache - TAHLEEL.ai
+
+Purpose:
+- Memoize per-frame YOLOX detections so overlapping or repeated videos (a match
+  re-cut into halves, highlights from a full match, re-analysis) reuse boxes
+  instead of rerunning inference
+- Key = frame hash + model config (model name, precision, backend, weights file
+  size and mtime, conf/NMS thresholds, input size); changing any of them never
+  returns stale boxes
+- SQLite store on local disk (shared by local processes), evicting least
+  recently used entries past DETECTION_CACHE_MAX_ENTRIES
+
+Frame hashes:
+- exact: BLAKE2b of the decoded pixels; only bit-identical frames match
+- perceptual: 256-bit difference hash of a 17x16 grayscale thumbnail; also matches
+  the same frame after re-encoding, at the cost of rare false matches on near-static shots
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+
+import cv2
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DETECTION_CACHE_ENABLED = os.getenv("DETECTION_CACHE_ENABLED", "true").lower() == "true"
+DETECTION_CACHE_PATH = os.getenv("DETECTION_CACHE_PATH", "/tmp/tahleel_detections.sqlite3")
+DETECTION_CACHE_MAX_ENTRIES = int(os.getenv("DETECTION_CACHE_MAX_ENTRIES", "500000"))
+DETECTION_CACHE_HASH = os.getenv("DETECTION_CACHE_HASH", "exact")
+HASH_MODES = ("exact", "perceptual")
+
+# Eviction runs every this many inserts rather than on each one
+_EVICT_EVERY = 1000
+
+
+def frame_hash(frame, mode=DETECTION_CACHE_HASH):
+    """Hex digest identifying a decoded BGR frame"""
+    if mode == "exact":
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(str(frame.shape).encode("ascii"))
+        digest.update(np.ascontiguousarray(frame).data)
+        return digest.hexdigest()
+    if mode == "perceptual":
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        thumb = cv2.resize(gray, (17, 16), interpolation=cv2.INTER_AREA)
+        bits = np.packbits(thumb[:, 1:] > thumb[:, :-1])
+        # Boxes are in frame coordinates, so the resolution is part of the key
+        return f"p{frame.shape[1]}x{frame.shape[0]}:{bits.tobytes().hex()}"
+    raise ValueError(f"Unknown frame hash mode '{mode}'. Allowed: {HASH_MODES}")
+
+
+def config_key(config):
+    """Short stable digest of a detector configuration dict"""
+    canonical = json.dumps(config, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+class DetectionCache:
+    """frame hash + config key -> detection list, in one SQLite file"""
+
+    def __init__(self, path=DETECTION_CACHE_PATH, max_entries=DETECTION_CACHE_MAX_ENTRIES, hash_mode=DETECTION_CACHE_HASH):
+        if hash_mode not in HASH_MODES:
+            raise ValueError(f"Unknown frame hash mode '{hash_mode}'. Allowed: {HASH_MODES}")
+        self.path = path
+        self.max_entries = max_entries
+        self.hash_mode = hash_mode
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._inserts = 0
+        self.hits = 0
+        self.misses = 0
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS detections (
+                frame_hash TEXT, config TEXT, detections TEXT, accessed_at REAL,
+                PRIMARY KEY (frame_hash, config)
+            )""")
+        conn.execute("CREATE INDEX IF NOT EXISTS detections_lru ON detections (accessed_at)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def hash(self, frame):
+        return frame_hash(frame, self.hash_mode)
+
+    def get_many(self, hashes, config):
+        """{frame_hash: detections} for the hashes that are cached under `config`"""
+        unique = list(dict.fromkeys(hashes))
+        if not unique:
+            return {}
+        conn = self._connect()
+        found = {}
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(unique), 500):
+            chunk = unique[start:start + 500]
+            marks = ", ".join("?" for _ in chunk)
+            rows = conn.execute(
+                f"SELECT frame_hash, detections FROM detections WHERE config = ? AND frame_hash IN ({marks})",
+                [config] + chunk).fetchall()
+            found.update((h, json.loads(data)) for h, data in rows)
+        if found:
+            marks = ", ".join("?" for _ in found)
+            conn.execute(f"UPDATE detections SET accessed_at = ? WHERE config = ? AND frame_hash IN ({marks})",
+                         [time.time(), config] + list(found))
+        with self._lock:
+            self.hits += sum(1 for h in hashes if h in found)
+            self.misses += sum(1 for h in hashes if h not in found)
+        return found
+
+    def get(self, frame_hash, config):
+        return self.get_many([frame_hash], config).get(frame_hash)
+
+    def put_many(self, entries, config):
+        """entries: [(frame_hash, detections)]"""
+        if not entries:
+            return
+        now = time.time()
+        self._connect().executemany(
+            "INSERT OR REPLACE INTO detections (frame_hash, config, detections, accessed_at) VALUES (?, ?, ?, ?)",
+            [(h, config, json.dumps(dets), now) for h, dets in entries])
+        with self._lock:
+            self._inserts += len(entries)
+            evict = self._inserts >= _EVICT_EVERY
+            if evict:
+                self._inserts = 0
+        if evict:
+            self.evict()
+
+    def put(self, frame_hash, detections, config):
+        self.put_many([(frame_hash, detections)], config)
+
+    def evict(self):
+        """Drop least recently used rows beyond max_entries; returns rows removed"""
+        conn = self._connect()
+        count = conn.execute("SELECT COUNT(*) FROM detections").fetchone()[0]
+        excess = count - self.max_entries
+        if excess <= 0:
+            return 0
+        conn.execute(
+            "DELETE FROM detections WHERE rowid IN (SELECT rowid FROM detections ORDER BY accessed_at LIMIT ?)",
+            (excess,))
+        logger.info(f"🧹 Detection cache evicted {excess} entries")
+        return excess
+
+    def stats(self):
+        entries = self._connect().execute("SELECT COUNT(*) FROM detections").fetchone()[0]
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "hash": self.hash_mode,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_detection_cache():
+    """Process-wide detection cache, or None when DETECTION_CACHE_ENABLED is false or the store can't open"""
+    global _cache
+    if not DETECTION_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = DetectionCache()
+            except Exception as e:
+                logger.error(f"❌ Detection cache unavailable: {e}")
+                return None
+        return _cache
+
+
+def _reset_after_fork():
+    """SQLite connections must not be used across a fork; forked workers reconnect"""
+    global _cache_lock
+    _cache_lock = threading.Lock()
+    if _cache is not None:
+        _cache._local = threading.local()
+        _cache._lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
@@ -0,0 +1,235 @@
+"""
+Job Store - TAHLEEL.ai
+
+Purpose:
+- Queue + status store for background analysis jobs
+- Pluggable backend: in-process memory (default) or SQLite (shared by local processes)
+
+A job is a dict:
+    id, type, status (queued|running|complete|failed), stage, frames_done, frames_total,
+    payload, result, error, created_at, started_at, updated_at, finished_at
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from collections import deque
+
+JOB_BACKEND = os.getenv("JOB_BACKEND", "memory")
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", "/tmp/tahleel_jobs.sqlite3")
+
+JOB_FIELDS = ("id", "type", "status", "stage", "frames_done", "frames_total", "payload", "result",
+              "error", "created_at", "started_at", "updated_at", "finished_at")
+
+
+def _new_job(job_type, payload, job_id=None):
+    now = time.time()
+    return {
+        "id": job_id or str(uuid.uuid4()),
+        "type": job_type,
+        "status": "queued",
+        "stage": "queued",
+        "frames_done": 0,
+        "frames_total": None,
+        "payload": payload,
+        "result": None,
+        "error": None,
+        "created_at": now,
+        "started_at": None,
+        "updated_at": now,
+        "finished_at": None,
+    }
+
+
+def job_status(job):
+    """Public view of a job: progress, elapsed time and ETA from the frame rate so far"""
+    now = time.time()
+    done, total = job["frames_done"] or 0, job["frames_total"]
+    status = {
+        "job_id": job["id"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "progress": {
+            "frames_done": done,
+            "frames_total": total,
+            "percent": round(100.0 * done / total, 1) if total else None,
+        },
+        "eta_seconds": None,
+        "elapsed_seconds": round((job["finished_at"] or now) - job["started_at"], 1) if job["started_at"] else None,
+        "error": job["error"],
+    }
+    if job["status"] == "running" and total and done:
+        rate = done / max(now - job["started_at"], 1e-6)
+        status["eta_seconds"] = round((total - done) / rate, 1)
+    if job["status"] == "complete":
+        status["result"] = job["result"]
+    return status
+
+
+class JobStore:
+    """Backend interface"""
+
+    def create(self, job_type, payload, job_id=None):
+        raise NotImplementedError
+
+    def get(self, job_id):
+        raise NotImplementedError
+
+    def update(self, job_id, **fields):
+        raise NotImplementedError
+
+    def claim(self, timeout=None, types=None):
+        """
+        Take the oldest queued job (of one of `types`, if given) and mark it running;
+        None if nothing arrives in `timeout`
+        """
+        raise NotImplementedError
+
+
+class InMemoryJobStore(JobStore):
+    def __init__(self):
+        self._jobs = {}
+        self._queue = deque()
+        self._cond = threading.Condition()
+
+    def create(self, job_type, payload, job_id=None):
+        job = _new_job(job_type, payload, job_id)
+        with self._cond:
+            self._jobs[job["id"]] = job
+            self._queue.append(job["id"])
+            self._cond.notify()
+        return dict(job)
+
+    def get(self, job_id):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def update(self, job_id, **fields):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job.update(fields, updated_at=time.time())
+            return dict(job)
+
+    def claim(self, timeout=None, types=None):
+        with self._cond:
+            job_id = self._next(types)
+            if job_id is None:
+                self._cond.wait(timeout)
+                job_id = self._next(types)
+            if job_id is None:
+                return None
+            self._queue.remove(job_id)
+            job = self._jobs[job_id]
+            now = time.time()
+            job.update(status="running", stage="starting", started_at=now, updated_at=now)
+            return dict(job)
+
+
+    def _next(self, types):
+        return next((job_id for job_id in self._queue if types is None or self._jobs[job_id]["type"] in types), None)
+
+
+class SQLiteJobStore(JobStore):
+    """Jobs in one SQLite file; several local processes can share the queue"""
+
+    _JSON_FIELDS = ("payload", "result")
+
+    def __init__(self, path=JOB_DB_PATH, poll_interval=0.5):
+        self.path = path
+        self.poll_interval = poll_interval
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY, type TEXT, status TEXT, stage TEXT,
+                    frames_done INTEGER, frames_total INTEGER, payload TEXT, result TEXT,
+                    error TEXT, created_at REAL, started_at REAL, updated_at REAL, finished_at REAL
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, created_at)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _row_to_job(self, row):
+        if row is None:
+            return None
+        job = dict(zip(JOB_FIELDS, row))
+        for field in self._JSON_FIELDS:
+            if job[field] is not None:
+                job[field] = json.loads(job[field])
+        return job
+
+    def create(self, job_type, payload, job_id=None):
+        job = _new_job(job_type, payload, job_id)
+        values = [json.dumps(job[f]) if f in self._JSON_FIELDS and job[f] is not None else job[f] for f in JOB_FIELDS]
+        self._connect().execute(
+            f"INSERT INTO jobs ({', '.join(JOB_FIELDS)}) VALUES ({', '.join('?' for _ in JOB_FIELDS)})", values)
+        return job
+
+    def get(self, job_id):
+        row = self._connect().execute(f"SELECT {', '.join(JOB_FIELDS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row)
+
+    def update(self, job_id, **fields):
+        fields["updated_at"] = time.time()
+        names = [f for f in fields if f in JOB_FIELDS and f != "id"]
+        values = [json.dumps(fields[f]) if f in self._JSON_FIELDS and fields[f] is not None else fields[f] for f in names]
+        self._connect().execute(
+            f"UPDATE jobs SET {', '.join(f'{f} = ?' for f in names)} WHERE id = ?", values + [job_id])
+        return self.get(job_id)
+
+    def claim(self, timeout=None, types=None):
+        deadline = None if timeout is None else time.time() + timeout
+        conn = self._connect()
+        where, params = "status = 'queued'", []
+        if types is not None:
+            where += f" AND type IN ({', '.join('?' for _ in types)})"
+            params = list(types)
+        while True:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    f"SELECT id FROM jobs WHERE {where} ORDER BY created_at LIMIT 1", params).fetchone()
+                if row:
+                    now = time.time()
+                    conn.execute(
+                        "UPDATE jobs SET status = 'running', stage = 'starting', started_at = ?, updated_at = ? WHERE id = ?",
+                        (now, now, row[0]))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            if row:
+                return self.get(row[0])
+            if deadline is not None and time.time() >= deadline:
+                return None
+            time.sleep(self.poll_interval)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_job_store():
+    """Process-wide job store selected by JOB_BACKEND (memory | sqlite)"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            if JOB_BACKEND == "sqlite":
+                _store = SQLiteJobStore(JOB_DB_PATH)
+            elif JOB_BACKEND == "memory":
+                _store = InMemoryJobStore()
+            else:
+                raise ValueError(f"Unknown JOB_BACKEND '{JOB_BACKEND}'. Allowed: memory, sqlite")
+        return _store
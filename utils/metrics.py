@@ -0,0 +1,211 @@
+"""
+Pipeline Metrics - TAHLEEL.ai
+
+Purpose:
+- Time every pipeline stage (download, decode, JPEG encode/upload, preprocess,
+  forward pass, NMS, team assignment, result upload, Claude) with span(name)
+- Process-wide Prometheus histograms per stage, served as text by /metrics on
+  both apps (render_prometheus), together with job and storage counters
+- Per-job breakdowns: spans recorded while a job_trace() is active (on any thread
+  that inherited it through propagate()) add up into that job's timings
+
+Overhead is two perf_counter() calls and one lock per span; spans wrap whole
+batches or frames, never per-box work.
+"""
+
+import time
+import bisect
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds, seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+_trace = contextvars.ContextVar("tahleel_trace", default=None)
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label value (one label)"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, label, seconds):
+        with self._lock:
+            series = self._series.get(label)
+            if series is None:
+                series = self._series[label] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect.bisect_left(self.buckets, seconds)] += 1
+            series[1] += seconds
+
+    def snapshot(self):
+        """{label: (cumulative bucket counts incl. +Inf, sum, count)}"""
+        with self._lock:
+            out = {}
+            for label, (counts, total) in self._series.items():
+                cumulative, running = [], 0
+                for count in counts:
+                    running += count
+                    cumulative.append(running)
+                out[label] = (cumulative, total, running)
+            return out
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+class JobTrace:
+    """Stage totals for one job or request; nested traces also count toward their parent"""
+
+    def __init__(self, name, parent=None):
+        self.name = name
+        self.parent = parent
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._stages = {}
+
+    def record(self, stage, seconds):
+        with self._lock:
+            entry = self._stages.get(stage)
+            if entry is None:
+                entry = self._stages[stage] = [0, 0.0, 0.0]
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+        if self.parent is not None:
+            self.parent.record(stage, seconds)
+
+    def merge(self, stages):
+        """Add the "stages" of another trace's summary() (e.g. from a shard process)"""
+        with self._lock:
+            for stage, s in stages.items():
+                entry = self._stages.setdefault(stage, [0, 0.0, 0.0])
+                entry[0] += s["count"]
+                entry[1] += s["seconds"]
+                entry[2] = max(entry[2], s["max_ms"] / 1000)
+        if self.parent is not None:
+            self.parent.merge(stages)
+
+    def summary(self):
+        """
+        {"wall_seconds", "stages": {stage: {count, seconds, avg_ms, max_ms}}}.
+        Stages run concurrently on pipeline threads, so their seconds can add up to
+        more than the wall time.
+        """
+        with self._lock:
+            stages = {
+                stage: {"count": count, "seconds": round(total, 4), "avg_ms": round(1000 * total / count, 2),
+                        "max_ms": round(1000 * longest, 2)}
+                for stage, (count, total, longest) in sorted(self._stages.items(), key=lambda kv: -kv[1][1])
+            }
+        return {"wall_seconds": round(time.perf_counter() - self.started, 3), "stages": stages}
+
+
+stage_seconds = Histogram()
+job_seconds = Histogram()
+_jobs_lock = threading.Lock()
+_jobs = {}
+
+
+def observe(stage, seconds):
+    """Record a measured duration for `stage` (process-wide and in the active job trace)"""
+    stage_seconds.observe(stage, seconds)
+    trace = _trace.get()
+    if trace is not None:
+        trace.record(stage, seconds)
+
+
+class span:
+    """`with span("forward"):` times the block as one observation of that stage"""
+
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+@contextmanager
+def job_trace(name):
+    """Collect the spans of one job / request; yields the JobTrace"""
+    trace = JobTrace(name, parent=_trace.get())
+    token = _trace.set(trace)
+    status = "failed"
+    try:
+        yield trace
+        status = "complete"
+    finally:
+        _trace.reset(token)
+        job_seconds.observe(name, time.perf_counter() - trace.started)
+        with _jobs_lock:
+            _jobs[(name, status)] = _jobs.get((name, status), 0) + 1
+
+
+def current_trace():
+    return _trace.get()
+
+
+def propagate(fn):
+    """`fn` wrapped to record into the caller's job trace, for running on another thread"""
+    trace = _trace.get()
+    if trace is None:
+        return fn
+
+    def run(*args, **kwargs):
+        token = _trace.set(trace)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _trace.reset(token)
+    return run
+
+
+def _histogram_lines(name, help_text, label, histogram):
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for value, (cumulative, total, count) in sorted(histogram.snapshot().items()):
+        for bound, running in zip(histogram.buckets, cumulative):
+            lines.append(f'{name}_bucket{{{label}="{value}",le="{bound:g}"}} {running}')
+        lines.append(f'{name}_bucket{{{label}="{value}",le="+Inf"}} {count}')
+        lines.append(f'{name}_sum{{{label}="{value}"}} {total:.6f}')
+        lines.append(f'{name}_count{{{label}="{value}"}} {count}')
+    return lines
+
+
+def render_prometheus():
+    """Prometheus text exposition of this process's stage, job and storage metrics"""
+    from utils.storage import metrics as storage_metrics
+
+    lines = _histogram_lines("tahleel_stage_seconds", "Time spent per pipeline stage", "stage", stage_seconds)
+    lines += _histogram_lines("tahleel_job_seconds", "Wall time per job or request", "type", job_seconds)
+
+    lines += ["# HELP tahleel_jobs_total Finished jobs and requests by status", "# TYPE tahleel_jobs_total counter"]
+    with _jobs_lock:
+        for (name, status), count in sorted(_jobs.items()):
+            lines.append(f'tahleel_jobs_total{{type="{name}",status="{status}"}} {count}')
+
+    storage = storage_metrics.snapshot()
+    for field, metric, help_text in (("requests", "requests_total", "Storage requests"),
+                                     ("errors", "errors_total", "Failed storage requests"),
+                                     ("seconds", "seconds_total", "Time spent in storage requests"),
+                                     ("bytes", "bytes_total", "Bytes moved by storage requests")):
+        lines += [f"# HELP tahleel_storage_{metric} {help_text}", f"# TYPE tahleel_storage_{metric} counter"]
+        lines += [f'tahleel_storage_{metric}{{op="{op}"}} {entry[field]}' for op, entry in sorted(storage.items())]
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    stage_seconds.reset()
+    job_seconds.reset()
+    with _jobs_lock:
+        _jobs.clear()
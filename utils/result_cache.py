@@ -0,0 +1,155 @@
+"""
+Result Cache - TAHLEEL.ai
+
+Purpose:
+- Content-addressed cache of complete analysis results, so a re-uploaded match
+  skips extraction, detection and tactical analysis entirely
+- Key = SHA-256 of the video bytes (computed while the upload streams) combined
+  with the pipeline parameters that affect the result (fps, resize, model, thresholds)
+- Two layers: a size-bounded local LRU on disk in front of the shared storage layer
+"""
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+from utils.storage import get_storage
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", "/tmp/tahleel_result_cache")
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+RESULT_CACHE_PREFIX = "cache/results"
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+
+
+def cache_key(content_sha256, params):
+    """Stable key for (video content, pipeline parameters)"""
+    canonical = json.dumps(params, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{content_sha256}:{canonical}".encode("utf-8")).hexdigest()
+
+
+class LocalLRUCache:
+    """JSON blobs on local disk, evicting least recently used entries past max_bytes"""
+
+    def __init__(self, directory=RESULT_CACHE_DIR, max_bytes=RESULT_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> size, oldest first
+        self._bytes = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _load_index(self):
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                path = os.path.join(self.directory, name)
+                files.append((os.path.getmtime(path), name[:-5], os.path.getsize(path)))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._bytes += size
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            try:
+                with open(self._path(key), "rb") as f:
+                    data = f.read()
+                os.utime(self._path(key))
+                return data
+            except OSError:
+                self._bytes -= self._entries.pop(key)
+                return None
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)
+            tmp_path = f"{self._path(key)}.part"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+            self._entries[key] = len(data)
+            self._bytes += len(data)
+            self._evict()
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._bytes -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+
+class ResultCache:
+    """Local LRU layer in front of `cache/results/{key}.json` in the storage backend"""
+
+    def __init__(self, local=None, bucket_name=None):
+        self.local = local or LocalLRUCache()
+        self.bucket_name = bucket_name
+        self.hits = {"local": 0, "storage": 0}
+        self.misses = 0
+
+    def _path(self, key):
+        return f"{RESULT_CACHE_PREFIX}/{key}.json"
+
+    def get(self, key):
+        data = self.local.get(key)
+        if data is not None:
+            self.hits["local"] += 1
+            return json.loads(data)
+
+        try:
+            backend = get_storage(self.bucket_name)
+            if backend.exists(self._path(key)):
+                data = backend.download_bytes(self._path(key))
+                self.local.put(key, data)
+                self.hits["storage"] += 1
+                return json.loads(data)
+        except Exception as e:
+            logger.error(f"❌ Result cache lookup failed: {e}")
+
+        self.misses += 1
+        return None
+
+    def put(self, key, result):
+        data = json.dumps(result).encode("utf-8")
+        self.local.put(key, data)
+        try:
+            get_storage(self.bucket_name).upload_bytes(self._path(key), data, content_type="application/json")
+        except Exception as e:
+            logger.error(f"❌ Result cache store failed: {e}")
+
+    def stats(self):
+        return {"hits": dict(self.hits), "misses": self.misses, "local": self.local.stats()}
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+        return _cache
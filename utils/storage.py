@@ -0,0 +1,319 @@
+"""
+Storage Backends - TAHLEEL.ai
+
+Purpose:
+- One object-storage interface with a Google Cloud Storage backend (production)
+  and a local filesystem backend (tests / offline runs, no GCS needed)
+- One shared GCS client per process (pooled HTTP connections, auth done once)
+  and a thread-safe bucket handle cache, instead of storage.Client() per call
+- Streaming writers so large uploads go through in fixed-size chunks
+- Request count / error / latency / byte metrics per operation
+
+Objects are addressed as `<scheme>://<bucket>/<path>`: gs:// for GCS, local:// for
+the filesystem backend (stored under LOCAL_STORAGE_ROOT/<bucket>/<path>).
+"""
+
+import os
+import time
+import uuid
+import shutil
+import threading
+from contextlib import contextmanager
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "gcs")
+LOCAL_STORAGE_ROOT = os.getenv("LOCAL_STORAGE_ROOT", "/tmp/tahleel_storage")
+GCS_BUCKET = os.getenv("GCS_BUCKET_NAME", "tahleel-ai-videos")
+
+# GCS resumable uploads need chunk sizes that are multiples of 256 KB
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(8 * 1024 * 1024)))
+# HTTP connections kept open to GCS (shared by all threads)
+STORAGE_POOL_SIZE = int(os.getenv("STORAGE_POOL_SIZE", "32"))
+
+
+class StorageMetrics:
+    """Thread-safe per-operation counters: requests, errors, seconds, bytes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ops = {}
+
+    @contextmanager
+    def track(self, op):
+        """Time one storage request. The body may set `stat["bytes"]`."""
+        stat = {"bytes": 0}
+        start = time.perf_counter()
+        error = False
+        try:
+            yield stat
+        except Exception:
+            error = True
+            raise
+        finally:
+            self.record(op, time.perf_counter() - start, stat["bytes"], error)
+
+    def record(self, op, seconds, nbytes=0, error=False):
+        with self._lock:
+            entry = self._ops.setdefault(op, {"requests": 0, "errors": 0, "seconds": 0.0, "max_seconds": 0.0, "bytes": 0})
+            entry["requests"] += 1
+            entry["errors"] += int(error)
+            entry["seconds"] += seconds
+            entry["max_seconds"] = max(entry["max_seconds"], seconds)
+            entry["bytes"] += nbytes
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                op: dict(entry, avg_ms=round(1000 * entry["seconds"] / entry["requests"], 2) if entry["requests"] else 0.0)
+                for op, entry in self._ops.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._ops.clear()
+
+
+metrics = StorageMetrics()
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Process-wide google.cloud.storage.Client with a connection pool sized for concurrent transfers"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from google.cloud import storage
+                client = storage.Client()
+                try:
+                    from requests.adapters import HTTPAdapter
+                    adapter = HTTPAdapter(pool_connections=STORAGE_POOL_SIZE, pool_maxsize=STORAGE_POOL_SIZE)
+                    client._http.mount("https://", adapter)
+                except Exception:
+                    pass  # keep the library's default pool
+                _client = client
+    return _client
+
+
+class GCSStorage:
+    scheme = "gs"
+
+    def __init__(self, bucket_name=GCS_BUCKET):
+        self.bucket_name = bucket_name
+        self.bucket = get_client().bucket(bucket_name)
+
+    def url(self, path):
+        return f"gs://{self.bucket_name}/{path}"
+
+    def open_writer(self, path, content_type=None, chunk_size=UPLOAD_CHUNK_SIZE):
+        """Resumable upload: at most `chunk_size` bytes are buffered in memory"""
+        blob = self.bucket.blob(path)
+        return _GCSWriter(blob.open("wb", chunk_size=chunk_size, content_type=content_type, ignore_flush=True))
+
+    def upload_bytes(self, path, data, content_type=None):
+        with metrics.track("upload") as stat:
+            self.bucket.blob(path).upload_from_string(data, content_type=content_type)
+            stat["bytes"] = len(data)
+        return self.url(path)
+
+    def upload_file(self, local_path, path, content_type=None):
+        with metrics.track("upload") as stat:
+            self.bucket.blob(path).upload_from_filename(local_path, content_type=content_type)
+            stat["bytes"] = os.path.getsize(local_path)
+        return self.url(path)
+
+    def download_bytes(self, path):
+        with metrics.track("download") as stat:
+            data = self.bucket.blob(path).download_as_bytes()
+            stat["bytes"] = len(data)
+        return data
+
+    def download_to_file(self, path, local_path):
+        with metrics.track("download") as stat:
+            self.bucket.blob(path).download_to_filename(local_path)
+            stat["bytes"] = os.path.getsize(local_path)
+        return local_path
+
+    def exists(self, path):
+        with metrics.track("exists"):
+            return self.bucket.blob(path).exists()
+
+    def list(self, prefix=""):
+        with metrics.track("list"):
+            return [b.name for b in self.bucket.list_blobs(prefix=prefix)]
+
+    def delete(self, path):
+        with metrics.track("delete"):
+            self.bucket.blob(path).delete()
+
+    def signed_url(self, path, expires=3600):
+        return self.bucket.blob(path).generate_signed_url(expiration=expires)
+
+
+class LocalStorage:
+    scheme = "local"
+
+    def __init__(self, bucket_name=GCS_BUCKET, root=LOCAL_STORAGE_ROOT):
+        self.bucket_name = bucket_name
+        self.root = os.path.abspath(os.path.join(root, bucket_name))
+
+    def url(self, path):
+        return f"local://{self.bucket_name}/{path}"
+
+    def local_path(self, path):
+        full = os.path.abspath(os.path.join(self.root, path))
+        if os.path.commonpath([full, self.root]) != self.root:
+            raise ValueError(f"Path escapes storage root: {path}")
+        return full
+
+    def open_writer(self, path, content_type=None, chunk_size=UPLOAD_CHUNK_SIZE):
+        return _LocalWriter(self.local_path(path))
+
+    def upload_bytes(self, path, data, content_type=None):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        with metrics.track("upload") as stat:
+            writer = self.open_writer(path)
+            writer.write(data)
+            writer.commit()
+            stat["bytes"] = len(data)
+        return self.url(path)
+
+    def upload_file(self, local_path, path, content_type=None):
+        with metrics.track("upload") as stat:
+            target = self.local_path(path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(local_path, target)
+            stat["bytes"] = os.path.getsize(target)
+        return self.url(path)
+
+    def download_bytes(self, path):
+        with metrics.track("download") as stat:
+            with open(self.local_path(path), "rb") as f:
+                data = f.read()
+            stat["bytes"] = len(data)
+        return data
+
+    def download_to_file(self, path, local_path):
+        with metrics.track("download") as stat:
+            shutil.copyfile(self.local_path(path), local_path)
+            stat["bytes"] = os.path.getsize(local_path)
+        return local_path
+
+    def exists(self, path):
+        with metrics.track("exists"):
+            return os.path.isfile(self.local_path(path))
+
+    def list(self, prefix=""):
+        with metrics.track("list"):
+            names = []
+            for dirpath, _, filenames in os.walk(self.root):
+                for filename in filenames:
+                    name = os.path.relpath(os.path.join(dirpath, filename), self.root).replace(os.sep, "/")
+                    if name.startswith(prefix) and not name.endswith(".part"):
+                        names.append(name)
+            return sorted(names)
+
+    def delete(self, path):
+        with metrics.track("delete"):
+            os.remove(self.local_path(path))
+
+    def signed_url(self, path, expires=3600):
+        return f"file://{self.local_path(path)}"
+
+
+class _GCSWriter:
+    """Chunks are sent as they fill; the object only exists once commit() finalizes the session"""
+
+    def __init__(self, blob_writer):
+        self._writer = blob_writer
+        self._start = time.perf_counter()
+        self.bytes_written = 0
+
+    def write(self, data):
+        self._writer.write(data)
+        self.bytes_written += len(data)
+
+    def commit(self):
+        self._writer.close()
+        metrics.record("upload", time.perf_counter() - self._start, self.bytes_written)
+
+    def abort(self):
+        # Never finalizing the resumable session means no object is created
+        self._writer = None
+        metrics.record("upload", time.perf_counter() - self._start, self.bytes_written, error=True)
+
+
+class _LocalWriter:
+    """Writes to a temp file and renames it into place on commit()"""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self._tmp_path = f"{path}.{uuid.uuid4().hex}.part"
+        self._file = open(self._tmp_path, "wb")
+        self.bytes_written = 0
+
+    def write(self, data):
+        self._file.write(data)
+        self.bytes_written += len(data)
+
+    def commit(self):
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_storage(bucket_name=None):
+    """Cached storage backend for `bucket_name` selected by STORAGE_BACKEND (gcs | local)"""
+    bucket_name = bucket_name or GCS_BUCKET
+    key = (STORAGE_BACKEND, bucket_name)
+    backend = _backends.get(key)
+    if backend is None:
+        with _backends_lock:
+            backend = _backends.get(key)
+            if backend is None:
+                if STORAGE_BACKEND == "gcs":
+                    backend = GCSStorage(bucket_name)
+                elif STORAGE_BACKEND == "local":
+                    backend = LocalStorage(bucket_name, LOCAL_STORAGE_ROOT)
+                else:
+                    raise ValueError(f"Unknown STORAGE_BACKEND '{STORAGE_BACKEND}'. Allowed: gcs, local")
+                _backends[key] = backend
+    return backend
+
+
+def _reset_after_fork():
+    """Forked workers (gunicorn.conf.py) open their own connections instead of sharing pooled sockets"""
+    global _client, _client_lock, _backends, _backends_lock
+    _client = None
+    _client_lock = threading.Lock()
+    _backends = {}
+    _backends_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def parse_url(url):
+    """'gs://bucket/path' or 'local://bucket/path' -> (bucket, path)"""
+    for scheme in ("gs://", "local://"):
+        if url.startswith(scheme):
+            bucket, _, path = url[len(scheme):].partition("/")
+            return bucket, path
+    raise ValueError(f"Not a storage URL: {url}")
+
+
+def storage_for_url(url):
+    """(backend, path) for a storage URL"""
+    bucket, path = parse_url(url)
+    return get_storage(bucket), path
@@ -0,0 +1,210 @@
+"""
+Bulk Transfer Manager - TAHLEEL.ai
+
+Purpose:
+- Upload / download many objects concurrently through the shared storage layer
+- Retries with exponential backoff per object, results returned in input order
+- Throughput stats per batch (objects/sec, MB/sec, retries, failures)
+
+Frames given as NumPy arrays are JPEG-encoded on the transfer threads.
+"""
+
+import os
+import time
+import random
+import logging
+import threading
+from collections import namedtuple, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.storage import get_storage, storage_for_url
+from utils.metrics import span, propagate
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TRANSFER_CONCURRENCY = int(os.getenv("TRANSFER_CONCURRENCY", "16"))
+TRANSFER_RETRIES = int(os.getenv("TRANSFER_RETRIES", "3"))
+TRANSFER_BACKOFF = float(os.getenv("TRANSFER_BACKOFF", "0.5"))
+JPEG_QUALITY = 85
+
+# url: storage URL; data: downloaded bytes/array (downloads only); nbytes: bytes moved
+TransferResult = namedtuple("TransferResult", ["path", "url", "ok", "data", "nbytes", "attempts", "error"])
+
+
+def _non_retryable():
+    errors = [ValueError, FileNotFoundError]
+    try:
+        from google.api_core.exceptions import NotFound, Forbidden, Unauthorized
+        errors += [NotFound, Forbidden, Unauthorized]
+    except ImportError:
+        pass
+    return tuple(errors)
+
+
+def encode_jpeg(frame, quality=JPEG_QUALITY):
+    import cv2
+    success, jpg_data = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not success:
+        raise ValueError("Frame encoding failed")
+    return jpg_data.tobytes()
+
+
+def decode_jpeg(data):
+    import cv2
+    import numpy as np
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+
+class TransferManager:
+    def __init__(self, concurrency=TRANSFER_CONCURRENCY, retries=TRANSFER_RETRIES, backoff=TRANSFER_BACKOFF, bucket_name=None):
+        self.concurrency = max(1, concurrency)
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self.bucket_name = bucket_name
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="transfer")
+        self._non_retryable = _non_retryable()
+        self._lock = threading.Lock()
+        self.totals = {"objects": 0, "failed": 0, "retries": 0, "bytes": 0, "seconds": 0.0}
+
+    def _attempt(self, fn):
+        """Run fn with retries; returns (value, attempts, error)"""
+        attempts = 0
+        while True:
+            attempts += 1
+            try:
+                return fn(), attempts, None
+            except self._non_retryable as e:
+                return None, attempts, e
+            except Exception as e:
+                if attempts > self.retries:
+                    return None, attempts, e
+                # Exponential backoff with jitter so retries don't stampede
+                time.sleep(self.backoff * (2 ** (attempts - 1)) * (0.5 + random.random()))
+
+    def _upload_one(self, item, content_type):
+        data, path = item
+        backend = get_storage(self.bucket_name)
+        if not isinstance(data, (bytes, bytearray, str)):
+            try:
+                with span("jpeg_encode"):
+                    data = encode_jpeg(data)
+            except Exception as e:
+                return TransferResult(path, None, False, None, 0, 0, e)
+        with span("frame_upload"):
+            url, attempts, error = self._attempt(lambda: backend.upload_bytes(path, data, content_type=content_type))
+        return TransferResult(path, url, error is None, None, len(data) if error is None else 0, attempts, error)
+
+    def _download_one(self, source, decode):
+        if "://" in source:
+            backend, path = storage_for_url(source)
+            url = source
+        else:
+            backend, path = get_storage(self.bucket_name), source
+            url = backend.url(path)
+        with span("frame_download"):
+            data, attempts, error = self._attempt(lambda: backend.download_bytes(path))
+        if error is not None:
+            return TransferResult(path, url, False, None, 0, attempts, error)
+        nbytes = len(data)
+        if decode:
+            with span("jpeg_decode"):
+                data = decode_jpeg(data)
+            if data is None:
+                return TransferResult(path, url, False, None, nbytes, attempts, ValueError("Frame decode failed"))
+        return TransferResult(path, url, True, data, nbytes, attempts, None)
+
+    def _run(self, fn, items, label):
+        start = time.perf_counter()
+        results = list(self._executor.map(propagate(fn), items))
+        elapsed = time.perf_counter() - start
+        stats = self._stats(results, elapsed)
+        if stats["failed"]:
+            logger.warning(f"⚠️ {label}: {stats['failed']}/{stats['objects']} transfers failed")
+        return results, stats
+
+    def _stats(self, results, elapsed):
+        nbytes = sum(r.nbytes for r in results)
+        stats = {
+            "objects": len(results),
+            "failed": sum(1 for r in results if not r.ok),
+            "retries": sum(max(0, r.attempts - 1) for r in results),
+            "bytes": nbytes,
+            "seconds": round(elapsed, 4),
+            "objects_per_sec": round(len(results) / elapsed, 2) if elapsed > 0 else None,
+            "mb_per_sec": round(nbytes / 1024 / 1024 / elapsed, 2) if elapsed > 0 else None,
+        }
+        self._add_totals(stats)
+        return stats
+
+    def _add_totals(self, stats):
+        with self._lock:
+            for key in self.totals:
+                self.totals[key] += stats[key]
+
+    def upload_many(self, items, content_type=None):
+        """items: [(bytes | str | ndarray frame, path)] -> ([TransferResult] in order, stats)"""
+        return self._run(lambda item: self._upload_one(item, content_type), list(items), "upload")
+
+    def download_many(self, sources, decode=False):
+        """sources: [storage URL | path] -> ([TransferResult] in order, stats); decode=True returns frames"""
+        return self._run(lambda source: self._download_one(source, decode), list(sources), "download")
+
+    def iter_download(self, sources, decode=False, window=None):
+        """
+        Yield TransferResults in input order while keeping up to `window` downloads
+        in flight, so a consumer can start on the first frames immediately.
+        """
+        window = max(1, window or self.concurrency * 2)
+        start = time.perf_counter()
+        pending = deque()
+        summary = {"objects": 0, "failed": 0, "retries": 0, "bytes": 0}
+        
+        def finish(future):
+            result = future.result()
+            summary["objects"] += 1
+            summary["failed"] += int(not result.ok)
+            summary["retries"] += max(0, result.attempts - 1)
+            summary["bytes"] += result.nbytes
+            return result
+        
+        # Pool threads record their spans into the consumer's job trace
+        download = propagate(self._download_one)
+        for source in sources:
+            pending.append(self._executor.submit(download, source, decode))
+            if len(pending) >= window:
+                yield finish(pending.popleft())
+        while pending:
+            yield finish(pending.popleft())
+        
+        elapsed = time.perf_counter() - start
+        self._add_totals(dict(summary, seconds=elapsed))
+        if elapsed > 0 and summary["objects"]:
+            logger.info(f"📦 Downloaded {summary['objects']} objects, {summary['bytes'] / 1024 / 1024:.1f} MB "
+                        f"at {summary['objects'] / elapsed:.1f} obj/s ({summary['failed']} failed, {summary['retries']} retries)")
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_transfer_manager():
+    """Process-wide transfer manager (shares one thread pool across jobs)"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = TransferManager()
+        return _manager
+
+
+def _reset_after_fork():
+    """Forked workers (gunicorn.conf.py) start their own pool; the parent's threads do not exist in the child"""
+    global _manager, _manager_lock
+    _manager = None
+    _manager_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)